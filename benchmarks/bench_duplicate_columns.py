@@ -0,0 +1,51 @@
+"""
+scaling benchmark for BaseDataChecker.check_duplicate_columns
+
+usage: PYTHONPATH=. python benchmarks/bench_duplicate_columns.py --rows 10000 --cols 250 500 1000 2000 4000
+"""
+import argparse
+import itertools
+import time
+import numpy as np
+import pandas as pd
+from data_curator.data_checkers.base_checker import BaseDataChecker
+import data_curator.utils.duplicate_utils as du
+
+
+def make_frame(n_rows, n_cols, dup_frac=0.05, null_frac=0.02, seed=0):
+    rng = np.random.default_rng(seed)
+    values = rng.normal(size=(n_rows, n_cols))
+    n_dups = int(n_cols * dup_frac)
+    for dup_ind in rng.choice(np.arange(1, n_cols), n_dups, replace=False):
+        values[:, dup_ind] = values[:, rng.integers(0, dup_ind)]
+    values[rng.random(values.shape) < null_frac] = np.nan
+    return pd.DataFrame(values, columns=['col_{0}'.format(t) for t in range(n_cols)])
+
+
+def time_fingerprinted(data):
+    checker = BaseDataChecker({'total': data}, {})
+    start = time.perf_counter()
+    checker.check_duplicate_columns()
+    return time.perf_counter() - start
+
+
+def time_pairwise(data):
+    start = time.perf_counter()
+    [du.columns_equal(data, ind0, ind1) for ind0, ind1 in itertools.combinations(range(data.shape[1]), 2)]
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='bench_duplicate_columns')
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--cols', type=int, nargs='+', default=[250, 500, 1000, 2000, 4000])
+    parser.add_argument('--pairwise-max-cols', type=int, default=500, dest='pairwise_max_cols',
+                        help='only time the legacy pairwise scan up to this many columns')
+    args = parser.parse_args()
+
+    print('{0:>8} {1:>14} {2:>16} {3:>14}'.format('cols', 'bucketed (s)', 'ms per column', 'pairwise (s)'))
+    for n_cols in args.cols:
+        data = make_frame(args.rows, n_cols)
+        bucketed = time_fingerprinted(data)
+        pairwise = time_pairwise(data) if n_cols <= args.pairwise_max_cols else float('nan')
+        print('{0:>8} {1:>14.3f} {2:>16.3f} {3:>14.3f}'.format(n_cols, bucketed, 1000 * bucketed / n_cols, pairwise))
@@ -0,0 +1,81 @@
+"""
+peak memory benchmark for the data processor: extra peak RSS of processing over the size of the input data,
+for the processor and for the earlier approach (drop copies per removal, imputers on 2D arrays).
+each run is measured in its own process
+
+usage: PYTHONPATH=. python benchmarks/bench_processor_memory.py --rows 1000000 --cols 40
+"""
+import argparse
+import copy
+import multiprocessing
+import numpy as np
+import pandas as pd
+from sklearn.impute import SimpleImputer
+from data_curator.data_checkers.data_checker import DataChecker
+from data_curator.data_processors.data_processor import DataProcessor
+from data_curator.data_processors.params.params import Params
+from benchmarks.resources import peak_rss, current_rss, reset_peak_rss
+
+
+def make_frame(n_rows, n_cols, seed=0):
+    """float columns with missing values in a third of them, one id, one constant and one duplicated column"""
+    rng = np.random.default_rng(seed)
+    # filled column by column, so that building the frame does not raise the peak above its size
+    values = np.empty((n_rows, n_cols))
+    for col_ind in range(n_cols):
+        values[:, col_ind] = rng.normal(size=n_rows)
+    values[:, 0] = np.arange(n_rows) * 2.0
+    values[:, 1] = 1.0
+    values[:, 2] = values[:, 3]
+    values[:, -1] = rng.integers(0, 2, n_rows)
+    for col_ind in range(4, n_cols - 1, 3):
+        values[rng.random(n_rows) < 0.1, col_ind] = np.nan
+    columns = ['col_{0}'.format(t) for t in range(n_cols - 1)] + ['target']
+    return pd.DataFrame(values, columns=columns, copy=False)
+
+
+def run_processor(data, metadata, data_checks):
+    DataProcessor(data, metadata, data_checks, Params().params).run()
+
+
+def run_copying_processor(data, metadata, data_checks):
+    """the processing steps as done before: a drop copy per removal and imputers round-tripping 2D arrays"""
+    column_checks = data_checks['column_checks']['total']
+    for check in ['CRITICAL_CARDINALITY_CHECK', 'DUPLICATE_CHECK']:
+        cols = [t for t, val in column_checks[check].items() if val == 'FAIL' and t in data['total'].columns]
+        data['total'] = data['total'].drop(columns=cols)
+    cols = [t for t, val in column_checks['MISSING_VALUE_CHECK'].items() if val == 'FAIL' and t in data['total']]
+    imputer = SimpleImputer(missing_values=np.nan, strategy='mean')
+    imputer.fit(data['total'][cols].values)
+    data['total'][cols] = imputer.transform(data['total'][cols].values)
+
+
+def measure(args):
+    n_rows, n_cols, method, metadata, data_checks = args
+    data = {'total': make_frame(n_rows, n_cols)}
+    input_bytes = data['total'].memory_usage(index=False).sum()
+    reset_peak_rss()
+    start_rss = current_rss()
+    method(data, metadata, data_checks)
+    return input_bytes, max(peak_rss() - start_rss, 0)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='bench_processor_memory')
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--cols', type=int, default=40)
+    args = parser.parse_args()
+
+    data = {'total': make_frame(args.rows, args.cols)}
+    metadata = {'split_type': 'total', 'target_col': {'total': 'target'}, 'features': {'total': None}}
+    metadata, data_checks = DataChecker(data, metadata).run()
+    del data
+
+    print('rows\tcols\tmethod\tinput_MB\textra_peak_MB')
+    ctx = multiprocessing.get_context('spawn')
+    for name, method in [('copying', run_copying_processor), ('in_place', run_processor)]:
+        with ctx.Pool(1) as pool:
+            input_bytes, extra_peak = pool.apply(measure, ((args.rows, args.cols, method, copy.deepcopy(metadata),
+                                                            data_checks),))
+        print('{0}\t{1}\t{2}\t{3:.1f}\t{4:.1f}'.format(args.rows, args.cols, name, input_bytes / 2**20,
+                                                       extra_peak / 2**20))
@@ -0,0 +1,301 @@
+"""
+benchmark suite of the reader, checker and processor stages on synthetic datasets (see synthetic.py).
+every case (scenario, file format, split) is written to a temporary folder and run end to end like main.py,
+in a new process per repeat. the stages are timed with their extra peak resident memory (over the memory at
+the start of the stage):
+    read: DataReader.run
+    check: DataChecker, with check/profile for the column profiles and check/<check_*> for every check method
+    process: DataProcessor (skipped for chunked reading), with process/<step> for every processing step
+nested check methods are recorded under their caller (check/check_cardinality/check_critical_cardinality).
+without /proc/self/clear_refs (linux) the peak cannot be reset and the extra peaks are upper bounds.
+results are medians over the repeats, saved as json with the commit and library versions (--save) and
+compared to a saved baseline (--compare): stages slower or with a higher extra peak than the tolerance allows
+(beyond the noise floors) are regressions and make the run exit with status 1.
+
+usage: PYTHONPATH=. python benchmarks/bench_suite.py --scenarios small wide --formats csv parquet --save base.json
+       PYTHONPATH=. python benchmarks/bench_suite.py --scenarios small wide --formats csv parquet --compare base.json
+       PYTHONPATH=. python benchmarks/bench_suite.py --rows 100000 --cols 50 --null-ratio 0.2 --duplicate-cols 10
+"""
+import argparse
+import contextlib
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from data_curator.data_readers.data_reader import DataReader
+from data_curator.data_checkers.data_checker import DataChecker
+from data_curator.data_processors.data_processor import DataProcessor
+from data_curator.data_processors.params.params import Params
+import data_curator.utils.file_utils as fu
+from benchmarks.resources import peak_rss, current_rss, reset_peak_rss
+import benchmarks.synthetic as sy
+
+RESULTS_VERSION = 1
+scenarios = {
+    'small': {'n_rows': 20000, 'n_cols': 20},
+    'medium': {'n_rows': 200000, 'n_cols': 40},
+    'tall': {'n_rows': 2000000, 'n_cols': 10},
+    'wide': {'n_rows': 20000, 'n_cols': 400, 'n_duplicate_cols': 40},
+    'sparse': {'n_rows': 200000, 'n_cols': 40, 'null_ratio': 0.5, 'null_col_share': 0.8},
+    'imbalanced': {'n_rows': 200000, 'n_cols': 20, 'n_classes': 5, 'minority_share': 0.01},
+    'regression': {'n_rows': 200000, 'n_cols': 20, 'n_classes': 0},
+}
+
+
+class StageRecorder(object):
+    """
+    seconds and extra peak memory of nested stages, by stage path ('check/check_missing_values').
+    the peak of a stage is reset at its start and folded into the peak of its parent at its end,
+    so that parents keep the peaks of their children
+    """
+    def __init__(self):
+        self.stages = dict()
+        self.stack = []
+
+    def start(self, name):
+        if self.stack:
+            self.stack[-1]['peak'] = max(self.stack[-1]['peak'], peak_rss())
+        path = self.stack[-1]['path'] + '/' + name if self.stack else name
+        reset_peak_rss()
+        self.stack.append({'path': path, 'start': time.perf_counter(), 'start_rss': current_rss(), 'peak': 0})
+
+    def stop(self):
+        seconds = time.perf_counter() - self.stack[-1]['start']
+        stage = self.stack.pop()
+        peak = max(stage['peak'], peak_rss())
+        if self.stack:
+            self.stack[-1]['peak'] = max(self.stack[-1]['peak'], peak)
+        record = self.stages.setdefault(stage['path'], {'seconds': 0.0, 'extra_peak_bytes': 0, 'calls': 0})
+        record['seconds'] += seconds
+        record['extra_peak_bytes'] = max(record['extra_peak_bytes'], peak - stage['start_rss'])
+        record['calls'] += 1
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        self.start(name)
+        try:
+            yield
+        finally:
+            self.stop()
+
+    def wrap(self, obj, names):
+        """records the named methods of obj as stages, also when obj calls them itself"""
+        for name in names:
+            setattr(obj, name, self.wrap_method(name, getattr(obj, name)))
+
+    def wrap_method(self, name, method):
+        def wrapped(*args, **kwargs):
+            with self.stage(name):
+                return method(*args, **kwargs)
+        return wrapped
+
+
+def run_stages(filenames, n_jobs=1, chunksize=None, processes=None):
+    """the stages of a main.py run on filenames, recorded by a StageRecorder"""
+    recorder = StageRecorder()
+    datafiles = fu.validate_filenames(filenames)
+    with recorder.stage('read'):
+        data, metadata = DataReader(datafiles, 0, sy.TARGET_COL, chunksize).run()
+    with recorder.stage('check'):
+        with recorder.stage('profile'):
+            data_checker = DataChecker(data, metadata, n_jobs, processes=processes)
+        data_checker.set_checker_type()
+        checker = data_checker.checker_class(data, data_checker.metadata, data_checker.profiles, n_jobs)
+        recorder.wrap(checker, [t for t in dir(checker) if t.startswith('check_') and callable(getattr(checker, t))])
+        metadata, data_checks = checker.run()
+    if not chunksize:
+        with recorder.stage('process'):
+            data_processor = DataProcessor(data, metadata, data_checks, Params().params)
+            data_processor.set_checker_type()
+            processor = data_processor.processor_class(data, metadata, data_checks, Params().params)
+            recorder.wrap(processor, processor.processing_steps)
+            processor.run()
+    return recorder.stages
+
+
+def run_case(filenames, repeats, n_jobs, chunksize, processes=None):
+    """stage medians over repeats, each run in a new process (not a daemon, it may start checker processes)"""
+    runs = []
+    ctx = multiprocessing.get_context('spawn')
+    for _ in range(repeats):
+        with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+            runs.append(pool.submit(run_stages, filenames, n_jobs, chunksize, processes).result())
+    stages = dict()
+    for path in runs[0].keys():
+        seconds = [t[path]['seconds'] for t in runs]
+        stages[path] = {'seconds': statistics.median(seconds), 'seconds_min': min(seconds),
+                        'extra_peak_bytes': int(statistics.median(t[path]['extra_peak_bytes'] for t in runs)),
+                        'calls': runs[0][path]['calls']}
+    return stages
+
+
+def git_commit():
+    """commit of the working tree, with '-dirty' for uncommitted changes, None outside a git checkout"""
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL, text=True).strip()
+        dirty = subprocess.check_output(['git', 'status', '--porcelain', '--untracked-files=no'],
+                                        stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + '-dirty' if dirty else commit
+
+
+def environment():
+    versions = {'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__}
+    try:
+        import pyarrow
+        versions['pyarrow'] = pyarrow.__version__
+    except ImportError:
+        versions['pyarrow'] = None
+    return {'commit': git_commit(), 'created': datetime.datetime.now().isoformat(timespec='seconds'),
+            'platform': platform.platform(), 'cpu_count': os.cpu_count(), 'versions': versions}
+
+
+def case_params(args):
+    """dataset parameters of every scenario, with the parameters given on the command line replacing theirs"""
+    overrides = {'n_rows': args.rows, 'n_cols': args.cols, 'null_ratio': args.null_ratio,
+                 'null_col_share': args.null_col_share, 'n_duplicate_cols': args.duplicate_cols,
+                 'n_classes': args.classes, 'minority_share': args.minority_share, 'seed': args.seed}
+    overrides = {key: val for key, val in overrides.items() if val is not None}
+    if args.cardinality_mix:
+        overrides['cardinality_mix'] = sy.parse_cardinality_mix(args.cardinality_mix)
+    names = args.scenarios or (['custom'] if overrides else ['small'])
+    params = dict()
+    for name in names:
+        if name != 'custom' and name not in scenarios:
+            raise ValueError('unknown scenario {0}, expected one of {1}'.format(name, list(scenarios.keys())))
+        params[name] = dict(scenarios.get(name, scenarios['small']), **overrides)
+    return params
+
+
+def run_suite(args):
+    results = {'version': RESULTS_VERSION, 'environment': environment(),
+               'settings': {'repeats': args.repeats, 'n_jobs': args.n_jobs, 'chunksize': args.chunksize,
+                            'processes': args.processes},
+               'cases': dict()}
+    for name, params in case_params(args).items():
+        df = sy.make_dataset(**params)
+        for file_format in args.formats:
+            for split in args.splits:
+                case = '{0}-{1}-{2}'.format(name, file_format, split)
+                folder = tempfile.mkdtemp(prefix='bench_suite_')
+                try:
+                    filenames = sy.write_dataset(df, folder, file_format, split)
+                    file_bytes = sum(os.path.getsize(t) for t in filenames)
+                    stages = run_case(filenames, args.repeats, args.n_jobs, args.chunksize, args.processes)
+                finally:
+                    shutil.rmtree(folder, ignore_errors=True)
+                results['cases'][case] = {'params': params, 'file_format': file_format, 'split': split,
+                                          'file_bytes': file_bytes, 'stages': stages}
+                print_case(case, stages)
+        del df
+    return results
+
+
+def print_case(case, stages):
+    print('{0}\n{1:<64}{2:>10}{3:>16}'.format(case, 'stage', 'seconds', 'extra_peak_MB'))
+    for path, stage in stages.items():
+        print('{0:<64}{1:>10.3f}{2:>16.1f}'.format(path, stage['seconds'], stage['extra_peak_bytes'] / 2**20))
+    sys.stdout.flush()
+
+
+def compare(results, baseline, tolerance, min_seconds, min_peak_bytes):
+    """
+    stage changes against a baseline, (case, stage, metric, baseline value, value, status) with status
+    'regression' or 'improvement' when the change is above tolerance (relative) and the noise floor
+    (min_seconds, min_peak_bytes), 'same' otherwise. cases with other dataset parameters are skipped
+    """
+    for name in ['n_jobs', 'chunksize', 'processes']:
+        if results['settings'].get(name) != baseline['settings'].get(name):
+            raise ValueError('baseline was run with {0} {1}, not {2}'.format(name, baseline['settings'].get(name),
+                                                                            results['settings'].get(name)))
+    changes = []
+    for case, result in results['cases'].items():
+        base = baseline['cases'].get(case)
+        if base is None:
+            continue
+        if base['params'] != result['params']:
+            print('skipping {0}: dataset parameters differ from the baseline'.format(case))
+            continue
+        for path, stage in result['stages'].items():
+            if path not in base['stages']:
+                continue
+            for metric, noise_floor in [('seconds', min_seconds), ('extra_peak_bytes', min_peak_bytes)]:
+                old, new = base['stages'][path][metric], stage[metric]
+                status = 'same'
+                if abs(new - old) > max(tolerance * old, noise_floor):
+                    status = 'regression' if new > old else 'improvement'
+                changes.append((case, path, metric, old, new, status))
+    return changes
+
+
+def print_changes(changes):
+    print('{0:<32}{1:<56}{2:<18}{3:>14}{4:>14}  {5}'.format('case', 'stage', 'metric', 'baseline', 'now', 'status'))
+    for case, path, metric, old, new, status in changes:
+        if status == 'same':
+            continue
+        if metric == 'extra_peak_bytes':
+            metric, old, new = 'extra_peak_MB', old / 2**20, new / 2**20
+        print('{0:<32}{1:<56}{2:<18}{3:>14.3f}{4:>14.3f}  {5}'.format(case, path, metric, old, new, status))
+    n_regressions = sum(t[-1] == 'regression' for t in changes)
+    n_improvements = sum(t[-1] == 'improvement' for t in changes)
+    print('{0} regressions, {1} improvements, {2} unchanged'.format(n_regressions, n_improvements,
+                                                                   len(changes) - n_regressions - n_improvements))
+    return n_regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='bench_suite')
+    parser.add_argument('--scenarios', nargs='+', default=None,
+                        help='preset datasets: {0} (default: small)'.format(', '.join(scenarios.keys())))
+    parser.add_argument('--formats', nargs='+', choices=['csv', 'parquet'], default=['csv'])
+    parser.add_argument('--splits', nargs='+', choices=['total', 'train_test'], default=['total'])
+    parser.add_argument('--rows', type=int, default=None)
+    parser.add_argument('--cols', type=int, default=None, help='feature columns, duplicates included')
+    parser.add_argument('--null-ratio', type=float, default=None, help='share of missing values in a column')
+    parser.add_argument('--null-col-share', type=float, default=None, help='share of columns with missing values')
+    parser.add_argument('--cardinality-mix', default=None,
+                        help='column kind weights, e.g. float=0.6,int_low=0.2,string_high=0.2 '
+                             '(kinds: {0})'.format(', '.join(sy.column_kinds)))
+    parser.add_argument('--duplicate-cols', type=int, default=None)
+    parser.add_argument('--classes', type=int, default=None, help='target classes, 0 for a regression target')
+    parser.add_argument('--minority-share', type=float, default=None, help='share of rows of the minority class')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('-j', '--jobs', type=int, default=1, dest='n_jobs')
+    parser.add_argument('-cs', '--chunksize', type=int, default=None, help='stream the files, no processing')
+    parser.add_argument('--processes', type=int, default=None, help='profile columns in shards with this many '
+                                                                     'processes')
+    parser.add_argument('--save', default=None, help='save the results as json to this file')
+    parser.add_argument('--compare', default=None, help='compare the results to a json saved with --save')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='relative change allowed (default: 0.2)')
+    parser.add_argument('--min-seconds', type=float, default=0.02,
+                        help='time changes below this are noise (default: 0.02)')
+    parser.add_argument('--min-peak-mb', type=float, default=32,
+                        help='extra peak changes below this are noise (default: 32)')
+    args = parser.parse_args()
+
+    results = run_suite(args)
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=1)
+        print('saved {0}'.format(args.save))
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get('version') != RESULTS_VERSION:
+            raise ValueError('{0} has results version {1}, not {2}'.format(args.compare, baseline.get('version'),
+                                                                          RESULTS_VERSION))
+        print('compared to {0} (commit {1})'.format(args.compare, baseline['environment']['commit']))
+        if print_changes(compare(results, baseline, args.tolerance, args.min_seconds, args.min_peak_mb * 2**20)):
+            sys.exit(1)
@@ -0,0 +1,31 @@
+"""
+resident memory of the benchmark process, for peak memory measurements of a stage:
+reset_peak_rss(), then peak_rss() - current_rss() at the start is the extra peak of the stage
+"""
+import resource
+from data_curator.data_curator_profiler import read_status_bytes
+
+
+def peak_rss():
+    """peak resident memory of the process (VmHWM on linux, ru_maxrss elsewhere)"""
+    try:
+        return read_status_bytes('VmHWM')
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def current_rss():
+    """resident memory now (VmRSS on linux), the peak so far elsewhere"""
+    try:
+        return read_status_bytes('VmRSS')
+    except OSError:
+        return peak_rss()
+
+
+def reset_peak_rss():
+    """resets the peak to the current resident memory where the kernel allows it (linux >= 4.0)"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
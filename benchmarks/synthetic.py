@@ -0,0 +1,145 @@
+"""
+synthetic datasets for the benchmarks: feature columns drawn from a cardinality mix, missing values,
+duplicated columns and a target with controlled class imbalance, written as total or train/test csv or parquet
+(the test file without target, like competition data).
+
+column kinds of the cardinality mix:
+    float: continuous values
+    int_low: integers with LOW_DISTINCT values (low cardinality)
+    int_high: integers with about n_rows / 10 values
+    string_low: strings with LOW_DISTINCT values (categorical)
+    string_high: strings with about n_rows / 10 values
+    id: unique integers (critical cardinality, never missing)
+    constant: a single value (critical cardinality, never missing)
+"""
+import os
+import numpy as np
+import pandas as pd
+
+LOW_DISTINCT = 8
+column_kinds = ['float', 'int_low', 'int_high', 'string_low', 'string_high', 'id', 'constant']
+default_cardinality_mix = {'float': 0.5, 'int_low': 0.15, 'int_high': 0.1, 'string_low': 0.15, 'string_high': 0.04,
+                           'id': 0.03, 'constant': 0.03}
+TARGET_COL = 'target'
+
+
+def parse_cardinality_mix(text):
+    """cardinality mix from 'kind=weight,kind=weight' (e.g. 'float=0.8,string_low=0.2')"""
+    cardinality_mix = dict()
+    for item in text.split(','):
+        kind, weight = item.split('=')
+        if kind not in column_kinds:
+            raise ValueError('unknown column kind {0}, expected one of {1}'.format(kind, column_kinds))
+        cardinality_mix[kind] = float(weight)
+    return cardinality_mix
+
+
+def column_kind_counts(n_cols, cardinality_mix):
+    """number of columns of each kind, the weights of cardinality_mix apportioned to n_cols by largest remainder"""
+    kinds = [t for t in column_kinds if cardinality_mix.get(t, 0) > 0]
+    if not kinds:
+        raise ValueError('cardinality mix has no positive weight')
+    weights = np.array([cardinality_mix[t] for t in kinds], dtype=float)
+    shares = n_cols * weights / weights.sum()
+    counts = np.floor(shares).astype(int)
+    for ind in np.argsort(counts - shares)[:n_cols - counts.sum()]:
+        counts[ind] += 1
+    return dict(zip(kinds, counts.tolist()))
+
+
+def make_column(kind, n_rows, rng):
+    if kind == 'float':
+        return rng.normal(size=n_rows)
+    if kind == 'int_low':
+        return rng.integers(0, LOW_DISTINCT, n_rows)
+    if kind == 'int_high':
+        return rng.integers(0, max(n_rows // 10, 1), n_rows)
+    if kind == 'string_low':
+        return np.array(['cat_{0}'.format(t) for t in range(LOW_DISTINCT)], dtype=object)[
+            rng.integers(0, LOW_DISTINCT, n_rows)]
+    if kind == 'string_high':
+        n_values = max(n_rows // 10, 1)
+        return np.array(['val_{0}'.format(t) for t in range(n_values)], dtype=object)[
+            rng.integers(0, n_values, n_rows)]
+    if kind == 'id':
+        return rng.permutation(n_rows)
+    if kind == 'constant':
+        return np.ones(n_rows, dtype=np.int64)
+    raise NotImplementedError('unknown column kind {0}'.format(kind))
+
+
+def add_missing(values, null_ratio, rng):
+    """values with a share null_ratio of them missing (ints become floats, strings None)"""
+    missing = rng.random(len(values)) < null_ratio
+    if values.dtype == object:
+        values = values.copy()
+        values[missing] = None
+        return values
+    values = values.astype(float)
+    values[missing] = np.nan
+    return values
+
+
+def make_target(n_rows, n_classes, minority_share, rng):
+    """
+    class labels 0..n_classes-1, class 0 the minority with a share minority_share of the rows and the others
+    sharing the rest evenly. a continuous target (regression) for n_classes 0
+    """
+    if n_classes == 0:
+        return rng.normal(size=n_rows)
+    if n_classes < 2:
+        raise ValueError('a classification target needs at least 2 classes')
+    if not 0 < minority_share <= 1 / n_classes:
+        raise ValueError('minority share must be in (0, 1/n_classes]')
+    shares = [minority_share] + [(1 - minority_share) / (n_classes - 1)] * (n_classes - 1)
+    return rng.choice(n_classes, n_rows, p=shares)
+
+
+def make_dataset(n_rows, n_cols, null_ratio=0.05, null_col_share=0.3, cardinality_mix=None, n_duplicate_cols=2,
+                 n_classes=2, minority_share=0.1, seed=0):
+    """
+    dataframe of n_cols feature columns (n_duplicate_cols of them copies of other features) and a target column.
+    a share null_col_share of the columns that are not id or constant have a share null_ratio of missing values
+    """
+    cardinality_mix = default_cardinality_mix if cardinality_mix is None else cardinality_mix
+    if not 0 <= n_duplicate_cols < n_cols:
+        raise ValueError('duplicate columns must be fewer than the columns')
+    rng = np.random.default_rng(seed)
+    columns = dict()
+    kind_counts = column_kind_counts(n_cols - n_duplicate_cols, cardinality_mix)
+    for kind, count in kind_counts.items():
+        for ind in range(count):
+            values = make_column(kind, n_rows, rng)
+            if kind not in ['id', 'constant'] and null_ratio > 0 and rng.random() < null_col_share:
+                values = add_missing(values, null_ratio, rng)
+            columns['{0}_{1}'.format(kind, ind)] = values
+    names = list(columns.keys())
+    for ind, name in enumerate(rng.choice(names, n_duplicate_cols)):
+        columns['dup_{0}_{1}'.format(ind, name)] = columns[name]
+    columns[TARGET_COL] = make_target(n_rows, n_classes, minority_share, rng)
+    return pd.DataFrame(columns, copy=False)
+
+
+def write_dataset(df, folder, file_format='csv', split='total', test_share=0.2):
+    """
+    writes df into folder as total.<ext> or train.<ext> and test.<ext> (the last test_share of the rows,
+    without target), returns the file names in DataReader order
+    """
+    if file_format not in ['csv', 'parquet']:
+        raise NotImplementedError('unknown file format {0}'.format(file_format))
+    if split == 'total':
+        parts = {'total': df}
+    elif split == 'train_test':
+        n_train = len(df) - int(len(df) * test_share)
+        parts = {'train': df.iloc[:n_train], 'test': df.iloc[n_train:].drop(columns=[TARGET_COL])}
+    else:
+        raise NotImplementedError('unknown split {0}'.format(split))
+    filenames = []
+    for key, part in parts.items():
+        filename = os.path.join(folder, '{0}.{1}'.format(key, file_format))
+        if file_format == 'csv':
+            part.to_csv(filename, index=False)
+        else:
+            part.to_parquet(filename, index=False)
+        filenames.append(filename)
+    return filenames
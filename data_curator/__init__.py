@@ -0,0 +1 @@
+from data_curator.curation_api import curate
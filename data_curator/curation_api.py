@@ -0,0 +1,74 @@
+"""
+programmatic entry point: curate() reads, checks and processes a dataset like main.py, without the command line.
+importing it is cheap: pandas, numpy and the readers, checkers and processors are imported on the first call,
+so callers only pay for them when they curate (see curation_worker to keep them imported between jobs)
+
+    from data_curator import curate
+    results = curate('data.csv', target_col='label', output_folder='out')
+"""
+import os
+import data_curator.utils.file_utils as fu
+import data_curator.data_curator_profiler as dcp
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def datafiles_of(filenames):
+    """{data key: data file} of a data file, directory or glob pattern, a list of one or two of them or a dict"""
+    if isinstance(filenames, dict):
+        return dict(filenames)
+    if isinstance(filenames, str):
+        filenames = [filenames]
+    return fu.validate_filenames(list(filenames))
+
+
+def curate(filenames, no_target=False, target_col='target', columns=None, checks=None, process=True, params=None,
+           n_jobs=1, chunksize=None, sample=None, sample_method='stratified', distinct_error=None,
+           output_folder=None, output_format='json', profile=False, store=None, processes=None):
+    """
+    reads, checks and processes a dataset as a CurationPlan, returns its results: data (processed if processed),
+    metadata, data_checks, and if processed processed_info and the fitted pipeline
+    filenames: a data file, directory or glob pattern, a list of two for train and test data, or {data key: file}
+    checks: the check_* results to return, all if None. checks used by the processing steps always run
+    process: True for all processing steps, a list of steps, or False for none. chunked and sampled data are
+        not processed
+    params: processing params (see Params)
+    output_folder: if given, the checker output (in output_format, see output_utils) and the fitted pipeline
+        are saved in it
+    profile: adds the stages of the run to metadata['profile'] and processed_info['profile']
+    store: folder of a column store, unchanged data files are opened from it instead of parsed (see ColumnStore)
+    the other arguments are those of DataReader and DataChecker
+    """
+    from data_curator.curation_plan import CurationPlan
+    import data_curator.utils.output_utils as ou
+
+    if output_format == 'msgpack':
+        # fail before running the checks
+        ou.import_msgpack()
+    if process and (chunksize or sample):
+        logger.info('data processing needs all rows in memory, skipped for chunked or sampled data')
+        process = False
+    plan = CurationPlan(datafiles_of(filenames), no_target, target_col, n_jobs, chunksize, sample, sample_method,
+                        distinct_error, store, processes)
+    if columns is not None:
+        plan = plan.select(columns)
+    plan = plan.check(checks)
+    if process:
+        plan = plan.process(None if process is True else process, params)
+
+    if profile:
+        dcp.start_profiling()
+    try:
+        results = plan.collect()
+    finally:
+        profiler = dcp.stop_profiling() if profile else None
+    if profiler is not None:
+        results['metadata']['profile'] = profiler.summary(['reader', 'checker'])
+        if 'processed_info' in results:
+            results['processed_info']['profile'] = profiler.summary(['processor'])
+    if output_folder is not None:
+        ou.save_checks(results['metadata'], results['data_checks'], output_folder, output_format)
+        if 'pipeline' in results:
+            results['pipeline'].save(os.path.join(output_folder, 'fitted_pipeline.pkl'))
+    return results
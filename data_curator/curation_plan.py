@@ -0,0 +1,208 @@
+"""
+lazy curation: a CurationPlan describes the reading, the checks and the processing steps of a run, nothing is read
+or computed until the results are asked for (collect). the plan is optimized before it runs:
+    projection: only the selected columns (and the target column) are read from the data files
+    check pruning: only the checks asked for and the checks whose results a processing step uses are run
+    step pruning: drop_removed_columns only runs after a column removing step
+    deferral: checks that only a processing step uses and that scan the data (memory check) run after the removed
+        columns are dropped, on the kept columns only. their results for the kept columns are the same
+the checks reading the column profiles share one scan of the data (the profiles), the column removing steps share
+one drop of the removed columns. explain() shows the optimized plan with these fused scans
+
+    plan = CurationPlan({'total': 'data.csv'}).select(['a', 'b']).process()
+    print(plan.explain())
+    results = plan.collect()
+"""
+import copy
+from data_curator.data_readers.data_reader import DataReader
+from data_curator.data_checkers.data_checker import DataChecker
+from data_curator.data_checkers.base_checker import BaseDataChecker, RegressionDataChecker, \
+    ClassificationDataChecker, UnsupervisedDataChecker
+from data_curator.data_processors.base_processor import BaseDataProcessor
+from data_curator.data_processors.data_processor import DataProcessor
+from data_curator.data_processors.params.params import Params
+import data_curator.data_curator_profiler as dcp
+
+import logging
+logger = logging.getLogger(__name__)
+
+# checks scanning the data themselves, the other checks read the column profiles
+scanning_checks = ['check_duplicate_columns', 'check_memory_issue']
+# checks that can run after the removed columns are dropped when no result of a removed column is asked for
+deferrable_checks = ['check_memory_issue']
+
+
+def check_names():
+    """the check_* methods of the checkers"""
+    classes = [BaseDataChecker, RegressionDataChecker, ClassificationDataChecker, UnsupervisedDataChecker]
+    return sorted({t for cls in classes for t in dir(cls) if t.startswith('check_')})
+
+
+class CurationPlan(object):
+    def __init__(self, datafiles, no_target=False, target_col='target', n_jobs=1, chunksize=None, sample=None,
+                 sample_method='stratified', distinct_error=None, store=None, processes=None):
+        """
+        datafiles: {data key: data file, directory or glob pattern}, with keys 'total' or 'train' and 'test'
+        the other arguments are those of DataReader and DataChecker
+        """
+        self.datafiles = datafiles
+        self.no_target = no_target
+        self.target_col = target_col
+        self.n_jobs = n_jobs
+        self.chunksize = chunksize
+        self.sample = sample
+        self.sample_method = sample_method
+        self.distinct_error = distinct_error
+        self.store = store
+        self.processes = processes
+        self.columns = None
+        # check results asked for: a list of check_* methods, None for all checks
+        self.checks = []
+        # processing steps asked for, None for no processing
+        self.steps = None
+        self.params = None
+        self.results = None
+
+    def derive(self, **changes):
+        """a copy of the plan with the changes, without results"""
+        plan = copy.copy(self)
+        plan.__dict__.update(changes)
+        plan.results = None
+        return plan
+
+    def select(self, columns):
+        """plan reading only these columns (the target column is always read)"""
+        return self.derive(columns=list(columns))
+
+    def check(self, checks=None):
+        """plan returning the results of these check_* methods, of all checks if None"""
+        if checks is None:
+            return self.derive(checks=None)
+        unknown = [t for t in checks if t not in check_names()]
+        if unknown:
+            raise ValueError('unknown checks {0}, checks are {1}'.format(unknown, check_names()))
+        if self.checks is None:
+            return self.derive()
+        return self.derive(checks=self.checks + [t for t in checks if t not in self.checks])
+
+    def process(self, steps=None, params=None):
+        """plan running these processing steps (all if None) with these params (see Params)"""
+        steps = BaseDataProcessor.processing_steps if steps is None else list(steps)
+        unknown = [t for t in steps if t not in BaseDataProcessor.processing_steps]
+        if unknown:
+            raise ValueError('unknown processing steps {0}, steps are {1}'.format(
+                unknown, BaseDataProcessor.processing_steps))
+        if self.chunksize or self.sample:
+            raise ValueError('data processing needs all rows in memory, not possible with chunksize or sample')
+        return self.derive(steps=steps, params=params)
+
+    def read_columns(self):
+        """the columns to read, the selected columns and the target column"""
+        if self.columns is None:
+            return None
+        if self.no_target or self.target_col in self.columns:
+            return self.columns
+        return self.columns + [self.target_col]
+
+    def optimize(self):
+        """the optimized plan: a list of operations {'op': read, profile, check or process, ...} in run order"""
+        steps = [t for t in BaseDataProcessor.processing_steps if t in (self.steps or [])]
+        removing = [t for t in steps if t in ['remove_cardinality_issue_columns', 'remove_duplicated_columns']]
+        if not removing:
+            steps = [t for t in steps if t != 'drop_removed_columns']
+        elif 'drop_removed_columns' not in steps:
+            # removed columns are dropped by this step only
+            steps.insert(steps.index(removing[-1]) + 1, 'drop_removed_columns')
+        consumed = []
+        for step in steps:
+            consumed.extend(t for t in BaseDataProcessor.step_checks.get(step, []) if t not in consumed)
+
+        # checks only used by steps after the drop run after it
+        deferred = []
+        if self.checks is not None and 'drop_removed_columns' in steps:
+            drop_index = steps.index('drop_removed_columns')
+            deferred = [t for t in consumed if t in deferrable_checks and t not in self.checks and
+                        all(steps.index(step) > drop_index for step in steps
+                            if t in BaseDataProcessor.step_checks.get(step, []))]
+        if self.checks is None:
+            checks = None
+        else:
+            checks = [t for t in self.checks + consumed if t not in deferred]
+            checks = [t for i, t in enumerate(checks) if t not in checks[:i]]
+
+        plan = [{'op': 'read', 'datafiles': self.datafiles, 'columns': self.read_columns()}]
+        if checks is None or checks or deferred or steps:
+            profile_checks = None if checks is None else [t for t in checks if t not in scanning_checks]
+            plan.append({'op': 'profile', 'fused_checks': profile_checks})
+            plan.append({'op': 'check', 'checks': checks})
+        if steps:
+            if deferred:
+                drop_index = steps.index('drop_removed_columns') + 1
+                plan.append({'op': 'process', 'steps': steps[:drop_index], 'fused_steps': removing})
+                plan.append({'op': 'check', 'checks': deferred, 'deferred': True})
+                plan.append({'op': 'process', 'steps': steps[drop_index:]})
+            else:
+                plan.append({'op': 'process', 'steps': steps, 'fused_steps': removing})
+        return plan
+
+    def explain(self):
+        """the optimized plan as text, an operation per line"""
+        lines = []
+        for op in self.optimize():
+            if op['op'] == 'read':
+                line = 'read {0} columns {1}'.format(op['datafiles'], 'all' if op['columns'] is None else op['columns'])
+            elif op['op'] == 'profile':
+                line = 'profile scan, shared by {0}'.format(
+                    'all profile checks' if op['fused_checks'] is None else op['fused_checks'])
+            elif op['op'] == 'check':
+                line = 'check {0}{1}'.format('all' if op['checks'] is None else op['checks'],
+                                             ' (on the kept columns)' if op.get('deferred') else '')
+            else:
+                line = 'process {0}'.format(op['steps'])
+                if op.get('fused_steps'):
+                    line += ', {0} fused into one drop'.format(op['fused_steps'])
+            lines.append(line)
+        return '\n'.join(lines)
+
+    def collect(self):
+        """
+        runs the optimized plan (once, the results are kept) and returns its results: data, metadata and,
+        if checked, data_checks and, if processed, processed_info and the fitted pipeline
+        """
+        if self.results is not None:
+            return self.results
+        plan = self.optimize()
+        logger.debug('running curation plan\n' + self.explain())
+        read = plan[0]
+        data, metadata = DataReader(self.datafiles, self.no_target, self.target_col, self.chunksize, read['columns'],
+                                    self.sample, self.sample_method, self.n_jobs, self.store).run()
+        results = {'data': data, 'metadata': metadata}
+        data_checker, processor = None, None
+        for op in plan[1:]:
+            if op['op'] == 'profile':
+                data_checker = DataChecker(data, metadata, self.n_jobs, self.distinct_error,
+                                           processes=self.processes)
+            elif op['op'] == 'check' and not op.get('deferred'):
+                data_checker.checks = op['checks']
+                results['metadata'], results['data_checks'] = data_checker.run()
+            elif op['op'] == 'check':
+                for check in op['checks']:
+                    with dcp.stage(check, 'checker'):
+                        getattr(data_checker.checker, check)()
+            else:
+                if processor is None:
+                    processor = self.processor(results)
+                with dcp.stage('process', 'processor'):
+                    processor.run_steps(op['steps'])
+        if processor is not None:
+            results['data'], results['processed_info'] = processor.processed_data, processor.processed_info
+            results['pipeline'] = processor.pipeline
+        self.results = results
+        return results
+
+    def processor(self, results):
+        """the processor of the learning type, on the checked data"""
+        params = Params(dict(self.params or {})).params
+        data_processor = DataProcessor(results['data'], results['metadata'], results['data_checks'], params)
+        data_processor.set_checker_type()
+        return data_processor.processor_class(results['data'], results['metadata'], results['data_checks'], params)
@@ -0,0 +1,107 @@
+"""
+long-running curation worker: imports the readers, checkers and processors once and runs curation jobs sent as
+json lines, so that a job does not pay for interpreter startup and imports. jobs are read from stdin (answers go
+to stdout, logs to stderr) or from the connections to a unix socket, one job per line, run one at a time.
+a job holds the keyword arguments of curate (filenames at least) and an optional id, it is answered by
+    {"id": .., "status": "ok", "seconds": .., "metadata": .., "data_checks": .., "processed_info": ..}
+or  {"id": .., "status": "error", "error": "<exception type>: <message>"}
+data and fitted pipelines are not sent back, jobs give an output_folder to have the checker output and the fitted
+pipeline saved
+
+    python -m data_curator.curation_worker [--socket PATH] [-v DEBUG]
+    echo '{"id": 1, "filenames": "data.csv"}' | python -m data_curator.curation_worker
+"""
+import argparse
+import json
+import os
+import signal
+import socketserver
+import sys
+import time
+from data_curator.data_curator_logger import DataCuratorLogger
+from data_curator.curation_api import curate
+
+import logging
+logger = logging.getLogger(__name__)
+
+SOCKET_HELP = 'serve jobs on this unix socket instead of stdin'
+LOG_LEVEL_HELP = 'set verbose level (default: INFO)'
+
+
+def warm_up():
+    """imports the modules every job needs (and pyarrow where installed) before the first job"""
+    import data_curator.curation_plan
+    import data_curator.utils.output_utils
+    from data_curator.data_readers.file_readers import import_pyarrow
+    try:
+        import_pyarrow()
+    except ImportError:
+        logger.debug('pyarrow not installed, parquet and arrow jobs will fail')
+
+
+def run_job(line):
+    """the json answer line of a json job line"""
+    import data_curator.utils.output_utils as ou
+
+    job_id = None
+    start = time.perf_counter()
+    try:
+        job = json.loads(line)
+        if not isinstance(job, dict) or 'filenames' not in job:
+            raise ValueError('a job is a json object with filenames and the other arguments of curate')
+        job_id = job.pop('id', None)
+        results = curate(**job)
+        answer = {'id': job_id, 'status': 'ok', 'seconds': time.perf_counter() - start,
+                  'metadata': results['metadata'], 'data_checks': results['data_checks'],
+                  'processed_info': results.get('processed_info')}
+        return json.dumps(answer, default=ou.json_default)
+    except Exception as e:
+        logger.exception('job {0} failed'.format(job_id))
+        return json.dumps({'id': job_id, 'status': 'error', 'error': '{0}: {1}'.format(type(e).__name__, e)})
+
+
+def serve_lines(lines, write):
+    """answers every non empty job line with write(answer line)"""
+    for line in lines:
+        if line.strip():
+            write(run_job(line) + '\n')
+
+
+class JobHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        serve_lines(self.rfile, lambda answer: self.wfile.write(answer.encode()))
+
+
+def serve_stdin():
+    def write(answer):
+        sys.stdout.write(answer)
+        sys.stdout.flush()
+    serve_lines(sys.stdin, write)
+
+
+def serve_socket(path):
+    if os.path.exists(path):
+        os.remove(path)
+    # stopped by ctrl-c or kill, removing the socket
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    with socketserver.UnixStreamServer(path, JobHandler) as server:
+        logger.info('serving curation jobs on {0}'.format(path))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            logger.info('stopped')
+        finally:
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='DataCuratorWorker')
+    parser.add_argument('-v', '--verbose', help=LOG_LEVEL_HELP, default='INFO', dest="loglevel")
+    parser.add_argument('--socket', help=SOCKET_HELP, default=None, dest="socket")
+    args = parser.parse_args()
+    DataCuratorLogger(args.loglevel)
+    warm_up()
+    if args.socket:
+        serve_socket(args.socket)
+    else:
+        serve_stdin()
@@ -0,0 +1,158 @@
+"""
+mergeable per-column accumulators fed chunk by chunk, used to check data that does not fit in memory.
+every accumulator has update(chunk, nulls) for the next chunk of rows (nulls is chunk.isnull()) and
+merge(other) for an accumulator of the same columns built over other rows.
+"""
+import data_curator.utils.data_checker_utils as dcu
+import data_curator.utils.duplicate_utils as du
+from data_curator.utils.sketch_utils import DistinctCounter
+import numpy as np
+import pandas as pd
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def merge_dtypes(dtype0, dtype1):
+    """dtype of a column when two of its parts are read together: int and float give float, other mixes object"""
+    if dtype0 is None or dtype0 == dtype1:
+        return dtype1
+    if dtype0.kind in 'if' and dtype1.kind in 'if':
+        return np.dtype('float64')
+    return np.dtype('object')
+
+
+def normalize_chunk(chunk):
+    """
+    int columns become float64, so that values hash and compare alike whether or not a chunk has missing values
+    """
+    int_cols = [col for col, dtype in chunk.dtypes.items() if dtype.kind in 'iu']
+    if not int_cols:
+        return chunk
+    return chunk.astype(dict.fromkeys(int_cols, 'float64'))
+
+
+class DtypeAccumulator(object):
+    def __init__(self, columns):
+        self.columns = columns
+        self.dtypes = [None] * len(columns)
+
+    def update(self, chunk, nulls):
+        self.dtypes = [merge_dtypes(t0, t1) for t0, t1 in zip(self.dtypes, chunk.dtypes.values)]
+
+    def merge(self, other):
+        self.dtypes = [merge_dtypes(t0, t1) for t0, t1 in zip(self.dtypes, other.dtypes)]
+
+
+class NullCountAccumulator(object):
+    def __init__(self, columns):
+        self.columns = columns
+        self.n_rows = 0
+        self.null_count = np.zeros(len(columns), dtype=np.int64)
+
+    def update(self, chunk, nulls):
+        self.n_rows += chunk.shape[0]
+        self.null_count += nulls.values.sum(axis=0)
+
+    def merge(self, other):
+        self.n_rows += other.n_rows
+        self.null_count += other.null_count
+
+
+class MinMaxAccumulator(object):
+    """min and max of numeric chunk columns, a column read as non-numeric in any chunk has no min/max"""
+    def __init__(self, columns):
+        self.columns = columns
+        self.min = np.full(len(columns), np.nan, dtype=object)
+        self.max = np.full(len(columns), np.nan, dtype=object)
+        self.numeric = np.ones(len(columns), dtype=bool)
+
+    def update(self, chunk, nulls):
+        for i, dtype in enumerate(chunk.dtypes.values):
+            if dtype.kind not in 'if':
+                self.numeric[i] = False
+                continue
+            values = chunk.iloc[:, i].values[~nulls.iloc[:, i].values]
+            if len(values):
+                self.merge_col(i, values.min(), values.max())
+
+    def merge_col(self, i, col_min, col_max):
+        self.min[i] = col_min if pd.isnull(self.min[i]) else min(self.min[i], col_min)
+        self.max[i] = col_max if pd.isnull(self.max[i]) else max(self.max[i], col_max)
+
+    def merge(self, other):
+        self.numeric &= other.numeric
+        for i in range(len(self.columns)):
+            if not pd.isnull(other.min[i]):
+                self.merge_col(i, other.min[i], other.max[i])
+
+
+class DistinctCountAccumulator(object):
+    """distinct non-null values per column, exact for small counts and HyperLogLog beyond"""
+    def __init__(self, columns):
+        self.columns = columns
+        self.counters = [DistinctCounter() for _ in columns]
+
+    def update(self, chunk, nulls):
+        hashes = du.value_hashes(normalize_chunk(chunk))
+        null_values = nulls.values
+        for i, counter in enumerate(self.counters):
+            counter.update(hashes[~null_values[:, i], i])
+
+    def merge(self, other):
+        for counter, other_counter in zip(self.counters, other.counters):
+            counter.merge(other_counter)
+
+
+class DuplicateColumnsAccumulator(object):
+    """
+    column pairs equal on their common non-missing rows. a pair is equal over all rows only if it is equal
+    within every chunk, so the accumulated pairs are intersected with each chunk's equal pairs.
+    columns missing in every row so far (wildcards) can still equal any column, so pairs touching a wildcard
+    are kept implicit and only materialized once both columns have values.
+    """
+    def __init__(self, columns):
+        self.columns = columns
+        self.wildcards = set(range(len(columns)))
+        self.pairs = set()
+
+    def update(self, chunk, nulls):
+        chunk_all_null = nulls.values.all(axis=0)
+        chunk_pairs = du.find_duplicate_columns(normalize_chunk(chunk), chunk_all_null, include_all_null=False)
+        self.update_pairs(set((t0, t1) for t0, t1 in chunk_pairs), set(np.flatnonzero(chunk_all_null).tolist()))
+
+    def update_pairs(self, other_pairs, other_wildcards):
+        """intersects with the equal pairs of other rows: other_pairs plus every pair touching other_wildcards"""
+        newly_valued = self.wildcards - other_wildcards
+        self.pairs = set(t for t in self.pairs
+                         if (t in other_pairs) or (t[0] in other_wildcards) or (t[1] in other_wildcards))
+        self.pairs.update(t for t in other_pairs if (t[0] in newly_valued) or (t[1] in newly_valued))
+        for col_ind in newly_valued:
+            self.pairs.update(tuple(sorted([col_ind, t])) for t in other_wildcards - self.wildcards)
+        self.wildcards &= other_wildcards
+
+    def merge(self, other):
+        self.update_pairs(other.pairs, other.wildcards)
+
+    def duplicate_pairs(self, dtypes):
+        """equal pairs as sorted [ind0, ind1] lists, restricted to columns of the same (merged) dtype"""
+        pairs = set(self.pairs)
+        for col_ind in self.wildcards:
+            pairs.update(tuple(sorted([col_ind, t])) for t in range(len(self.columns))
+                         if t != col_ind and dtypes[t] == dtypes[col_ind])
+        return [[t0, t1] for t0, t1 in sorted(pairs) if dtypes[t0] == dtypes[t1]]
+
+
+class ClassCountAccumulator(object):
+    """non-null row counts per class of the target column, classes in order of first appearance"""
+    def __init__(self, target_col):
+        self.target_col = target_col
+        self.class_counts = dict()
+
+    def update(self, chunk, nulls):
+        for t, count in dcu.get_class_counts(chunk[self.target_col]).items():
+            self.class_counts[t] = self.class_counts.get(t, 0) + count
+
+    def merge(self, other):
+        for t, count in other.class_counts.items():
+            self.class_counts[t] = self.class_counts.get(t, 0) + count
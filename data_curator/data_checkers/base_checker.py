@@ -1,32 +1,130 @@
 import numpy as np
 import pandas as pd
 import logging
-import itertools
+from functools import partial
+import data_curator.utils.duplicate_utils as du
+import data_curator.utils.memory_utils as mu
+import data_curator.utils.data_checker_utils as dcu
+from data_curator.data_checkers.column_profile import build_profiles
+from data_curator.data_checkers.check_runner import run_tasks
+from data_curator.data_checkers.check_results import CheckResults, FAIL
+import data_curator.data_curator_profiler as dcp
 
 logger = logging.getLogger(__name__)
 pd.options.mode.use_inf_as_na = True
 
 
-def get_range(col):
-    if (col.dtype.str.startswith('<f')) or (col.dtype.str.startswith('<i')):
-        return col.max() - col.min()
-    else:
-        return col.nunique()
-
-
 class BaseDataChecker(object):
-    def __init__(self, data, metadata):
+    # per-dataset column checks: pure functions of (self, key) whose results (CheckResults) the check_* methods store.
+    # dependencies name other column checks or metadata computed before the checker runs
+    column_check_dependencies = {
+        'missing_values_check': [],
+        'critical_cardinality_check': [],
+        'low_cardinality_check': ['feature_dtypes'],
+        'duplicate_columns_check': [],
+        'memory_check': ['feature_dtypes'],
+    }
+    # column checks computed by each check_* method
+    check_column_checks = {
+        'check_missing_values': ['missing_values_check'],
+        'check_cardinality': ['critical_cardinality_check', 'low_cardinality_check'],
+        'check_critical_cardinality': ['critical_cardinality_check'],
+        'check_low_cardinality': ['low_cardinality_check'],
+        'check_duplicate_columns': ['duplicate_columns_check'],
+        'check_memory_issue': ['memory_check'],
+    }
+    # check_* methods running other check_* methods
+    composite_checks = {
+        'check_cardinality': ['check_critical_cardinality', 'check_low_cardinality'],
+    }
+
+    def __init__(self, data, metadata, profiles=None, n_jobs=1, checks=None):
+        """
+        data: the datasets by key, None to check the profiles alone (e.g. merged from a CheckState), which then
+            need the duplicate column pairs and class counts that checks otherwise work out from the data
+        checks: the check_* methods to run (of those the checker runs), all if None
+        """
+        if data is None and profiles is None:
+            raise ValueError('profiles are needed to check without data')
         self.data = data
         self.metadata = metadata
+        self.profiles = build_profiles(data) if profiles is None else profiles
+        self.n_jobs = n_jobs
+        self.selected_checks = checks
+        self.column_check_results = dict()
         self.data_checks = dict()
         self.initiate_check_output()
 
     def initiate_check_output(self):
         self.data_checks['column_checks'] = dict()
-        for key, dataset in self.data.items():
+        for key in self.data_keys():
             self.data_checks['column_checks'][key] = dict()
         # TODO add another check for trait vs test relative comparison output
 
+    def run_checks(self, checks):
+        """
+        runs the named check_* methods in the given order. with n_jobs > 1 their column checks are first
+        computed concurrently per dataset, the results are then stored in the given order,
+        so the output is the same as a serial run. only the selected checks run, if any are selected
+        """
+        if self.selected_checks is not None:
+            checks = self.select_checks(checks)
+        if self.n_jobs != 1:
+            with dcp.stage('precompute_column_checks', 'checker') as record:
+                self.precompute_column_checks(checks)
+                record['rows'], record['cols'] = self.checked_shape()
+        for check in checks:
+            with dcp.stage(check, 'checker') as record:
+                getattr(self, check)()
+                record['rows'], record['cols'] = self.checked_shape()
+
+    def select_checks(self, checks):
+        """the selected checks among checks, composite checks replaced by their selected parts if not selected"""
+        selected = []
+        for check in checks:
+            if check in self.selected_checks:
+                parts = [check]
+            else:
+                parts = [t for t in self.composite_checks.get(check, []) if t in self.selected_checks]
+            selected.extend(t for t in parts if t not in selected)
+        return selected
+
+    def data_keys(self):
+        """keys of the checked datasets"""
+        return list(self.profiles.keys() if self.data is None else self.data.keys())
+
+    def dataset(self, key, needed_by):
+        """the dataset of key, raises ValueError when only profiles are checked"""
+        if self.data is None:
+            raise ValueError('{0} needs the {1} data, the profiles alone do not answer it'.format(needed_by, key))
+        return self.data[key]
+
+    def checked_shape(self):
+        """rows and columns of the checked datasets, summed over the datasets"""
+        return sum(t.n_rows for t in self.profiles.values()), sum(len(t.columns) for t in self.profiles.values())
+
+    def precompute_column_checks(self, checks):
+        names = []
+        for check in checks:
+            names.extend(t for t in self.check_column_checks.get(check, []) if t not in names)
+        tasks = dict()
+        for key in self.data_keys():
+            for name in names:
+                dependencies = self.column_check_dependencies[name]
+                missing = [t for t in dependencies if (t not in self.column_check_dependencies) and
+                           (t not in self.metadata)]
+                if missing:
+                    raise ValueError('{0} needs {1} in metadata'.format(name, missing))
+                tasks[(name, key)] = (partial(getattr(self, name), key),
+                                      [(t, key) for t in dependencies if t in self.column_check_dependencies])
+        self.column_check_results.update(run_tasks(tasks, self.n_jobs))
+
+    def get_column_check(self, name, key):
+        """precomputed result of a column check for a dataset, computed now if not available"""
+        if (name, key) in self.column_check_results:
+            return self.column_check_results[(name, key)]
+        return getattr(self, name)(key)
+
     def check_missing_values(self):
         """
         returns column-wise PASS/FAIL:
@@ -34,13 +132,15 @@ class BaseDataChecker(object):
             not all values are missing (as this is checked in cardinality check)
         PASS: Otherwise
         """
-        for key in self.data.keys():
-            any_missing_val_check = self.data[key].isnull().any(axis=0).values
-            notall_missing_val_check = np.invert(self.data[key].isnull().all(axis=0).values)
-            final_check = np.multiply(any_missing_val_check, notall_missing_val_check)
-            missing_val_check = ['FAIL' if t else 'PASS' for t in final_check]
-            self.data_checks['column_checks'][key]['MISSING_VALUE_CHECK'] = dict(zip(self.data[key].columns,
-                                                                                     missing_val_check))
+        for key in self.data_keys():
+            self.data_checks['column_checks'][key]['MISSING_VALUE_CHECK'] = \
+                self.get_column_check('missing_values_check', key)
+
+    def missing_values_check(self, key):
+        any_missing_val_check = self.profiles[key].any_null.values
+        notall_missing_val_check = np.invert(self.profiles[key].all_null.values)
+        final_check = np.multiply(any_missing_val_check, notall_missing_val_check)
+        return CheckResults.from_mask(self.profiles[key].columns, final_check)
 
     def check_cardinality(self):
         self.check_critical_cardinality()
@@ -52,19 +152,20 @@ class BaseDataChecker(object):
             FAIL: if completely unique or single unique value or empty
             PASS: Otherwise
         """
-        for key in self.data.keys():
-            max_cardinal_cols = np.equal(self.data[key].nunique(axis=0).values,
-                                         self.data[key].shape[0])
-            over_range_cols = self.data[key].apply(lambda x: get_range(x), axis=0) >= self.data[key].shape[0]
-            min_cardinal_cols = np.equal(self.data[key].nunique(axis=0).values, 1)
-            complete_missing_cols = self.data[key].isnull().all(axis=0).values
+        for key in self.data_keys():
+            self.data_checks['column_checks'][key]['CRITICAL_CARDINALITY_CHECK'] = \
+                self.get_column_check('critical_cardinality_check', key)
 
-            cardinality_boolean = np.logical_or(np.logical_and(max_cardinal_cols, over_range_cols),
-                                                np.logical_or(min_cardinal_cols, complete_missing_cols))
-            cardinality_check = ['FAIL' if t else 'PASS' for t in cardinality_boolean]
+    def critical_cardinality_check(self, key):
+        profile = self.profiles[key]
+        max_cardinal_cols = np.equal(profile.distinct_count.values, profile.n_rows)
+        over_range_cols = profile.range.values >= profile.n_rows
+        min_cardinal_cols = np.equal(profile.distinct_count.values, 1)
+        complete_missing_cols = profile.all_null.values
 
-            self.data_checks['column_checks'][key]['CRITICAL_CARDINALITY_CHECK'] = dict(zip(self.data[key].columns,
-                                                                                            cardinality_check))
+        cardinality_boolean = np.logical_or(np.logical_and(max_cardinal_cols, over_range_cols),
+                                            np.logical_or(min_cardinal_cols, complete_missing_cols))
+        return CheckResults.from_mask(profile.columns, cardinality_boolean)
 
     def check_low_cardinality(self):
         """
@@ -72,19 +173,19 @@ class BaseDataChecker(object):
             FAIL: if low number of unique values specified by self.metadata['cat_to_num_threshold']
             PASS: Otherwise
         """
-        for key in self.data.keys():
-            numeric_cols = [key for key, val in self.metadata['feature_dtypes'][key].items()
-                            if (val in ['float', 'int'])]
-            other_cols = [t for t in self.data[key].columns if t not in numeric_cols]
-            numeric_data = self.data[key][numeric_cols]
-            low_cardinality_boolean = np.less_equal(numeric_data.nunique(axis=0).values,
-                                                    self.metadata['cat_to_num_threshold'])
-            low_cardinality_check = ['FAIL' if t else 'PASS' for t in low_cardinality_boolean]
-
-            self.data_checks['column_checks'][key]['LOW_CARDINALITY_CHECK'] = dict(zip(numeric_cols,
-                                                                                       low_cardinality_check))
-            self.data_checks['column_checks'][key]['LOW_CARDINALITY_CHECK'].update(
-                dict(zip(other_cols, ['Not_Applicable']*len(other_cols))))
+        for key in self.data_keys():
+            self.data_checks['column_checks'][key]['LOW_CARDINALITY_CHECK'] = \
+                self.get_column_check('low_cardinality_check', key)
+
+    def low_cardinality_check(self, key):
+        profile = self.profiles[key]
+        feature_dtypes = pd.Series(self.metadata['feature_dtypes'][key], dtype=object)
+        numeric_cols = feature_dtypes.reindex(profile.columns).isin(['float', 'int']).values
+        low_cardinality_boolean = np.less_equal(profile.distinct_count.values, self.metadata['cat_to_num_threshold'])
+        # numeric columns first, then the Not_Applicable ones
+        order = np.concatenate([np.flatnonzero(numeric_cols), np.flatnonzero(~numeric_cols)])
+        return CheckResults.from_mask(profile.columns[order], low_cardinality_boolean[order],
+                                      not_applicable=~numeric_cols[order])
 
     def check_validation_split(self):
         '''
@@ -92,7 +193,7 @@ class BaseDataChecker(object):
         for either total or train
         '''
         self.data_checks['validation_reco'] = dict()
-        num_samples = self.data[self.metadata['main_data_key']].shape[0]
+        num_samples = self.data_n_rows(self.metadata['main_data_key'])
         if num_samples > 20000:
             self.data_checks['validation_reco']['val_type'] = 'train_test_split'
             # 10% of data held for validation and metric tuning
@@ -101,6 +202,12 @@ class BaseDataChecker(object):
             self.data_checks['validation_reco']['val_type'] = 'cross_val'
             self.data_checks['validation_reco']['val_size'] = 10 if num_samples < 1000 else 3
 
+    def data_n_rows(self, key):
+        """number of rows of a dataset, of all its rows when the checks run on a sample"""
+        if 'sample' in self.metadata:
+            return self.metadata['sample'][key]['n_rows']
+        return self.profiles[key].n_rows
+
     def check_train_test_dtypes(self):
         """
         testing only for train_test type:
@@ -111,45 +218,41 @@ class BaseDataChecker(object):
         if self.metadata['split_type'] == 'total':
             return 1
         else:
-            self.data_checks['column_checks']['test']['DTYPE_CHECK'] = dict()
-            for test_feature in self.metadata['features']['test']:
-                check_bool = self.metadata['feature_dtypes']['train'][test_feature] == \
-                             self.metadata['feature_dtypes']['test'][test_feature]
-                self.data_checks['column_checks']['test']['DTYPE_CHECK'][test_feature] = \
-                    'PASS' if check_bool else 'FAIL'
+            test_features = self.metadata['features']['test']
+            dtype_issue = [self.metadata['feature_dtypes']['train'][t] != self.metadata['feature_dtypes']['test'][t]
+                           for t in test_features]
+            self.data_checks['column_checks']['test']['DTYPE_CHECK'] = CheckResults.from_mask(test_features,
+                                                                                              dtype_issue)
 
     def check_duplicate_columns(self):
-
-        def check_if_equal(ind0, ind1):
-            col_names = [data.columns[ind0], data.columns[ind1]]
-            df = data[col_names]
-            df = df.dropna()
-            return df[col_names[0]].equals(df[col_names[1]])
-
-        def find_actual_base(bases):
-            if len(bases) == 1:
-                return bases[0]
-            else:
-                df = data[data.columns[bases]]
-                not_na_proportions = df.notnull().sum(axis=0)
-                col_ind_least_na = bases[not_na_proportions.argmax()]
-                return col_ind_least_na
-
-        for key in self.data.keys():
-            data = self.data[key]
-            col_combinations = [list(x) for x in itertools.combinations(np.arange(data.shape[1]), 2)]
-            col_equals = [check_if_equal(col_ind1, col_ind2) for col_ind1, col_ind2 in col_combinations]
-            col_duplicates = [col_combinations[i] for i, t in enumerate(col_equals) if t]
-            duplicate_check = ['PASS'] * data.shape[1]
-            self.data_checks['column_checks'][key]['DUPLICATE_CHECK'] = dict(zip(self.data[key].columns,
-                                                                                 duplicate_check))
-            for col1_ind, col2_ind in col_duplicates:
-                # considering the leftmost column as the base
-                col2_bases = [t0 for t0, t1 in col_duplicates if t1 == col2_ind]
-                col2_base = find_actual_base(col2_bases)
-                self.data_checks['column_checks'][key]['DUPLICATE_CHECK'][data.columns[col2_ind]] = 'FAIL'
-                self.data_checks['column_checks'][key]['DUPLICATE_CHECK'][str(data.columns[col2_ind] + '_BASE')] = \
-                    data.columns[col2_base]
+        """
+        returns column-wise PASS/FAIL:
+            FAIL: if column equals a column on its left (rows with missing values in either are ignored)
+            PASS: Otherwise
+        FAIL columns also get a '<col>_BASE' entry naming the equal column with the least missing values.
+        candidate columns are bucketed by value fingerprints, so only columns within a bucket are compared
+        """
+        for key in self.data_keys():
+            self.data_checks['column_checks'][key]['DUPLICATE_CHECK'] = \
+                self.get_column_check('duplicate_columns_check', key)
+
+    def duplicate_columns_check(self, key):
+        profile = self.profiles[key]
+        columns = profile.columns
+        if profile.duplicate_pairs is None:
+            profile.duplicate_pairs = du.find_duplicate_columns(self.dataset(key, 'duplicate_columns_check'),
+                                                                profile.all_null.values)
+        col_duplicates = profile.duplicate_pairs
+        duplicate_check = CheckResults.from_mask(columns, np.zeros(len(columns), dtype=bool))
+        if not col_duplicates:
+            return duplicate_check
+        not_na_counts = profile.not_null_count.values
+        for col2_ind, col2_bases in du.group_duplicate_bases(col_duplicates).items():
+            # considering the leftmost column with least missing values as the base
+            col2_base = du.least_missing_base(col2_bases, not_na_counts)
+            duplicate_check.codes[col2_ind] = FAIL
+            duplicate_check.bases[columns[col2_ind]] = columns[col2_base]
+        return duplicate_check
 
     def check_target_var(self):
         """
@@ -167,24 +270,44 @@ class BaseDataChecker(object):
                 raise ValueError('unknown status for target column {0} {1}'.format(key, val[main_target_key]))
 
     def check_memory_issue(self):
-        """figure out if the total computation exceeds the memory limit"""
-        pass
+        """
+        returns column-wise PASS/FAIL:
+            FAIL: if the column fits in a smaller dtype without loss (smaller int, float32,
+                category for discreet string columns)
+            PASS: Otherwise
+            Not_Applicable: for data streamed in chunks or checked from profiles alone
+        the deep memory footprint per column, before and after reducing dtypes, goes to data_checks['memory_usage']
+        """
+        self.data_checks['memory_usage'] = dict()
+        for key in self.data_keys():
+            memory_check, memory_usage = self.get_column_check('memory_check', key)
+            self.data_checks['column_checks'][key]['MEMORY_CHECK'] = memory_check
+            if memory_usage is not None:
+                self.data_checks['memory_usage'][key] = memory_usage
+
+    def memory_check(self, key):
+        columns = self.profiles[key].columns
+        if self.data is None or not isinstance(self.data[key], pd.DataFrame):
+            return CheckResults.not_applicable(columns), None
+        dataset = self.data[key]
+        feature_dtypes = self.metadata['feature_dtypes'].get(key, dict())
+        to_category_cols = [col for col, val in feature_dtypes.items() if val == 'string_discreet']
+        reduced_dtypes, memory_usage = mu.memory_usage(dataset, to_category_cols)
+        memory_issue = [not reduced_dtypes[col] == dtype for col, dtype in dataset.dtypes.items()]
+        logger.debug('{0} data takes {1} bytes, {2} bytes with reduced dtypes'.format(
+            key, memory_usage['total_bytes'], memory_usage['reduced_total_bytes']))
+        # the columns of the data, processing may have removed profiled columns since
+        return CheckResults.from_mask(dataset.columns, memory_issue), memory_usage
 
 
 class RegressionDataChecker(BaseDataChecker):
-    def __init__(self, data, metadata):
-        super().__init__(data, metadata)
+    def __init__(self, data, metadata, profiles=None, n_jobs=1, checks=None):
+        super().__init__(data, metadata, profiles, n_jobs, checks)
 
     def run(self):
-        self.check_missing_values()
-        self.check_cardinality()
-        self.check_low_cardinality()
-        self.check_validation_split()
-        self.check_memory_issue()
-        self.check_frequency()
-        self.check_train_test_dtypes()
-        self.check_duplicate_columns()
-        self.check_target_var()
+        self.run_checks(['check_missing_values', 'check_cardinality', 'check_low_cardinality',
+                         'check_validation_split', 'check_memory_issue', 'check_frequency',
+                         'check_train_test_dtypes', 'check_duplicate_columns', 'check_target_var'])
         return self.metadata, self.data_checks
 
     def check_frequency(self):
@@ -193,32 +316,49 @@ class RegressionDataChecker(BaseDataChecker):
 
 
 class ClassificationDataChecker(BaseDataChecker):
-    def __init__(self, data, metadata):
-        super().__init__(data, metadata)
+    def __init__(self, data, metadata, profiles=None, n_jobs=1, checks=None):
+        super().__init__(data, metadata, profiles, n_jobs, checks)
 
     def run(self):
-        self.check_missing_values()
-        self.check_cardinality()
-        self.check_low_cardinality()
-        self.check_validation_split()
-        self.check_class_balance()
-        self.check_memory_issue()
-        self.check_train_test_dtypes()
-        self.check_duplicate_columns()
-        self.check_target_var()
+        self.run_checks(['check_missing_values', 'check_cardinality', 'check_low_cardinality',
+                         'check_validation_split', 'check_class_balance', 'check_memory_issue',
+                         'check_train_test_dtypes', 'check_duplicate_columns', 'check_target_var'])
         return self.metadata, self.data_checks
 
     def check_class_balance(self):
-        target_col = self.metadata['main_target_col']
-        data = self.data[self.metadata['main_data_key']]
-        classes = data[target_col].unique()
-        class_num_rows = [data[data[target_col] == t].__len__() for t in classes]
+        """
+        returns PASS/FAIL in data_checks['data_checks']['class_balance_check']:
+            FAIL: if the minority class has less than 20% of the rows of the majority class
+            PASS: Otherwise
+        the class histogram, per-class share of the labelled rows and imbalance ratio (majority/minority
+        count) are added to metadata. rows without target value are not counted in any class.
+        on stratified samples the classes are counted on all rows
+        """
+        main_data_key = self.metadata['main_data_key']
+        profile = self.profiles[main_data_key]
+        n_rows = profile.n_rows
+        if profile.class_counts is None:
+            target = self.dataset(main_data_key, 'check_class_balance')[self.metadata['main_target_col']]
+            profile.class_counts = dcu.get_class_counts(target)
+        class_counts = profile.class_counts
+        if 'class_counts' in self.metadata.get('sample', dict()).get(main_data_key, dict()):
+            # stratified samples count the classes on all rows
+            class_counts = self.metadata['sample'][main_data_key]['class_counts']
+            n_rows = self.data_n_rows(main_data_key)
+        if not class_counts:
+            raise ValueError('target column {0} has no values'.format(self.metadata['main_target_col']))
+        classes = list(class_counts.keys())
+        class_num_rows = list(class_counts.values())
         minority_class_ind = class_num_rows.index(min(class_num_rows))
         majority_class_ind = class_num_rows.index(max(class_num_rows))
         self.metadata['minority_class'] = classes[minority_class_ind]
         self.metadata['majority_class'] = classes[majority_class_ind]
-        self.metadata['minority_class_%'] = int(100 * class_num_rows[minority_class_ind] / data.shape[0])
-        self.metadata['majority_class_%'] = int(100 * class_num_rows[majority_class_ind] / data.shape[0])
+        self.metadata['minority_class_%'] = int(100 * class_num_rows[minority_class_ind] / n_rows)
+        self.metadata['majority_class_%'] = int(100 * class_num_rows[majority_class_ind] / n_rows)
+        self.metadata['class_counts'] = dict(class_counts)
+        n_labelled = sum(class_num_rows)
+        self.metadata['class_shares'] = {t: count / n_labelled for t, count in class_counts.items()}
+        self.metadata['imbalance_ratio'] = class_num_rows[majority_class_ind] / class_num_rows[minority_class_ind]
         self.data_checks['data_checks'] = dict()
         if self.metadata['minority_class_%']/self.metadata['majority_class_%'] < 0.2:
             self.data_checks['data_checks']['class_balance_check'] = 'FAIL'
@@ -227,15 +367,11 @@ class ClassificationDataChecker(BaseDataChecker):
 
 
 class UnsupervisedDataChecker(BaseDataChecker):
-    def __init__(self, data, metadata):
-        super().__init__(data, metadata)
+    def __init__(self, data, metadata, profiles=None, n_jobs=1, checks=None):
+        super().__init__(data, metadata, profiles, n_jobs, checks)
 
     def run(self):
         # TODO add check for only 'total' type as 'train_test' might not make sense here
-        self.check_missing_values()
-        self.check_cardinality()
-        self.check_low_cardinality()
-        self.check_validation_split()
-        self.check_memory_issue()
-        self.check_duplicate_columns()
+        self.run_checks(['check_missing_values', 'check_cardinality', 'check_low_cardinality',
+                         'check_validation_split', 'check_memory_issue', 'check_duplicate_columns'])
         return self.metadata, self.data_checks
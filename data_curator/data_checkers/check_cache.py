@@ -0,0 +1,113 @@
+"""
+on-disk cache of checker results (metadata, data_checks), keyed by the content of the data files, the options the
+checks depend on and the checker version. entries are pickles named by their key, the least recently used
+are evicted once the cache exceeds max_bytes.
+"""
+import glob
+import hashlib
+import os
+import pickle
+import data_curator.utils.file_utils as fu
+
+import logging
+logger = logging.getLogger(__name__)
+
+# bump when check outputs change in a way the source digest does not capture (e.g. a dependency upgrade)
+CHECKS_VERSION = 1
+CACHE_EXT = '.pkl'
+
+
+def checker_version():
+    """CHECKS_VERSION and a digest of the reader, checker and utils sources"""
+    package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    digest = hashlib.blake2b(digest_size=16)
+    for subpackage in ['data_readers', 'data_checkers', 'utils']:
+        for filename in sorted(glob.glob(os.path.join(package_dir, subpackage, '*.py'))):
+            with open(filename, 'rb') as f:
+                digest.update(f.read())
+    return '{0}-{1}'.format(CHECKS_VERSION, digest.hexdigest())
+
+
+class CheckCache(object):
+    def __init__(self, cache_dir, max_bytes=1 << 30, full_hash=False):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.full_hash = full_hash
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, datafiles, options):
+        """
+        datafiles: {data key: filename or list of filenames}, options: the settings the checks depend on
+            (target, columns, ..)
+        """
+        digest = hashlib.sha256(checker_version().encode())
+        for data_key in sorted(datafiles.keys()):
+            filenames = datafiles[data_key] if isinstance(datafiles[data_key], list) else [datafiles[data_key]]
+            for filename in filenames:
+                digest.update('{0}:{1};'.format(data_key, fu.file_fingerprint(filename, self.full_hash)).encode())
+        digest.update(repr(sorted(options.items())).encode())
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, key + CACHE_EXT)
+
+    def get(self, key):
+        """cached value or None, a hit marks the entry as recently used"""
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            logger.debug('check cache miss {0}'.format(key))
+            return None
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            logger.warning('unreadable check cache entry {0} removed'.format(path))
+            self.invalidate(key)
+            return None
+        os.utime(path)
+        logger.info('checker results read from cache {0}'.format(path))
+        return value
+
+    def put(self, key, value):
+        path = self.path(key)
+        tmp_path = '{0}.{1}.tmp'.format(path, os.getpid())
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        logger.debug('checker results cached in {0}'.format(path))
+        self.evict()
+
+    def entries(self):
+        """(path, size, last used) of the cache entries, least recently used first"""
+        entries = []
+        for path in glob.glob(os.path.join(self.cache_dir, '*' + CACHE_EXT)):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((path, stat.st_size, stat.st_mtime_ns))
+        return sorted(entries, key=lambda t: t[2])
+
+    def evict(self):
+        entries = self.entries()
+        total_bytes = sum(t[1] for t in entries)
+        for path, size, last_used in entries:
+            if total_bytes <= self.max_bytes:
+                break
+            self.remove(path)
+            total_bytes -= size
+            logger.debug('evicted check cache entry {0}'.format(path))
+
+    def invalidate(self, key=None):
+        """removes the entry of key, or every entry if key is None"""
+        paths = [self.path(key)] if key is not None else [t[0] for t in self.entries()]
+        for path in paths:
+            self.remove(path)
+        logger.info('invalidated {0} check cache entries'.format(len(paths) if key is None else 1))
+
+    @staticmethod
+    def remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,120 @@
+"""
+array-backed results of a column check over the columns of a dataset: a status code (int8) per column, on the
+column index the checks of a dataset share, instead of a dict of status strings per column.
+    codes: PASS, FAIL or NOT_APPLICABLE, the status of a code is STATUSES[code]
+    bases: {column: base column} of the columns failing the duplicate check
+a CheckResults reads as the dict of status strings ({column: status, '<column>_BASE': base column}),
+which to_dict builds for the json output only. queries over many columns (failed_columns, statuses) are masks
+over the codes
+"""
+from collections.abc import Mapping
+import numpy as np
+import pandas as pd
+
+import logging
+logger = logging.getLogger(__name__)
+
+STATUSES = ['PASS', 'FAIL', 'Not_Applicable']
+PASS, FAIL, NOT_APPLICABLE = 0, 1, 2
+BASE_SUFFIX = '_BASE'
+# status of a code, None for columns without a result
+status_values = np.array(STATUSES + [None], dtype=object)
+
+
+def as_check_results(statuses):
+    """CheckResults of check results given as CheckResults or as a dict of status strings"""
+    if isinstance(statuses, CheckResults):
+        return statuses
+    return CheckResults.from_dict(statuses)
+
+
+class CheckResults(Mapping):
+    def __init__(self, columns, codes, bases=None):
+        self.columns = columns if isinstance(columns, pd.Index) else pd.Index(columns, dtype=object)
+        self.codes = np.asarray(codes, dtype=np.int8)
+        self.bases = dict() if bases is None else bases
+
+    @classmethod
+    def from_mask(cls, columns, fail, not_applicable=None):
+        """FAIL where fail, NOT_APPLICABLE where not_applicable, PASS elsewhere (boolean arrays by column)"""
+        codes = np.where(np.asarray(fail, dtype=bool), FAIL, PASS).astype(np.int8)
+        if not_applicable is not None:
+            codes[np.asarray(not_applicable, dtype=bool)] = NOT_APPLICABLE
+        return cls(columns, codes)
+
+    @classmethod
+    def not_applicable(cls, columns):
+        return cls(columns, np.full(len(columns), NOT_APPLICABLE, dtype=np.int8))
+
+    @classmethod
+    def from_dict(cls, statuses):
+        """CheckResults of a dict of status strings, raises ValueError for unknown statuses"""
+        bases = {t[:-len(BASE_SUFFIX)]: val for t, val in statuses.items()
+                 if isinstance(t, str) and t.endswith(BASE_SUFFIX) and val not in STATUSES}
+        base_keys = set(col + BASE_SUFFIX for col in bases)
+        columns = [t for t in statuses.keys() if t not in base_keys]
+        unknown = set(statuses[t] for t in columns) - set(STATUSES)
+        if unknown:
+            raise ValueError('unknown check statuses {0}'.format(sorted(unknown, key=str)))
+        codes = [STATUSES.index(statuses[t]) for t in columns]
+        return cls(columns, codes, bases)
+
+    def __getitem__(self, key):
+        try:
+            return STATUSES[self.codes[self.columns.get_loc(key)]]
+        except KeyError:
+            pass
+        if isinstance(key, str) and key.endswith(BASE_SUFFIX) and key[:-len(BASE_SUFFIX)] in self.bases:
+            return self.bases[key[:-len(BASE_SUFFIX)]]
+        raise KeyError(key)
+
+    def __iter__(self):
+        yield from self.columns
+        for col in self.bases:
+            yield col + BASE_SUFFIX
+
+    def __len__(self):
+        return len(self.columns) + len(self.bases)
+
+    def __repr__(self):
+        return '{0}({1})'.format(type(self).__name__, self.to_dict())
+
+    def to_dict(self):
+        """the dict of status strings: {column: status, '<column>_BASE': base column}"""
+        statuses = dict(zip(self.columns, status_values[self.codes].tolist()))
+        statuses.update((col + BASE_SUFFIX, base) for col, base in self.bases.items())
+        return statuses
+
+    def failed_columns(self, exclude=()):
+        """the columns failing the check, in column order, but those in exclude"""
+        failed = self.codes == FAIL
+        if len(exclude):
+            failed &= ~self.columns.isin(list(exclude))
+        return self.columns[failed].tolist()
+
+    def statuses(self, columns):
+        """the status of each of columns (None for columns without a result) as an object array"""
+        positions = self.columns.get_indexer(columns)
+        codes = np.full(len(positions), len(STATUSES), dtype=np.int8)
+        found = positions >= 0
+        codes[found] = self.codes[positions[found]]
+        return status_values[codes]
+
+    def base_of(self, columns):
+        """the base column of each of columns (None for columns that are not duplicates)"""
+        return [self.bases.get(t) for t in columns]
+
+    def update(self, other):
+        """
+        replaces the results of the columns of other (CheckResults), and their duplicate bases, by those of other.
+        columns new to these results are added after the others
+        """
+        positions = self.columns.get_indexer(other.columns)
+        new = positions < 0
+        self.codes[positions[~new]] = other.codes[~new]
+        if new.any():
+            self.columns = self.columns.append(other.columns[new])
+            self.codes = np.concatenate([self.codes, other.codes[new]])
+        updated = set(other.columns)
+        self.bases = {col: base for col, base in self.bases.items() if col not in updated}
+        self.bases.update(other.bases)
@@ -0,0 +1,43 @@
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def run_tasks(tasks, n_jobs=1, done=()):
+    """
+    runs tasks once all their dependencies have finished, up to n_jobs at a time in a thread pool
+    (pandas and numpy release the GIL in their heavy loops).
+    tasks: dict of name -> (function without arguments, list of dependency names), in an order that
+        is valid for serial execution. dependencies may also name steps already finished (done)
+    returns dict of name -> function result, in the order of tasks
+    """
+    for name, (func, dependencies) in tasks.items():
+        unknown = [t for t in dependencies if (t not in tasks) and (t not in done)]
+        if unknown:
+            raise ValueError('task {0} depends on unknown tasks {1}'.format(name, unknown))
+
+    results = dict()
+    if n_jobs == 1:
+        for name, (func, dependencies) in tasks.items():
+            pending = [t for t in dependencies if (t not in results) and (t not in done)]
+            if pending:
+                raise ValueError('task {0} runs before its dependencies {1}'.format(name, pending))
+            results[name] = func()
+        return results
+
+    pending = dict(tasks)
+    running = dict()
+    with ThreadPoolExecutor(max_workers=n_jobs) as pool:
+        while pending or running:
+            ready = [name for name, (func, dependencies) in pending.items()
+                     if all((t in results) or (t in done) for t in dependencies)]
+            for name in ready:
+                running[pool.submit(pending.pop(name)[0])] = name
+            if not running:
+                raise ValueError('circular dependencies between tasks {0}'.format(list(pending)))
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                results[running.pop(future)] = future.result()
+    logger.debug('{0} tasks run with {1} jobs'.format(len(tasks), n_jobs))
+    return {name: results[name] for name in tasks}
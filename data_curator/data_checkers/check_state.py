@@ -0,0 +1,109 @@
+"""
+persisted state of the data checks over data growing by appended partitions (files).
+the state holds per dataset key the StreamingColumnProfile merged over the partitions checked so far, made of
+mergeable accumulators (null counts, distinct sketches, min/max, class counts, duplicate column pairs),
+and the fingerprints of those partitions. new partitions are profiled on their own and merged in,
+so rechecking costs the new rows only. the merged profile is the one streaming all partitions would give.
+distinct counts the sketches leave undecided for the critical cardinality check are settled by reading just
+those columns of the partitions again (see StreamingColumnProfile.settle_distinct).
+partitions cannot be taken out of the state: a changed partition, other options or another checker version
+need a new state
+"""
+import os
+import pickle
+from data_curator.data_checkers.check_cache import checker_version
+from data_curator.data_checkers.column_profile import StreamingColumnProfile
+from data_curator.data_readers.file_readers import file_readers
+import data_curator.utils.file_utils as fu
+import data_curator.data_curator_profiler as dcp
+
+import logging
+logger = logging.getLogger(__name__)
+
+# rows per chunk when profiling a partition
+PARTITION_CHUNKSIZE = 1 << 18
+
+
+class CheckState(object):
+    def __init__(self, options):
+        """options: the settings the checks depend on (target, columns, ..), fixed for the life of the state"""
+        self.options = options
+        self.version = checker_version()
+        self.partitions = dict()
+        self.profiles = dict()
+
+    def is_new(self, key, name, fingerprint):
+        """whether the partition still has to be merged, raises ValueError if it changed since it was merged"""
+        merged_fingerprint = self.partitions.get(key, dict()).get(name)
+        if merged_fingerprint is None:
+            return True
+        if merged_fingerprint != fingerprint:
+            raise ValueError('partition {0} changed since it was checked, its rows cannot be taken out of the '
+                             'check state: remove the state to check all partitions again'.format(name))
+        return False
+
+    def add_partition(self, key, name, fingerprint, chunks, target_col=None):
+        """
+        profiles the chunks of a new partition and merges them into the profile of the dataset key.
+        the partition columns may come in another order than in the checked partitions
+        """
+        if key in self.profiles and list(chunks.columns) != list(self.profiles[key].columns):
+            if set(chunks.columns) != set(self.profiles[key].columns):
+                raise ValueError('partition {0} columns differ from the checked partitions of {1} data'.format(
+                    name, key))
+            columns = self.profiles[key].columns
+            chunks = (chunk[columns] for chunk in chunks)
+        with dcp.stage('add_partition', 'checker') as record:
+            profile = StreamingColumnProfile(chunks, target_col)
+            record['rows'], record['cols'] = profile.n_rows, len(profile.columns)
+        if key in self.profiles:
+            self.profiles[key].merge(profile)
+        else:
+            self.profiles[key] = profile
+        self.partitions.setdefault(key, dict())[name] = fingerprint
+        logger.info('merged {0} rows of partition {1}, {2} data has {3} rows in {4} partitions'.format(
+            profile.n_rows, name, key, self.profiles[key].n_rows, len(self.partitions[key])))
+
+    def settle_distinct(self, key, chunksize=PARTITION_CHUNKSIZE):
+        """
+        settles the unsettled distinct counts of the profile of the dataset key from its partitions, of which
+        only these columns are read. they stay estimates if a partition is missing or changed since it was merged
+        """
+        profile = self.profiles[key]
+        columns = profile.unsettled_columns()
+        if not columns:
+            return
+        partitions = self.partitions[key]
+        changed = [t for t in sorted(partitions) if not os.path.isfile(t) or fu.file_fingerprint(t) != partitions[t]]
+        if changed:
+            logger.warning('partitions {0} missing or changed, estimated distinct counts of {1} may miss their '
+                           'critical cardinality'.format(changed, columns))
+            return
+        with dcp.stage('settle_distinct', 'checker') as record:
+            profile.settle_distinct(chunk for name in sorted(partitions)
+                                    for chunk in file_readers[os.path.splitext(name)[1]](name, columns).read_chunks(
+                                        chunksize))
+            record['rows'], record['cols'] = profile.n_rows, len(columns)
+
+    def save(self, filename):
+        tmp_filename = '{0}.{1}.tmp'.format(filename, os.getpid())
+        with open(tmp_filename, 'wb') as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_filename, filename)
+        logger.debug('check state saved to {0}'.format(filename))
+
+
+def load_state(filename, options):
+    """the check state saved in filename, a new one if there is none"""
+    if not os.path.exists(filename):
+        logger.info('no check state in {0}, starting a new one'.format(filename))
+        return CheckState(options)
+    with open(filename, 'rb') as f:
+        state = pickle.load(f)
+    if state.version != checker_version():
+        raise ValueError('check state {0} was built by another checker version, remove it to check all '
+                         'partitions again'.format(filename))
+    if state.options != options:
+        raise ValueError('check state {0} was built with options {1}, not {2}'.format(
+            filename, state.options, options))
+    return state
@@ -0,0 +1,276 @@
+import data_curator.utils.data_checker_utils as dcu
+from data_curator.data_checkers.accumulators import DtypeAccumulator, NullCountAccumulator, MinMaxAccumulator, \
+    DistinctCountAccumulator, DuplicateColumnsAccumulator, ClassCountAccumulator, normalize_chunk
+from data_curator.data_checkers.check_runner import run_tasks
+import data_curator.data_checkers.column_shards as cs
+import data_curator.utils.duplicate_utils as du
+from data_curator.utils.sketch_utils import approximate_distinct_count, EXACT_DISTINCT_LIMIT
+import data_curator.data_curator_profiler as dcp
+from functools import partial
+import numpy as np
+import pandas as pd
+import logging
+
+logger = logging.getLogger(__name__)
+
+PREFIX_ROWS = 1 << 16
+
+
+def approximate_distinct(values, relative_error, thresholds=()):
+    """
+    distinct count of (non-null) values, returns (count, is_exact).
+    columns with at most EXACT_DISTINCT_LIMIT distinct values in their first PREFIX_ROWS rows are counted exactly,
+    as are counts near thresholds. the others are estimated from value hashes, so no hash table of the values
+    is built. the prefix count bounds the estimate from below, which keeps small thresholds decided exactly
+    """
+    prefix_count = len(pd.unique(values[:PREFIX_ROWS]))
+    if len(values) <= PREFIX_ROWS or prefix_count <= EXACT_DISTINCT_LIMIT:
+        return len(pd.unique(values)), True
+    if values.dtype.kind == 'f':
+        values = values + 0.0
+    hashes = pd.util.hash_array(values, categorize=False)
+    count, is_exact = approximate_distinct_count(hashes, relative_error, thresholds)
+    return max(count, prefix_count), is_exact
+
+
+def column_statistics(col, n_rows, is_numeric, known, distinct_error=None):
+    """
+    (null count, distinct count, whether it is exact, min, max) of a column (series), min and max only for
+    numeric columns (NaN otherwise). known: statistics of the column from the data file
+    """
+    col_min, col_max = np.nan, np.nan
+    if 'null_count' in known and (not is_numeric or 'min' in known or known['null_count'] == n_rows):
+        # statistics answer all but the distinct count, which skips the null mask
+        uniques = pd.unique(col.values)
+        if is_numeric and 'min' in known:
+            col_min, col_max = known['min'], known['max']
+        return known['null_count'], len(uniques) - np.count_nonzero(pd.isnull(uniques)), True, col_min, col_max
+
+    nulls = col.isnull().values
+    values = col.values[~nulls]
+    null_count = nulls.sum()
+    distinct_exact = True
+    if distinct_error is None:
+        distinct_count = len(pd.unique(values))
+    else:
+        # only the all unique decision (critical cardinality) can be near a high count
+        thresholds = [n_rows] if null_count == 0 else []
+        distinct_count, distinct_exact = approximate_distinct(values, distinct_error, thresholds)
+    if is_numeric and 'min' in known:
+        col_min, col_max = known['min'], known['max']
+    elif is_numeric and len(values):
+        col_min = values.min()
+        col_max = values.max()
+    return null_count, distinct_count, distinct_exact, col_min, col_max
+
+
+class ColumnProfile(object):
+    """
+    column-wise statistics of a dataset computed in a single pass over every column:
+    dtype, base type, null count, distinct (non-null) count, min, max and range.
+    checks read from the profile instead of rescanning the data.
+    all statistics are pandas Series indexed by column name.
+    column_stats ({column: {'null_count': .., 'min': .., 'max': ..}}, e.g. from parquet footers) are taken as
+    known, the data is then only scanned for what they do not answer.
+    with distinct_error (a relative error, e.g. 0.01) distinct counts of high cardinality columns are
+    HyperLogLog estimates, exact wherever the cardinality checks could decide differently (see approximate_distinct)
+    with processes > 1 the columns are profiled in shards by a pool of that many processes (see column_shards)
+    """
+    def __init__(self, data, column_stats=None, distinct_error=None, processes=None):
+        self.n_rows = data.shape[0]
+        self.columns = data.columns
+        self.dtypes = data.dtypes
+        self.base_types = pd.Series([dcu.get_base_types(t) for t in data.dtypes.values], index=self.columns)
+        self.null_count = None
+        self.distinct_count = None
+        self.min = None
+        self.max = None
+        # only available when computed while profiling, checks work them out from the data otherwise
+        self.duplicate_pairs = None
+        self.class_counts = None
+        self.distinct_error = distinct_error
+        self.distinct_exact = None
+        self.processes = processes
+        self.profile_columns(data, dict() if column_stats is None else column_stats)
+
+    def profile_columns(self, data, column_stats):
+        n_cols = data.shape[1]
+        null_count = np.zeros(n_cols, dtype=np.int64)
+        distinct_count = np.zeros(n_cols, dtype=np.int64)
+        distinct_exact = np.ones(n_cols, dtype=bool)
+        col_min = np.full(n_cols, np.nan, dtype=object)
+        col_max = np.full(n_cols, np.nan, dtype=object)
+
+        is_numeric = self.base_types.isin(['float', 'int']).values
+        known = [column_stats.get(t, dict()) for t in self.columns]
+        if self.processes is not None and self.processes > 1 and n_cols > 1:
+            statistics = cs.sharded_column_statistics(data, is_numeric, known, self.distinct_error, self.processes,
+                                                      column_statistics)
+        else:
+            statistics = (column_statistics(data.iloc[:, i], self.n_rows, is_numeric[i], known[i], self.distinct_error)
+                          for i in range(n_cols))
+        for i, col_statistics in enumerate(statistics):
+            null_count[i], distinct_count[i], distinct_exact[i], col_min[i], col_max[i] = col_statistics
+
+        self.null_count = pd.Series(null_count, index=self.columns)
+        self.distinct_count = pd.Series(distinct_count, index=self.columns)
+        self.distinct_exact = pd.Series(distinct_exact, index=self.columns)
+        self.min = pd.Series(col_min, index=self.columns)
+        self.max = pd.Series(col_max, index=self.columns)
+        logger.debug('profiled {0} columns of {1} rows'.format(n_cols, self.n_rows))
+
+    @property
+    def not_null_count(self):
+        return self.n_rows - self.null_count
+
+    @property
+    def any_null(self):
+        return self.null_count > 0
+
+    @property
+    def all_null(self):
+        return self.null_count == self.n_rows
+
+    @property
+    def range(self):
+        """max - min for numeric columns (NaN if no values), number of distinct values otherwise"""
+        is_numeric = self.base_types.isin(['float', 'int'])
+        numeric_range = (self.max[is_numeric] - self.min[is_numeric]).astype(float)
+        return numeric_range.combine_first(self.distinct_count[~is_numeric].astype(float))[self.columns]
+
+
+class StreamingColumnProfile(ColumnProfile):
+    """
+    ColumnProfile built from an iterable of chunks (pandas dataframes with the same columns) without holding
+    more than one chunk in memory. statistics are gathered by mergeable accumulators, which also provide the
+    duplicate column pairs and (if target_col is given) the class counts of the target column.
+    distinct counts switch from exact to HyperLogLog estimates for high cardinality columns. the estimates
+    cannot tell all distinct values (critical cardinality check) from nearly all distinct values, settle_distinct
+    counts the columns where this is undecided exactly in a second pass reading only them
+    """
+    def __init__(self, chunks, target_col=None):
+        self.accumulators = None
+        self.target_col = target_col
+        self.class_counts = None
+        for chunk in chunks:
+            self.update(chunk)
+        self.finalize()
+
+    def init_accumulators(self, columns):
+        self.accumulators = {
+            'dtypes': DtypeAccumulator(columns),
+            'null_count': NullCountAccumulator(columns),
+            'min_max': MinMaxAccumulator(columns),
+            'distinct_count': DistinctCountAccumulator(columns),
+            'duplicate_columns': DuplicateColumnsAccumulator(columns),
+        }
+        if self.target_col is not None:
+            self.accumulators['class_counts'] = ClassCountAccumulator(self.target_col)
+
+    def update(self, chunk):
+        if self.accumulators is None:
+            self.init_accumulators(chunk.columns)
+        nulls = chunk.isnull()
+        for accumulator in self.accumulators.values():
+            accumulator.update(chunk, nulls)
+        logger.debug('profiled chunk of {0} rows'.format(chunk.shape[0]))
+
+    def merge(self, other):
+        for name, accumulator in self.accumulators.items():
+            accumulator.merge(other.accumulators[name])
+        self.finalize()
+
+    def finalize(self):
+        null_counts = self.accumulators['null_count']
+        self.columns = null_counts.columns
+        self.n_rows = null_counts.n_rows
+        dtypes = self.accumulators['dtypes'].dtypes
+        self.dtypes = pd.Series(dtypes, index=self.columns)
+        self.base_types = pd.Series([dcu.get_base_types(t) for t in dtypes], index=self.columns)
+        self.null_count = pd.Series(null_counts.null_count.copy(), index=self.columns)
+
+        min_max = self.accumulators['min_max']
+        self.min = pd.Series(np.where(min_max.numeric, min_max.min, np.nan), index=self.columns)
+        self.max = pd.Series(np.where(min_max.numeric, min_max.max, np.nan), index=self.columns)
+
+        not_null_count = self.not_null_count.values
+        distinct_count = [min(t.count(), not_null_count[i])
+                          for i, t in enumerate(self.accumulators['distinct_count'].counters)]
+        self.distinct_count = pd.Series(distinct_count, index=self.columns, dtype=np.int64)
+        self.distinct_exact = pd.Series([t.is_exact for t in self.accumulators['distinct_count'].counters],
+                                        index=self.columns)
+
+        self.duplicate_pairs = self.accumulators['duplicate_columns'].duplicate_pairs(dtypes)
+        if 'class_counts' in self.accumulators:
+            self.class_counts = dict(self.accumulators['class_counts'].class_counts)
+
+    def unsettled_columns(self):
+        """
+        columns whose estimated distinct count may or may not be the row count where the critical cardinality
+        check depends on it: no nulls, an estimate within the sketch error of the row count and, for numeric
+        columns, a range of at least the row count
+        """
+        counters = self.accumulators['distinct_count'].counters
+        tolerance = np.array([1 - 3 * t.relative_error for t in counters])
+        is_numeric = self.base_types.isin(['float', 'int']).values
+        unsettled = (~self.distinct_exact.values & ~self.any_null.values &
+                     (self.distinct_count.values >= self.n_rows * tolerance) &
+                     (~is_numeric | (self.range.values >= self.n_rows)))
+        return self.columns[unsettled].tolist()
+
+    def settle_distinct(self, chunks):
+        """
+        counts the distinct values of the unsettled columns exactly from chunks of the same rows holding (at least)
+        these columns, e.g. the data read again projected onto them. merging resets the counts to the estimates
+        """
+        columns = self.unsettled_columns()
+        if not columns:
+            return
+        hashes = [[] for _ in columns]
+        for chunk in chunks:
+            chunk_hashes = du.value_hashes(normalize_chunk(chunk[columns]))
+            for i in range(len(columns)):
+                hashes[i].append(np.unique(chunk_hashes[:, i]))
+        for col, col_hashes in zip(columns, hashes):
+            self.distinct_count[col] = len(np.unique(np.concatenate(col_hashes)))
+            self.distinct_exact[col] = True
+        logger.debug('distinct counts of {0} columns settled exactly'.format(len(columns)))
+
+
+def build_profile(dataset, target_col=None, column_stats=None, distinct_error=None, processes=None):
+    """
+    ColumnProfile of a dataframe, or StreamingColumnProfile of any other iterable of chunks
+    (streamed distinct counts are always sketched beyond the exact limit). unsettled distinct counts of chunks
+    read from data files are settled by reading their columns again, those of other iterables stay estimates
+    """
+    with dcp.stage('build_profile', 'checker') as record:
+        if isinstance(dataset, pd.DataFrame):
+            profile = ColumnProfile(dataset, column_stats, distinct_error, processes)
+        else:
+            profile = StreamingColumnProfile(dataset, target_col)
+            unsettled = profile.unsettled_columns()
+            if unsettled and hasattr(dataset, 'select'):
+                profile.settle_distinct(dataset.select(unsettled))
+            elif unsettled:
+                logger.warning('chunks cannot be read again, estimated distinct counts of {0} may miss their '
+                               'critical cardinality'.format(unsettled))
+        record['rows'], record['cols'] = profile.n_rows, len(profile.columns)
+    return profile
+
+
+def build_profiles(data, target_cols=None, column_stats=None, n_jobs=1, distinct_error=None, processes=None):
+    """
+    returns a ColumnProfile per dataset key, datasets are profiled concurrently with n_jobs > 1.
+    target_cols and column_stats map dataset keys to their target column and known column statistics.
+    distinct_error: relative error of approximate distinct counts, exact counts if None
+    processes: if > 1, the columns of every dataset are profiled in shards by a pool of processes, the datasets
+        one after the other (worker processes are not forked from several threads)
+    """
+    if target_cols is None:
+        target_cols = dict()
+    if column_stats is None:
+        column_stats = dict()
+    tasks = {key: (partial(build_profile, dataset, target_cols.get(key), column_stats.get(key), distinct_error,
+                           processes), [])
+             for key, dataset in data.items()}
+    return run_tasks(tasks, 1 if processes is not None and processes > 1 else n_jobs)
@@ -0,0 +1,166 @@
+"""
+column-sharded statistics of wide datasets: the columns are split into shards (about SHARDS_PER_PROCESS per
+process, of similar size in bytes) whose statistics a pool of processes computes, one shard per task. the column
+values are not pickled with the tasks where they can be shared:
+    columns memory mapped from the column store: the workers map the same stored files
+    other numeric, bool and datetime columns: copied into a shared memory segment per shard, that the workers
+        read without copying
+    object and categorical columns: pickled with their shard, shared memory holds no python objects
+the per-column results come back in column order, as a serial run computes them.
+the pool is kept for the next datasets of the process (worker startup is paid once)
+"""
+import mmap
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import resource_tracker, shared_memory, util
+import numpy as np
+import pandas as pd
+
+import logging
+logger = logging.getLogger(__name__)
+
+SHARDS_PER_PROCESS = 4
+SHARED_KINDS = 'biufcmM'
+
+_pool = None
+_pool_processes = None
+
+
+def inf_as_na():
+    """whether inf values count as null (set by the checkers), without the pandas deprecation warning"""
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', FutureWarning)
+        return pd.get_option('mode.use_inf_as_na')
+
+
+def set_inf_as_na(value):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', FutureWarning)
+        pd.set_option('mode.use_inf_as_na', value)
+
+
+def process_pool(processes):
+    """the pool of the process, started again with another number of processes"""
+    global _pool, _pool_processes
+    if _pool is not None and _pool_processes != processes:
+        shutdown_pool()
+    if _pool is None:
+        # workers share the resource tracker of the parent process (which unlinks the shared memory segments),
+        # instead of starting their own that would unlink them again at their exit
+        resource_tracker.ensure_running()
+        _pool, _pool_processes = ProcessPoolExecutor(max_workers=processes), processes
+    return _pool
+
+
+def shutdown_pool():
+    global _pool, _pool_processes
+    if _pool is not None:
+        _pool.shutdown()
+        _pool, _pool_processes = None, None
+
+
+# the pool is shut down at exit, also in pool worker processes (e.g. a curation run in a process pool) where
+# atexit does not run and the exit would otherwise wait for the pool processes forever
+util.Finalize(None, shutdown_pool, exitpriority=100)
+
+
+def column_shards(data, n_shards):
+    """column positions of the shards: contiguous column ranges of similar size in bytes"""
+    col_bytes = np.array([max(data.iloc[:, i].values.nbytes, 1) for i in range(data.shape[1])], dtype=np.float64)
+    bounds = np.searchsorted(np.cumsum(col_bytes), col_bytes.sum() * np.arange(1, n_shards) / n_shards)
+    return [t.tolist() for t in np.split(np.arange(data.shape[1]), bounds) if len(t)]
+
+
+def mapped_file(values):
+    """(file, offset) of a column memory mapped from a whole .npy file (e.g. by the column store), None otherwise"""
+    root = values
+    while isinstance(root, np.memmap) and not isinstance(root.base, mmap.mmap):
+        root = root.base
+    if not isinstance(root, np.memmap) or not root.filename or not values.size:
+        return None
+    # the column is the whole mapped array (pandas holds it as a reshaped view)
+    if values.ctypes.data != root.ctypes.data or values.nbytes != root.nbytes or not values.flags.c_contiguous:
+        return None
+    return root.filename, root.offset
+
+
+def share_shard(data, positions, is_numeric, known):
+    """the task description of a shard and its shared memory segment (None if it needs none)"""
+    columns = []
+    shared = []
+    for i in positions:
+        values = data.iloc[:, i].values
+        column = {'dtype': values.dtype, 'shape': values.shape, 'is_numeric': is_numeric[i], 'known': known[i]}
+        if not isinstance(values.dtype, np.dtype) or values.dtype.kind not in SHARED_KINDS:
+            column['values'] = values
+        elif mapped_file(values) is not None:
+            column['file'], column['offset'] = mapped_file(values)
+        else:
+            shared.append((column, values))
+        columns.append(column)
+    segment = None
+    if shared:
+        segment = shared_memory.SharedMemory(create=True, size=sum(values.nbytes for column, values in shared) or 1)
+        offset = 0
+        for column, values in shared:
+            np.ndarray(values.shape, values.dtype, buffer=segment.buf, offset=offset)[:] = values
+            column['offset'] = offset
+            offset += values.nbytes
+    return {'segment': None if segment is None else segment.name, 'columns': columns}, segment
+
+
+def shard_statistics(shard, n_rows, distinct_error, null_inf, column_statistics):
+    """statistics (see column_statistics) of the columns of a shard, run in a worker process"""
+    if inf_as_na() != null_inf:
+        # null checks as in the parent process (forked workers have its options already)
+        set_inf_as_na(null_inf)
+    segment = None if shard['segment'] is None else shared_memory.SharedMemory(name=shard['segment'])
+    try:
+        statistics = []
+        for column in shard['columns']:
+            if 'values' in column:
+                values = column['values']
+            elif 'file' in column:
+                values = np.memmap(column['file'], column['dtype'], 'r', column['offset'], column['shape'])
+            else:
+                values = np.ndarray(column['shape'], column['dtype'], buffer=segment.buf, offset=column['offset'])
+            statistics.append(column_statistics(pd.Series(values, copy=False), n_rows, column['is_numeric'],
+                                                column['known'], distinct_error))
+            del values
+        return statistics
+    finally:
+        if segment is not None:
+            segment.close()
+
+
+def sharded_column_statistics(data, is_numeric, known, distinct_error, processes, column_statistics):
+    """
+    column_statistics(col, n_rows, is_numeric, known, distinct_error) of every column of a dataframe, in column
+    order, computed by a pool of processes on column shards
+    """
+    shards = column_shards(data, min(data.shape[1], processes * SHARDS_PER_PROCESS))
+    null_inf = inf_as_na()
+    segments = []
+    try:
+        tasks = []
+        for positions in shards:
+            shard, segment = share_shard(data, positions, is_numeric, known)
+            if segment is not None:
+                segments.append(segment)
+            tasks.append(shard)
+        logger.debug('profiling {0} columns in {1} shards with {2} processes'.format(
+            data.shape[1], len(shards), processes))
+        pool = process_pool(processes)
+        futures = [pool.submit(shard_statistics, shard, data.shape[0], distinct_error, null_inf, column_statistics)
+                   for shard in tasks]
+        try:
+            return [t for future in futures for t in future.result()]
+        except BrokenProcessPool:
+            # a worker died (e.g. out of memory), the next datasets get a new pool
+            shutdown_pool()
+            raise
+    finally:
+        for segment in segments:
+            segment.close()
+            segment.unlink()
@@ -1,7 +1,8 @@
 from data_curator.data_checkers.base_checker import UnsupervisedDataChecker, ClassificationDataChecker, \
     RegressionDataChecker
-import data_curator.utils.data_checker_utils as dcu
-import numpy as np
+from data_curator.data_checkers.column_profile import build_profiles
+import data_curator.data_checkers.sample_confidence as sc
+import data_curator.data_curator_profiler as dcp
 import logging
 logger = logging.getLogger(__name__)
 
@@ -16,13 +17,37 @@ def get_data_keys(data_type, target_col_dict):
 
 
 class DataChecker(object):
-    def __init__(self, data, metadata):
+    def __init__(self, data, metadata, n_jobs=1, distinct_error=None, profiles=None, checks=None, processes=None):
+        """
+        data: the datasets by key, None to check the given profiles alone (see BaseDataChecker)
+        distinct_error: relative error of approximate distinct counts (see ColumnProfile), exact counts if None
+        profiles: ColumnProfiles of the datasets if already built (e.g. merged from a CheckState), the data is then
+            not profiled again
+        checks: the check_* methods to run, all checks of the learning type if None (see BaseDataChecker)
+        processes: if > 1, columns are profiled in shards by a pool of this many processes (for wide data)
+        """
         self.data = data
         self.metadata = metadata
+        self.n_jobs = n_jobs
+        self.checks = checks
         self.checker_class = None
+        self.checker = None
         self.metadata['main_data_key'], self.metadata['main_target_col'], self.metadata['second_data_key'] = \
             get_data_keys(self.metadata['split_type'], self.metadata['target_col'])
         self.metadata['cat_to_num_threshold'] = 100
+        if profiles is None:
+            if data is None:
+                raise ValueError('profiles are needed to check without data')
+            with dcp.stage('build_profiles', 'checker') as record:
+                profiles = build_profiles(self.data, self.metadata['target_col'], self.metadata.get('column_stats'),
+                                          self.n_jobs, distinct_error, processes)
+                record['rows'] = sum(t.n_rows for t in profiles.values())
+                record['cols'] = sum(len(t.columns) for t in profiles.values())
+        self.profiles = profiles
+        for key, profile in self.profiles.items():
+            if not profile.distinct_exact.all():
+                logger.info('approximate distinct counts for {0} columns of {1} data'.format(
+                    int((~profile.distinct_exact).sum()), key))
         self.get_feature_dtypes()
     
     def get_feature_dtypes(self):
@@ -30,16 +55,26 @@ class DataChecker(object):
         for data_key in [self.metadata['main_data_key'], self.metadata['second_data_key']]:
             if data_key is None:
                 continue
-            main_dtypes = [dcu.get_base_types(t) for t in self.data[data_key].dtypes.values]
-            _cols_below_threshold_inds = list(np.array(self.data[data_key].nunique()) <=
-                                              self.metadata['cat_to_num_threshold'])
+            profile = self.profiles[data_key]
+            main_dtypes = profile.base_types.tolist()
+            _cols_below_threshold_inds = list(profile.distinct_count.values <= self.metadata['cat_to_num_threshold'])
             main_dtypes = [t+'_discreet' if _cols_below_threshold_inds[i] else t for i, t in enumerate(main_dtypes)]
-            self.metadata['feature_dtypes'][data_key] = dict(zip(self.data[data_key].dtypes.index, 
-                                                                 main_dtypes))
+            self.metadata['feature_dtypes'][data_key] = dict(zip(profile.columns, main_dtypes))
 
     def run(self):
+        """
+        metadata and data checks. on sampled data (metadata['sample'] from the reader) the data checks also
+        hold the confidence of every check result in data_checks['check_confidence'] (see sample_confidence)
+        """
         self.set_checker_type()
-        return self.checker_class(self.data, self.metadata).run()
+        with dcp.stage('check', 'checker') as record:
+            self.checker = self.checker_class(self.data, self.metadata, self.profiles, self.n_jobs, self.checks)
+            metadata, data_checks = self.checker.run()
+            record['rows'], record['cols'] = self.checker.checked_shape()
+            if 'sample' in metadata:
+                with dcp.stage('check_confidence', 'checker'):
+                    data_checks['check_confidence'] = sc.check_confidence(data_checks, metadata, self.profiles)
+        return metadata, data_checks
 
     def set_checker_type(self):
         if self.data_is_unsupervised():
@@ -57,9 +92,11 @@ class DataChecker(object):
             return 0
 
     def data_is_classification(self):
-        train_data = self.data[self.metadata['main_data_key']]
-        if (train_data[self.metadata['main_target_col']].dtype == 'object') or \
-           (train_data[self.metadata['main_target_col']].unique().__len__() <= self.metadata['cat_to_num_threshold']):
+        profile = self.profiles[self.metadata['main_data_key']]
+        target_col = self.metadata['main_target_col']
+        # number of unique target values, counting missing as one
+        n_unique = profile.distinct_count[target_col] + int(profile.any_null[target_col])
+        if (profile.dtypes[target_col] == 'object') or (n_unique <= self.metadata['cat_to_num_threshold']):
             # TODO using arbitrary #classes, check for better solution
             return 1
         else:
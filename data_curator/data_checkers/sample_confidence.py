@@ -0,0 +1,151 @@
+"""
+confidence of check results computed on row samples: the probability that a result holds on all the rows.
+    1.0: the sample holds rows that settle the result for the data too (e.g. a missing and a present value
+        for a MISSING_VALUE_CHECK FAIL)
+    below 1.0: the result rests on rows the sample did not show (no missing value among the sampled rows).
+        with even prior odds of such rows being absent or present at a uniform rate, the probability that
+        none are among all rows is (n + 1) (N + 2) / ((n + 2) (N + 1)) for n sampled of N rows,
+        of pairs of rows for the all unique decision
+class balance is exact for stratified samples (their class counts are counted on all rows), for uniform
+samples it is the normal approximation of the probability that the minority/majority ratio is on the same
+side of the check threshold.
+results without a status (Not_Applicable, the duplicate bases) get no confidence
+"""
+import math
+
+import logging
+logger = logging.getLogger(__name__)
+
+CLASS_BALANCE_THRESHOLD = 0.2
+
+
+def unseen_confidence(sample_rows, n_rows):
+    """probability that no row of a kind is among n_rows, given none among sample_rows uniformly sampled"""
+    if sample_rows >= n_rows:
+        return 1.0
+    return (sample_rows + 1) * (n_rows + 2) / ((sample_rows + 2) * (n_rows + 1))
+
+
+def unseen_pair_confidence(sample_rows, n_rows):
+    """unseen_confidence of a pair of rows (e.g. with a repeated value)"""
+    return unseen_confidence(sample_rows * (sample_rows - 1) // 2, n_rows * (n_rows - 1) // 2)
+
+
+def status_confidence(statuses, settled, unsettled_confidence):
+    """confidence of PASS/FAIL statuses: 1.0 where settled (by column), unsettled_confidence (by column) elsewhere"""
+    confidence = dict()
+    for col, status in statuses.items():
+        if status not in ['PASS', 'FAIL']:
+            continue
+        confidence[col] = 1.0 if settled[col] else float(unsettled_confidence[col])
+    return confidence
+
+
+def column_check_confidence(check, statuses, profile, n_rows):
+    sample_rows = profile.n_rows
+    unseen = unseen_confidence(sample_rows, n_rows)
+    columns = profile.columns
+    fail = {col: statuses.get(col) == 'FAIL' for col in columns}
+    unsettled = dict.fromkeys(columns, unseen)
+    if check == 'MISSING_VALUE_CHECK':
+        # a missing and a present value settle a FAIL, a PASS rests on missing (or present) values not sampled
+        settled = fail
+    elif check == 'CRITICAL_CARDINALITY_CHECK':
+        distinct = profile.distinct_count
+        value_range = profile.range
+        unique = (distinct == sample_rows) & (value_range >= sample_rows)
+        # a repeated value and two distinct values settle a PASS
+        settled = {col: (not fail[col]) and distinct[col] >= 2 and distinct[col] < profile.not_null_count[col]
+                   for col in columns}
+        is_numeric = profile.base_types.isin(['float', 'int'])
+        pairs = unseen_pair_confidence(sample_rows, n_rows)
+        for col in columns:
+            if fail[col] and unique[col] and not profile.all_null[col]:
+                # all unique needs no repeated value, numeric columns also a range of at least n_rows
+                # (other columns have their distinct count as range)
+                if is_numeric[col] and value_range[col] < n_rows:
+                    unsettled[col] = min(pairs, 1 - unseen)
+                else:
+                    unsettled[col] = pairs
+    elif check in ['LOW_CARDINALITY_CHECK', 'DUPLICATE_CHECK', 'MEMORY_CHECK']:
+        # more distinct values, a differing row, a value outside the smaller dtype settle a PASS
+        settled = {col: not fail[col] for col in columns}
+    elif check == 'DTYPE_CHECK':
+        settled = dict.fromkeys(columns, False)
+    else:
+        raise NotImplementedError('no sample confidence for {0}'.format(check))
+    return status_confidence(statuses, settled, unsettled)
+
+
+def class_balance_confidence(metadata, sample_info, profile):
+    if 'class_counts' in sample_info or profile.n_rows >= sample_info['n_rows']:
+        return 1.0
+    minority = metadata['class_counts'][metadata['minority_class']]
+    majority = metadata['class_counts'][metadata['majority_class']]
+    # delta method: var(log(minority / majority)) ~ 1/minority + 1/majority, with finite population correction
+    std_error = math.sqrt((1 / minority + 1 / majority) * (1 - profile.n_rows / sample_info['n_rows']))
+    if std_error == 0:
+        return 1.0
+    z_score = abs(math.log(minority / majority) - math.log(CLASS_BALANCE_THRESHOLD)) / std_error
+    return 0.5 * (1 + math.erf(z_score / math.sqrt(2)))
+
+
+def check_confidence(data_checks, metadata, profiles):
+    """confidences of the check results, in the layout of data_checks (column_checks and data_checks)"""
+    confidence = {'column_checks': dict()}
+    for key, checks in data_checks['column_checks'].items():
+        n_rows = metadata['sample'][key]['n_rows']
+        confidence['column_checks'][key] = {
+            check: column_check_confidence(check, statuses, profiles[key], n_rows)
+            for check, statuses in checks.items()}
+    if 'class_balance_check' in data_checks.get('data_checks', dict()):
+        main_key = metadata['main_data_key']
+        confidence['data_checks'] = {'class_balance_check': class_balance_confidence(
+            metadata, metadata['sample'][main_key], profiles[main_key])}
+    return confidence
+
+
+def recheck_columns(data_checks, confidence, profiles, min_confidence):
+    """
+    {data key: columns} whose results should be confirmed on all rows: FAIL results the sample does not settle
+    and results below min_confidence. columns that sampled equal to another column are added with it,
+    so their comparison can be redone
+    """
+    columns = dict()
+    for key, checks in data_checks['column_checks'].items():
+        profile = profiles[key]
+        key_columns = set()
+        for check, statuses in checks.items():
+            check_confidence = confidence['column_checks'][key][check]
+            key_columns.update(col for col, val in check_confidence.items()
+                               if val < min_confidence or (val < 1.0 and statuses[col] == 'FAIL'))
+        for ind0, ind1 in profile.duplicate_pairs or []:
+            if profile.columns[ind0] in key_columns or profile.columns[ind1] in key_columns:
+                key_columns.update([profile.columns[ind0], profile.columns[ind1]])
+        columns[key] = [t for t in profile.columns if t in key_columns]
+    return columns
+
+
+def merge_confirmed(metadata, data_checks, confidence, confirmed_metadata, confirmed_checks):
+    """
+    replaces sample results with the results confirmed on all rows of a subset of columns,
+    whose confidence becomes 1.0
+    """
+    for key, checks in confirmed_checks['column_checks'].items():
+        for check, statuses in checks.items():
+            if check in data_checks['column_checks'][key]:
+                # also replaces the duplicate bases of the confirmed columns
+                data_checks['column_checks'][key][check].update(statuses)
+            else:
+                data_checks['column_checks'][key][check] = statuses
+            check_confidence = confidence['column_checks'][key].setdefault(check, dict())
+            check_confidence.update({col: 1.0 for col, val in statuses.items() if val in ['PASS', 'FAIL']})
+        metadata['feature_dtypes'][key].update(confirmed_metadata['feature_dtypes'][key])
+    if 'class_balance_check' in confirmed_checks.get('data_checks', dict()):
+        data_checks['data_checks'].update(confirmed_checks['data_checks'])
+        for name in ['minority_class', 'majority_class', 'minority_class_%', 'majority_class_%',
+                     'class_counts', 'class_shares', 'imbalance_ratio']:
+            metadata[name] = confirmed_metadata[name]
+        confidence['data_checks']['class_balance_check'] = 1.0
+    data_checks['validation_reco'] = confirmed_checks['validation_reco']
+    return metadata, data_checks, confidence
@@ -0,0 +1,144 @@
+"""
+per-stage instrumentation of a run: the reader steps, the checker check_* methods and the processor steps are
+recorded as stages with their wall time, cpu time (of the process, all threads), the rows and columns they
+processed and the change of resident memory (linux, None elsewhere).
+stages are recorded only while a profiler is active (start_profiling), stage() does nothing otherwise.
+stages nest per thread, stages of worker threads (profiles built with n_jobs > 1) are recorded on their thread.
+the stages can be exported as a chrome trace (chrome://tracing, https://ui.perfetto.dev, https://speedscope.app)
+"""
+import contextlib
+import json
+import os
+import threading
+import time
+
+import logging
+logger = logging.getLogger(__name__)
+
+_profiler = None
+
+
+def read_status_bytes(field):
+    """a memory field of /proc/self/status (e.g. VmRSS, VmHWM) in bytes, raises OSError where unavailable"""
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1]) * 1024
+    raise OSError(field + ' not in /proc/self/status')
+
+
+def current_rss():
+    """resident memory of the process in bytes (linux), None where unknown"""
+    try:
+        return read_status_bytes('VmRSS')
+    except OSError:
+        return None
+
+
+def data_shape(data):
+    """(rows, cols) of a dataframe, (None, cols) of chunk sources that have columns, (None, None) otherwise"""
+    shape = getattr(data, 'shape', None)
+    if shape is not None:
+        return int(shape[0]), int(shape[1])
+    columns = getattr(data, 'columns', None)
+    return None, (None if columns is None else len(columns))
+
+
+def datasets_shape(data):
+    """data_shape summed over a dict of datasets, None where unknown for one of them"""
+    shapes = [data_shape(t) for t in data.values()]
+    return tuple(None if any(t[i] is None for t in shapes) else sum(t[i] for t in shapes) for i in range(2))
+
+
+class DataCuratorProfiler(object):
+    def __init__(self):
+        self.start_time = time.perf_counter()
+        self.stages = []
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.thread_names = dict()
+
+    @contextlib.contextmanager
+    def stage(self, name, category):
+        """
+        records the with block as a stage, yields the stage record, where 'rows' and 'cols' can be set
+        to the size of the data processed
+        """
+        stack = getattr(self.local, 'stack', None)
+        if stack is None:
+            stack = self.local.stack = []
+        thread = threading.current_thread()
+        record = {'name': name, 'category': category, 'path': '/'.join([t['name'] for t in stack] + [name]),
+                  'thread': thread.ident, 'rows': None, 'cols': None}
+        stack.append(record)
+        start_rss = current_rss()
+        start_cpu = time.process_time()
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            end = time.perf_counter()
+            record['start_seconds'] = start - self.start_time
+            record['wall_seconds'] = end - start
+            record['cpu_seconds'] = time.process_time() - start_cpu
+            end_rss = current_rss()
+            record['rss_delta_bytes'] = None if start_rss is None or end_rss is None else end_rss - start_rss
+            stack.pop()
+            with self.lock:
+                self.thread_names.setdefault(thread.ident, thread.name)
+                self.stages.append(record)
+
+    def summary(self, categories=None):
+        """the stages of the given categories (all if None), in order of their start"""
+        stages = [dict(t) for t in sorted(self.stages, key=lambda t: t['start_seconds'])
+                  if categories is None or t['category'] in categories]
+        main_thread = threading.main_thread().ident
+        wall_seconds = sum(t['wall_seconds'] for t in stages if t['thread'] == main_thread and '/' not in t['path'])
+        return {'stages': stages, 'wall_seconds': wall_seconds, 'rss_bytes': current_rss()}
+
+    def trace(self):
+        """the stages as chrome trace events (complete events, in microseconds)"""
+        pid = os.getpid()
+        events = [{'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': name}}
+                  for tid, name in self.thread_names.items()]
+        for stage in self.stages:
+            events.append({'name': stage['name'], 'cat': stage['category'], 'ph': 'X', 'pid': pid,
+                           'tid': stage['thread'], 'ts': stage['start_seconds'] * 1e6,
+                           'dur': stage['wall_seconds'] * 1e6,
+                           'args': {key: stage[key] for key in ['rows', 'cols', 'cpu_seconds', 'rss_delta_bytes']}})
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def save_trace(self, filename):
+        with open(filename, 'w') as f:
+            json.dump(self.trace(), f)
+        logger.info('saved {0}'.format(filename))
+
+
+def start_profiling():
+    """activates a new profiler and returns it"""
+    global _profiler
+    _profiler = DataCuratorProfiler()
+    return _profiler
+
+
+def stop_profiling():
+    """deactivates the profiler and returns it"""
+    global _profiler
+    profiler, _profiler = _profiler, None
+    return profiler
+
+
+def get_profiler():
+    """the active profiler, None if not profiling"""
+    return _profiler
+
+
+@contextlib.contextmanager
+def stage(name, category):
+    """records the with block as a stage of the active profiler (see DataCuratorProfiler.stage)"""
+    profiler = _profiler
+    if profiler is None:
+        yield dict()
+        return
+    with profiler.stage(name, category) as record:
+        yield record
@@ -1,5 +1,10 @@
-from sklearn.impute import SimpleImputer
 import data_curator.utils.generic_utils as gu
+import data_curator.utils.memory_utils as mu
+import data_curator.utils.imputation_utils as iu
+from data_curator.data_processors.fitted_pipeline import FittedPipeline
+import data_curator.data_processors.encoders as ce
+from data_curator.data_checkers.check_results import as_check_results
+import data_curator.data_curator_profiler as dcp
 import numpy as np
 import pandas as pd
 import logging
@@ -21,7 +26,19 @@ def dtype_mapper(dtype):
 
 
 class BaseDataProcessor(object):
+    # processing steps, in the order they run
+    processing_steps = ['remove_cardinality_issue_columns', 'remove_duplicated_columns', 'drop_removed_columns',
+                        'process_missing_values', 'encode_categorical_features', 'process_memory_issues']
+    # checker check_* methods whose results each processing step uses
+    step_checks = {
+        'remove_cardinality_issue_columns': ['check_critical_cardinality'],
+        'remove_duplicated_columns': ['check_duplicate_columns'],
+        'process_missing_values': ['check_missing_values'],
+        'process_memory_issues': ['check_memory_issue'],
+    }
+
     def __init__(self, data, metadata, data_checks, params):
+        # datasets are processed in place, the given dataframes are modified
         self.processed_data = data
         self.metadata = metadata
         self.data_checks = data_checks
@@ -31,6 +48,7 @@ class BaseDataProcessor(object):
         self.initiate_processed_output()
 
         self.removed_cols = []
+        self.pipeline = FittedPipeline()
         self.main_data_key = self.metadata['main_data_key']
         self.second_data_key = self.metadata['second_data_key']
         self.main_target_col = self.metadata['main_target_col']
@@ -44,21 +62,23 @@ class BaseDataProcessor(object):
 
         self.processed_info['row_processing'] = 'PASS'
 
+    def run_steps(self, steps):
+        """runs the named processing steps in the given order, each recorded as a processor stage when profiling"""
+        for step in steps:
+            with dcp.stage(step, 'processor') as record:
+                getattr(self, step)()
+                record['rows'], record['cols'] = dcp.datasets_shape(self.processed_data)
+
     def _get_issue_cols(self, check_name, data_key='main_data_key'):
+        """FAIL columns of a check (CheckResults, or a dict of statuses), but the target and removed columns"""
         if data_key == 'main_data_key':
             _checks = self.column_checks[self.main_data_key][check_name]
-            _issue_cols = [key for key, value in _checks.items()
-                                      if ((value == 'FAIL') and (key != self.main_target_col))]
-            _issue_cols = [t for t in _issue_cols if t not in self.removed_cols]
         elif data_key == 'second_data_key':
             _checks = self.column_checks[self.second_data_key][check_name]
-            _issue_cols = [key for key, value in _checks.items()
-                           if ((value == 'FAIL') and (key != self.main_target_col))]
-            _issue_cols = [t for t in _issue_cols if t not in self.removed_cols]
         else:
             raise NotImplementedError
 
-        return _issue_cols
+        return as_check_results(_checks).failed_columns(exclude=[self.main_target_col] + self.removed_cols)
 
     def _update_processed_info_main_data(self, cols, message):
         _processed_info_message = [message]*len(cols)
@@ -72,35 +92,40 @@ class BaseDataProcessor(object):
 
     def remove_cardinality_issue_columns(self):
         cardinality_issue_cols = self._get_issue_cols('CRITICAL_CARDINALITY_CHECK')
-        self.processed_data[self.main_data_key] = self.processed_data[self.main_data_key].drop(
-            columns=cardinality_issue_cols)
         self._update_processed_info_main_data(cardinality_issue_cols, 'REMOVED DUE TO CRITICAL CARDINALITY ISSUE')
         self.removed_cols.extend(cardinality_issue_cols)
-        logger.info('removed critical cardinality issue columns {0}'.format(cardinality_issue_cols))
+        self.pipeline.drop_columns(cardinality_issue_cols)
+        logger.info('removing critical cardinality issue columns {0}'.format(cardinality_issue_cols))
         if self.second_data_key is not None:
-            self.processed_data[self.second_data_key] = self.processed_data[self.second_data_key].drop(
-                columns=cardinality_issue_cols)
             self._update_processed_info_second_data(cardinality_issue_cols, 'REMOVED DUE TO CRITICAL CARDINALITY ISSUE')
-            logger.info('removed critical cardinality issue columns {0} from secondary dataset ({1} data)'.format(
+            logger.info('removing critical cardinality issue columns {0} from secondary dataset ({1} data)'.format(
                 cardinality_issue_cols, self.second_data_key))
 
     def remove_duplicated_columns(self):
         duplication_issue_cols = self._get_issue_cols('DUPLICATE_CHECK')
-        self.processed_data[self.main_data_key] = self.processed_data[self.main_data_key].drop(
-            columns=duplication_issue_cols
-        )
         self.removed_cols.extend(duplication_issue_cols)
+        self.pipeline.drop_columns(duplication_issue_cols)
         self._update_processed_info_main_data(duplication_issue_cols, 'REMOVED DUE TO DUPLICATION ISSUE')
-        logger.info('removed duplicated columns {0} from primary data ({1} data)'.format(
+        logger.info('removing duplicated columns {0} from primary data ({1} data)'.format(
             duplication_issue_cols, self.main_data_key))
         if self.second_data_key is not None:
-            self.processed_data[self.second_data_key] = self.processed_data[self.second_data_key].drop(
-                columns=duplication_issue_cols
-            )
             self._update_processed_info_second_data(duplication_issue_cols, 'REMOVED DUE TO DUPLICATION ISSUE')
-            logger.info('removed cardinality issue columns {0} from secondary dataset ({1} data)'.format(
+            logger.info('removing duplicated columns {0} from secondary dataset ({1} data)'.format(
                 duplication_issue_cols, self.second_data_key))
 
+    def drop_removed_columns(self):
+        """
+        drops all removed columns at once and in place: pandas splits the blocks around deleted columns
+        instead of copying the frame, as drop(columns=..) would
+        """
+        for key in [self.main_data_key, self.second_data_key]:
+            if key is None:
+                continue
+            dataset = self.processed_data[key]
+            for col in [t for t in self.removed_cols if t in dataset.columns]:
+                del dataset[col]
+            logger.debug('removed {0} columns from {1} data'.format(len(self.removed_cols), key))
+
     def process_missing_values(self):
         if self.metadata['split_type'] == 'train_test':
             self.process_missing_values_train_test()
@@ -156,12 +181,11 @@ class BaseDataProcessor(object):
         if transform is None:
             transform = ['train', 'test']
 
-        imputer = SimpleImputer(missing_values=np.nan, strategy=self.params['numeric_imputation_method'])
-        imputer.fit(self.processed_data[fit][columns].values)
-        logger.debug('numeric imputation transformer created using {0} data'.format(fit))
+        fill_values = self.fit_imputer(columns, fit, self.params['numeric_imputation_method'])
+        logger.debug('numeric imputation values computed using {0} data'.format(fit))
         for trans in transform:
-            self.processed_data[trans][columns] = imputer.transform(self.processed_data[trans][columns].values)
-            logger.debug('{0} data transformed using numeric imputer'.format(trans))
+            self.fill_missing(trans, fill_values)
+            logger.debug('{0} data imputed with numeric imputation values'.format(trans))
 
     def impute_missing_categorical(self, columns, fit='train', transform=None):
         if columns.__len__() == 0:
@@ -169,18 +193,95 @@ class BaseDataProcessor(object):
         if transform is None:
             transform = ['train', 'test']
 
-        imputer = SimpleImputer(missing_values=np.nan, strategy=self.params['categorical_imputation_method'])
-        imputer.fit(self.processed_data[fit][columns].values)
-        logger.debug('categorical imputation transformer created using {0} data'.format(fit))
+        fill_values = self.fit_imputer(columns, fit, self.params['categorical_imputation_method'])
+        logger.debug('categorical imputation values computed using {0} data'.format(fit))
         for trans in transform:
-            self.processed_data[trans][columns] = imputer.transform(self.processed_data[trans][columns].values)
-            logger.debug('{0} data transformed using categorical imputer'.format(trans))
+            self.fill_missing(trans, fill_values)
+            logger.debug('{0} data imputed with categorical imputation values'.format(trans))
+
+    def fit_imputer(self, columns, fit, strategy):
+        """imputation value per column (mean, median or most_frequent), computed one column at a time"""
+        fill_values = dict()
+        for col in columns:
+            fill_values[col] = iu.get_fill_value(self.processed_data[fit][col], strategy)
+        self.pipeline.add_fill_values(list(fill_values.keys()), list(fill_values.values()))
+        return fill_values
+
+    def fill_missing(self, data_key, fill_values):
+        """fills missing values column by column, writing into the existing column arrays"""
+        dataset = self.processed_data[data_key]
+        for col, value in fill_values.items():
+            missing = dataset[col].isnull().values
+            if missing.any():
+                dataset.loc[missing, col] = value
 
     def encode_categorical_features(self):
-        pass
+        """
+        encodes the string and discreet feature columns with encoders fitted on the main data,
+        by params['categorical_encoding_method'] (see encoders.get_encoder), 'none' leaves them as they are
+        """
+        if self.params['categorical_encoding_method'] == 'none':
+            return 1
+        removed_cols = set(self.removed_cols)
+        categorical_cols = [col for col, val in self.metadata['feature_dtypes'][self.main_data_key].items()
+                            if (val == 'string' or val.endswith('_discreet')) and (col != self.main_target_col)
+                            and (col not in removed_cols)]
+        data_keys = [t for t in [self.main_data_key, self.second_data_key] if t is not None]
+        self.processed_info['encoding'] = dict()
+        for col in categorical_cols:
+            encoder = ce.get_encoder(self.params['categorical_encoding_method'],
+                                     self.processed_data[self.main_data_key][col])
+            for key in data_keys:
+                if col in self.processed_data[key].columns:
+                    self.replace_column(key, col, encoder.transform(self.processed_data[key][col]))
+            self.pipeline.add_encoder(col, encoder)
+            self.processed_info['encoding'][col] = encoder.name
+        logger.info('encoded {0} categorical columns'.format(len(categorical_cols)))
+
+    def replace_column(self, data_key, col, new_cols):
+        """replaces a column by new columns {name: values} at its position, in place"""
+        dataset = self.processed_data[data_key]
+        if list(new_cols.keys()) == [col]:
+            dataset[col] = new_cols[col]
+            return
+        loc = dataset.columns.get_loc(col)
+        del dataset[col]
+        for i, (name, values) in enumerate(new_cols.items()):
+            dataset.insert(loc + i, name, values)
 
     def process_memory_issues(self):
-        pass
+        """
+        reduces the dtypes of memory issue columns, using one dtype per column across datasets:
+        ints to the smallest int dtype, floats to float32 when lossless, discreet strings to categoricals
+        """
+        memory_issue_cols = self._get_issue_cols('MEMORY_CHECK')
+        data_keys = [t for t in [self.main_data_key, self.second_data_key] if t is not None]
+        bytes_before = {key: int(mu.column_memory(self.processed_data[key]).sum()) for key in data_keys}
+        reduced_dtypes = dict()
+        for col in memory_issue_cols:
+            to_category = self.metadata['feature_dtypes'][self.main_data_key][col] == 'string_discreet'
+            cols = [self.processed_data[key][col] for key in data_keys if col in self.processed_data[key]]
+            if not cols:
+                # replaced while encoding
+                continue
+            dtype = mu.common_reduced_dtype(cols, to_category)
+            if dtype == cols[0].dtype:
+                # nothing left to reduce after the earlier processing (e.g. imputation, encoding)
+                continue
+            for key in data_keys:
+                if col in self.processed_data[key]:
+                    self.processed_data[key][col] = self.processed_data[key][col].astype(dtype)
+            reduced_dtypes[col] = mu.dtype_name(dtype)
+            self.pipeline.set_dtypes({col: dtype})
+
+        self.processed_info['memory_processing'] = dict()
+        for key in data_keys:
+            bytes_after = int(mu.column_memory(self.processed_data[key]).sum())
+            self.processed_info['memory_processing'][key] = {'bytes_before': bytes_before[key],
+                                                             'bytes_after': bytes_after,
+                                                             'reduced_dtypes': reduced_dtypes}
+            logger.info('reduced dtypes of {0} columns of {1} data: {2} to {3} bytes'.format(
+                len(reduced_dtypes), key, bytes_before[key], bytes_after))
 
     def process_train_test_dtypes_issues(self):
         pass
@@ -191,9 +292,7 @@ class RegressionDataProcessor(BaseDataProcessor):
         super().__init__(data, metadata, data_checks, params)
 
     def run(self):
-        self.remove_cardinality_issue_columns()
-        self.remove_duplicated_columns()
-        self.process_missing_values()
+        self.run_steps(self.processing_steps)
 
         return self.processed_data, self.processed_info
 
@@ -203,9 +302,7 @@ class ClassificationDataProcessor(BaseDataProcessor):
         super().__init__(data, metadata, data_checks, params)
 
     def run(self):
-        self.remove_cardinality_issue_columns()
-        self.remove_duplicated_columns()
-        self.process_missing_values()
+        self.run_steps(self.processing_steps)
 
         return self.processed_data, self.processed_info
 
@@ -215,8 +312,6 @@ class UnsupervisedDataProcessor(BaseDataProcessor):
         super().__init__(data, metadata, data_checks, params)
 
     def run(self):
-        self.remove_cardinality_issue_columns()
-        self.remove_duplicated_columns()
-        self.process_missing_values()
+        self.run_steps(self.processing_steps)
 
         return self.processed_data, self.processed_info
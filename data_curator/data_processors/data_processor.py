@@ -1,5 +1,6 @@
 from data_curator.data_processors.base_processor import UnsupervisedDataProcessor, ClassificationDataProcessor, \
     RegressionDataProcessor
+import data_curator.data_curator_profiler as dcp
 import logging
 logger = logging.getLogger(__name__)
 
@@ -11,10 +12,17 @@ class DataProcessor(object):
         self.data_checks = data_checks
         self.params = params
         self.processor_class = None
+        self.pipeline = None
 
     def run(self):
         self.set_checker_type()
-        return self.processor_class(self.data, self.metadata, self.data_checks, self.params).run()
+        processor = self.processor_class(self.data, self.metadata, self.data_checks, self.params)
+        with dcp.stage('process', 'processor') as record:
+            processed_data, processed_info = processor.run()
+            record['rows'], record['cols'] = dcp.datasets_shape(processed_data)
+        # fitted processing, to apply to new data
+        self.pipeline = processor.pipeline
+        return processed_data, processed_info
 
     def set_checker_type(self):
         if self.metadata['learning_type'] == 'unsupervised':
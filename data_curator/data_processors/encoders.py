@@ -0,0 +1,111 @@
+"""
+categorical encoders, fitted on the training data and applied to any data with the same column.
+transform(col) returns the encoded columns {name: values} replacing the column, transform_value(name, value)
+the same for a single value. categories not seen while fitting are handled as:
+    ordinal: code -1, onehot: all zeros, frequency: 0, hashing: hashed like any other value
+"""
+import numpy as np
+import pandas as pd
+import data_curator.utils.memory_utils as mu
+
+import logging
+logger = logging.getLogger(__name__)
+
+ONEHOT_MAX_CATEGORIES = 16
+HASHING_N_BUCKETS = 1024
+
+
+class OrdinalEncoder(object):
+    """integer codes in order of first appearance, in the smallest int dtype holding them"""
+    name = 'ordinal'
+
+    def fit(self, col):
+        self.categories = pd.Index(pd.unique(col.dropna()))
+        self.codes = dict(zip(self.categories, range(len(self.categories))))
+        return self
+
+    def transform(self, col):
+        return {col.name: pd.Categorical(col, categories=self.categories).codes}
+
+    def transform_value(self, name, value):
+        return {name: self.codes.get(value, -1)}
+
+
+class OneHotEncoder(OrdinalEncoder):
+    """one sparse uint8 column per category, '<column>_<category>'"""
+    name = 'onehot'
+
+    def fit(self, col):
+        super().fit(col)
+        self.names = ['{0}_{1}'.format(col.name, t) for t in self.categories]
+        return self
+
+    def transform(self, col):
+        codes = pd.Categorical(col, categories=self.categories).codes
+        return {name: pd.arrays.SparseArray((codes == i).view(np.uint8), fill_value=0)
+                for i, name in enumerate(self.names)}
+
+    def transform_value(self, name, value):
+        code = self.codes.get(value, -1)
+        return {t: int(i == code) for i, t in enumerate(self.names)}
+
+
+class FrequencyEncoder(OrdinalEncoder):
+    """share of the category among the non-missing training values, as float32"""
+    name = 'frequency'
+
+    def fit(self, col):
+        super().fit(col)
+        codes = pd.Categorical(col, categories=self.categories).codes
+        counts = np.bincount(codes[codes >= 0], minlength=len(self.categories))
+        # last entry for code -1 (unseen or missing)
+        self.frequencies = np.append(counts / max(counts.sum(), 1), 0).astype(np.float32)
+        return self
+
+    def transform(self, col):
+        return {col.name: self.frequencies[pd.Categorical(col, categories=self.categories).codes]}
+
+    def transform_value(self, name, value):
+        return {name: float(self.frequencies[self.codes.get(value, -1)])}
+
+
+class HashingEncoder(object):
+    """bucket of the value hash, in the smallest int dtype holding n_buckets"""
+    name = 'hashing'
+
+    def __init__(self, n_buckets=HASHING_N_BUCKETS):
+        self.n_buckets = n_buckets
+        self.out_dtype = mu.smallest_int_dtype(0, n_buckets - 1)
+
+    def fit(self, col):
+        self.dtype = col.dtype
+        return self
+
+    def buckets(self, values):
+        return (pd.util.hash_array(values) % np.uint64(self.n_buckets)).astype(self.out_dtype)
+
+    def transform(self, col):
+        return {col.name: self.buckets(col.to_numpy(dtype=self.dtype))}
+
+    def transform_value(self, name, value):
+        return {name: int(self.buckets(np.array([value], dtype=self.dtype))[0])}
+
+
+encoders = {
+    'ordinal': OrdinalEncoder,
+    'onehot': OneHotEncoder,
+    'frequency': FrequencyEncoder,
+    'hashing': HashingEncoder,
+}
+
+
+def get_encoder(method, col):
+    """
+    fitted encoder of the method for the column. 'auto' one-hot encodes columns with up to
+    ONEHOT_MAX_CATEGORIES categories and frequency encodes the others
+    """
+    if method == 'auto':
+        method = 'onehot' if col.nunique() <= ONEHOT_MAX_CATEGORIES else 'frequency'
+    if method not in encoders:
+        raise NotImplementedError('unknown encoding method {0}'.format(method))
+    return encoders[method]().fit(col)
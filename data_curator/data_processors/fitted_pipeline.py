@@ -0,0 +1,115 @@
+import math
+import pickle
+import numpy as np
+import pandas as pd
+from data_curator.data_readers.file_readers import nullify_empty
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def is_missing(value):
+    """missing as the data readers see it: None, NaN, inf or an empty/whitespace-only string"""
+    if value is None:
+        return True
+    if isinstance(value, (float, np.floating)):
+        return not math.isfinite(value)
+    if isinstance(value, str):
+        return value == '' or value.isspace()
+    return False
+
+
+class FittedPipeline(object):
+    """
+    the processing fitted on the training data, to apply the same processing to new data:
+        removed_cols: columns dropped by the processor
+        fill_values: {column: imputed value} of the fitted imputers
+        encoders: {column: fitted encoder} of the categorical columns
+        dtypes: {column: reduced dtype} of the memory processing
+    transform(df) processes a dataframe, transform_row(row) a single row given as a dict
+    without going through pandas, for low latency scoring
+    """
+    def __init__(self):
+        self.removed_cols = []
+        self.removed_set = set()
+        self.fill_values = dict()
+        self.encoders = dict()
+        self.dtypes = dict()
+
+    def drop_columns(self, columns):
+        self.removed_cols.extend(t for t in columns if t not in self.removed_set)
+        self.removed_set.update(columns)
+
+    def add_fill_values(self, columns, values):
+        self.fill_values.update(zip(columns, values))
+
+    def add_encoder(self, column, encoder):
+        self.encoders[column] = encoder
+
+    def set_dtypes(self, dtypes):
+        self.dtypes.update(dtypes)
+
+    def transform(self, df):
+        data = df.drop(columns=[t for t in self.removed_cols if t in df.columns])
+        nullify_empty(data)
+        fill_values = {col: val for col, val in self.fill_values.items() if col in data.columns}
+        if fill_values:
+            data = data.fillna(fill_values)
+        encoders = {col: encoder for col, encoder in self.encoders.items() if col in data.columns}
+        if encoders:
+            data = self.encode(data, encoders)
+        dtypes = {col: dtype for col, dtype in self.dtypes.items()
+                  if col in data.columns and self.can_cast(data[col], dtype)}
+        if dtypes:
+            data = data.astype(dtypes)
+        return data
+
+    @staticmethod
+    def encode(data, encoders):
+        encoded = dict()
+        for col in data.columns:
+            if col in encoders:
+                encoded.update(encoders[col].transform(data[col]))
+            else:
+                encoded[col] = data[col]
+        return pd.DataFrame(encoded, index=data.index)
+
+    @staticmethod
+    def can_cast(col, dtype):
+        """int dtypes only take int values within their range, new data may hold more than the training data"""
+        if not (isinstance(dtype, np.dtype) and dtype.kind in 'iu'):
+            return True
+        if col.dtype.kind not in 'iu':
+            logger.debug('{0} kept as {1}, it has non int values'.format(col.name, col.dtype))
+            return False
+        if len(col) and (col.min() < np.iinfo(dtype).min or col.max() > np.iinfo(dtype).max):
+            logger.debug('{0} kept as {1}, its values exceed {2}'.format(col.name, col.dtype, dtype))
+            return False
+        return True
+
+    def transform_row(self, row):
+        """processes one row {column: value}, values keep their python types"""
+        removed = self.removed_set
+        fill_values = self.fill_values
+        encoders = self.encoders
+        processed = dict()
+        for col, value in row.items():
+            if col in removed:
+                continue
+            if col in fill_values and is_missing(value):
+                value = fill_values[col]
+            if col in encoders:
+                processed.update(encoders[col].transform_value(col, value))
+            else:
+                processed[col] = value
+        return processed
+
+    def save(self, filename):
+        with open(filename, 'wb') as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        logger.info('fitted pipeline saved to {0}'.format(filename))
+
+
+def load_pipeline(filename):
+    with open(filename, 'rb') as f:
+        return pickle.load(f)
@@ -6,6 +6,7 @@ def basic_params_defaults(key):
     defaults = {
         'numeric_imputation_method': 'mean',
         'categorical_imputation_method': 'most_frequent',
+        'categorical_encoding_method': 'auto',
     }
     return defaults[key]
 
@@ -14,6 +15,7 @@ def basic_params_options(key):
     options = {
         'numeric_imputation_method': ['mean', 'median', 'most_frequent'],
         'categorical_imputation_method': ['most_frequent'],
+        'categorical_encoding_method': ['auto', 'ordinal', 'onehot', 'frequency', 'hashing', 'none'],
     }
     return options[key]
 
@@ -27,6 +29,7 @@ class Params(object):
         self.params = {
             "numeric_imputation_method": self.get_numeric_imputation_method(),
             "categorical_imputation_method": self.get_categorical_imputation_method(),
+            "categorical_encoding_method": self.get_categorical_encoding_method(),
         }
 
     def get_numeric_imputation_method(self):
@@ -49,6 +52,16 @@ class Params(object):
 
         return self.user_params[param_name]
 
+    def get_categorical_encoding_method(self):
+        param_name = 'categorical_encoding_method'
+        if not self.is_valid_param_optional(param_name):
+            self.user_params[param_name] = basic_params_defaults(param_name)
+            logger.info('using default {0}: {1}'.format(param_name, self.user_params[param_name]))
+        else:
+            logger.debug('{0} read successfully: {1}'.format(param_name, self.user_params[param_name]))
+
+        return self.user_params[param_name]
+
     def is_valid_param_compulsory(self, key):
         if key not in self.user_params.keys():
             logger.error('{0} not present in user params'.format(key))
@@ -60,9 +73,9 @@ class Params(object):
         if key not in self.user_params.keys():
             logger.debug('{0} not present in user params'.format(key))
             return 0
-        elif self.user_params[key] not in basic_params_options(self.user_params[key]):
+        elif self.user_params[key] not in basic_params_options(key):
             logger.error('{0} not a valid value. '
-                         'it should be one of {1}'.format(key, basic_params_options(self.user_params[key])))
+                         'it should be one of {1}'.format(key, basic_params_options(key)))
             return 0
         else:
             return 1
@@ -1,46 +1,128 @@
 import os
-import numpy as np
-import pandas as pd
+from data_curator.data_readers.file_readers import file_readers
+from data_curator.data_readers.shard_reader import ShardedFileReader
+from data_curator.data_readers.column_store import ColumnStore
+import data_curator.utils.file_utils as fu
+import data_curator.utils.sample_utils as su
+import data_curator.data_curator_profiler as dcp
 
 import logging
 logger = logging.getLogger(__name__)
 
-valid_exts = ['.csv']
-
-
-def nullify_empty(df):
-    df = df.replace(r'^\s*$', np.nan, regex=True)
-    return df
+valid_exts = list(file_readers.keys())
 
 
 class BaseDataReader(object):
     def __init__(self, data_info):
         self.data_info = data_info
 
+    def run_steps(self, steps):
+        """runs the named steps in the given order, each recorded as a reader stage when profiling"""
+        for step in steps:
+            with dcp.stage(step, 'reader'):
+                getattr(self, step)()
+
     def get_ext(self):
+        """
+        data files of every dataset in data_info['shards'] (directories and glob patterns give several files)
+        and their extension
+        """
         self.data_info['ext'] = dict()
+        self.data_info['shards'] = dict()
         for key, filename in self.data_info['datafiles'].items():
-            self.data_info['ext'][key] = os.path.splitext(filename)[1]
+            self.data_info['shards'][key] = fu.expand_filenames(filename, valid_exts)
+            self.data_info['ext'][key] = os.path.splitext(self.data_info['shards'][key][0])[1]
 
     def validate_ext(self):
         for key in self.data_info['datafiles'].keys():
             assert self.data_info['ext'][key] in valid_exts
+            assert all(os.path.splitext(t)[1] == self.data_info['ext'][key] for t in self.data_info['shards'][key]), \
+                'different file extensions in {0} data files'.format(key)
 
     def read_data(self):
         self.data = dict()
+        self.data_info['column_stats'] = dict()
+        if self.data_info.get('sample_rows'):
+            self.data_info['sample'] = dict()
         for key, filename in self.data_info['datafiles'].items():
-            self.data[key] = self.read_data_by_ext(filename, self.data_info['ext'][key])
-    
-    def read_data_by_ext(self, filename, extension):
-        # TODO call CsvReader/ParquetReader/APIReader, etc. based on filename
-        # TODO make sure to return a pandas dataframe only as subsequent ops depend on it
-        if extension == '.csv':
-            logger.debug(filename + ' reading completed')
-            file_read = pd.read_csv(filename)
-            file_read = nullify_empty(file_read)
-            return file_read
-        else:
+            with dcp.stage('read_' + key, 'reader') as record:
+                if self.uses_store():
+                    self.data[key] = self.read_stored(key)
+                else:
+                    self.data[key] = self.read_data_by_ext(self.data_info['shards'][key],
+                                                           self.data_info['ext'][key], key)
+                record['rows'], record['cols'] = dcp.data_shape(self.data[key])
+
+    def uses_store(self):
+        """whether datasets go through the column store, which holds whole datasets (not chunks or samples)"""
+        if not self.data_info.get('store'):
+            return False
+        if self.data_info.get('chunksize') or self.data_info.get('sample_rows'):
+            logger.info('column store skipped for chunked or sampled reading')
+            return False
+        return True
+
+    def read_stored(self, key):
+        """
+        the dataset of key from the column store, parsed from its data files and stored first if they changed
+        since it was stored. the returned dataframe has memory mapped columns
+        """
+        store = ColumnStore(self.data_info['store'])
+        fingerprints = {os.path.abspath(t): fu.file_fingerprint(t) for t in self.data_info['shards'][key]}
+        columns = self.read_columns(key)
+        if store.is_current(key, fingerprints, columns):
+            logger.info('{0} data opened from column store {1}'.format(key, store.dataset_folder(key)))
+            return store.open(key)
+        data = self.read_data_by_ext(self.data_info['shards'][key], self.data_info['ext'][key], key)
+        store.write(key, data, fingerprints, columns)
+        del data
+        return store.open(key)
+
+    def read_data_by_ext(self, filename, extension, key=None):
+        """filename: a data file or a list of data files (shards) read as one dataset"""
+        # TODO add an APIReader, etc.
+        # file readers return pandas dataframes only as subsequent ops depend on it
+        if extension not in file_readers:
             raise NotImplementedError
+        if isinstance(filename, list) and len(filename) == 1:
+            filename = filename[0]
+        columns = self.read_columns(key)
+        if isinstance(filename, list):
+            reader = ShardedFileReader(filename, extension, columns, self.data_info.get('n_jobs', 1))
+            filename = '{0} ({1} files)'.format(os.path.dirname(filename[0]), len(filename))
+        else:
+            reader = file_readers[extension](filename, columns)
+        if self.data_info.get('sample_rows'):
+            return self.read_sample(reader, filename, key)
+        if key is not None:
+            self.data_info['column_stats'][key] = reader.column_stats()
+        if self.data_info.get('chunksize'):
+            logger.debug(filename + ' set up for reading in chunks of {0} rows'.format(self.data_info['chunksize']))
+            return reader.read_chunks(self.data_info['chunksize'])
+        file_read = reader.read()
+        logger.debug(filename + ' reading completed')
+        return file_read
+
+    def read_columns(self, key):
+        """the columns to read of a dataset, all if None"""
+        return self.data_info.get('columns')
+
+    def read_sample(self, reader, filename, key=None):
+        """
+        streams the file into a row sample (see sample_utils), stratified by the target column if asked for
+        and present. file statistics describe all rows, so none are kept for the sample
+        """
+        chunks = reader.read_chunks(self.data_info.get('chunksize') or su.SAMPLE_CHUNKSIZE)
+        strata_col = None
+        if self.data_info.get('sample_method') == 'stratified' and not self.data_info['no_target'] and \
+                self.data_info['decision_variable'] in chunks.columns:
+            strata_col = self.data_info['decision_variable']
+        sample, info = su.sample_rows(chunks, self.data_info['sample_rows'], strata_col, su.SAMPLE_SEED)
+        if key is not None:
+            self.data_info['column_stats'][key] = dict()
+            self.data_info['sample'][key] = info
+        logger.debug(filename + ' sampled {0} of {1} rows'.format(info['sample_rows'], info['n_rows']))
+        return sample
 
     def establish_cols(self):
         if self.data_info['no_target']:
@@ -63,14 +145,21 @@ class TrainTestDataReader(BaseDataReader):
         super().__init__(data_info)
     
     def run(self):
-        self.get_ext()
-        self.validate_ext()
-        self.compare_train_test_ext()
-        self.read_data()
-        self.establish_cols()
-        self.compare_train_test_cols()
+        self.run_steps(['get_ext', 'validate_ext', 'compare_train_test_ext', 'read_data', 'establish_cols',
+                        'compare_train_test_cols'])
         return self.data, self.data_info
 
+    def read_columns(self, key):
+        """the columns to read of a dataset, without the target column for test data that has none"""
+        columns = self.data_info.get('columns')
+        target_col = self.data_info['decision_variable']
+        if key != 'test' or columns is None or target_col not in columns or self.data_info['no_target']:
+            return columns
+        shard = self.data_info['shards'][key][0]
+        if target_col in file_readers[self.data_info['ext'][key]](shard).column_names():
+            return columns
+        return [t for t in columns if t != target_col]
+
     def compare_train_test_ext(self):
         assert self.data_info['ext']['train'] == self.data_info['ext']['test']
         logger.debug('PASSED: train test file extensions same')
@@ -83,16 +172,16 @@ class TrainTestDataReader(BaseDataReader):
         logger.debug('PASSED: train test features and target col same/checked')
 
     def establish_cols_with_target(self):
-        logger.debug('checking for target column: {0}'.format(self.data_info['target_col']))
+        logger.debug('checking for target column: {0}'.format(self.data_info['decision_variable']))
         self.data_info['features'] = dict()
         self.data_info['target_col'] = dict()
 
-        target_col = self.data_info['target_col']
+        target_col = self.data_info['decision_variable']
         self.data_info['target_col']['train'] = target_col
 
         assert target_col in self.data['train'].columns, \
             'target column: {0} not present in training data'.format(target_col)
-        self.data_info['features']['train'] = self.data['train'].columns.tolist().remove(target_col)
+        self.data_info['features']['train'] = [t for t in self.data['train'].columns if t != target_col]
 
         if target_col not in self.data['test'].columns:
             logger.info('No target column in test data. Seems like competition data.')
@@ -101,7 +190,7 @@ class TrainTestDataReader(BaseDataReader):
         else:
             logger.debug('target column present in test data.')
             self.data_info['target_col']['test'] = target_col
-            self.data_info['features']['test'] = self.data['test'].columns.tolist().remove(target_col)
+            self.data_info['features']['test'] = [t for t in self.data['test'].columns if t != target_col]
         
 
 class TotalDataReader(BaseDataReader):
@@ -109,10 +198,7 @@ class TotalDataReader(BaseDataReader):
         super().__init__(data_info)
     
     def run(self):
-        self.get_ext()
-        self.validate_ext()
-        self.read_data()
-        self.establish_cols()
+        self.run_steps(['get_ext', 'validate_ext', 'read_data', 'establish_cols'])
         return self.data, self.data_info
 
     def establish_cols_with_target(self):
@@ -124,5 +210,5 @@ class TotalDataReader(BaseDataReader):
 
         assert target_col in self.data['total'].columns, \
             'target column: {0} not present in total data'.format(target_col)
-        self.data_info['features']['total'] = self.data['total'].columns.tolist().remove(target_col)
+        self.data_info['features']['total'] = [t for t in self.data['total'].columns if t != target_col]
         logger.debug('fetched target column: {0}'.format(target_col))
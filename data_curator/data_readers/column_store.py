@@ -0,0 +1,162 @@
+"""
+local columnar store of parsed datasets, so that reruns, and other processes, skip parsing the data files.
+a dataset is stored in a folder with a .npy file per column and an index (store_index.json) of its columns,
+rows and the fingerprints of the data files it was parsed from. columns are opened memory mapped, copy on write:
+processes opening the same dataset share its pages, in-place processing writes private copies and never the store.
+    numeric, bool and datetime columns: the column values, opened without copying
+    tz-aware datetime columns (from arrow files): their UTC datetime values and time zone, converted back to the
+        time zone on opening
+    object (string) columns: codes (-1 for missing) and distinct values, rebuilt into an object column on opening,
+        with missing values as they were read (None or nan)
+    categorical columns (of numpy dtype categories): codes and categories
+columns of other dtypes cannot be stored, write raises ValueError for them
+"""
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+from data_curator.data_readers.file_readers import import_pyarrow
+
+import logging
+logger = logging.getLogger(__name__)
+
+# bump when the stored layout changes
+STORE_VERSION = 2
+INDEX_FILE = 'store_index.json'
+VALUE_KINDS = 'biufcmM'
+
+
+def save_values(path, values):
+    """saves distinct values, as unicode strings where they all are (no pickle needed to load them)"""
+    if values.dtype.kind == 'O' and all(isinstance(t, str) for t in values):
+        values = values.astype(str)
+    np.save(path, values, allow_pickle=True)
+
+
+def codes_dtype(n_values):
+    return np.int32 if n_values < 2**31 - 1 else np.int64
+
+
+def tz_name(col, dtype):
+    """
+    name of the time zone of a tz-aware datetime dtype, as arrow names it, raises ValueError if the name does not
+    give back the time zone of the dtype
+    """
+    pa = import_pyarrow()
+    try:
+        name = pa.lib.tzinfo_to_string(dtype.tz)
+    except (ValueError, TypeError, pa.ArrowException):
+        name = None
+    if name is None or pd.DatetimeTZDtype(dtype.unit, pa.lib.string_to_tzinfo(name)) != dtype:
+        raise ValueError('column {0} of dtype {1} cannot be stored, its time zone has no name'.format(col, dtype))
+    return name
+
+
+class ColumnStore(object):
+    def __init__(self, folder):
+        self.folder = folder
+
+    def dataset_folder(self, key):
+        return os.path.join(self.folder, key)
+
+    def index(self, key):
+        """index of the stored dataset, None if not stored"""
+        try:
+            with open(os.path.join(self.dataset_folder(key), INDEX_FILE)) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def is_current(self, key, fingerprints, columns=None):
+        """whether the stored dataset was parsed from these data files (fingerprints) with these columns"""
+        index = self.index(key)
+        return index is not None and index['version'] == STORE_VERSION and index['fingerprints'] == fingerprints \
+            and index['read_columns'] == columns
+
+    def write(self, key, data, fingerprints, columns=None):
+        """
+        stores a dataframe as the dataset of key, replacing the stored one. it is written to a temporary folder
+        first, readers never see a partly written dataset
+        """
+        folder = self.dataset_folder(key)
+        tmp_folder = '{0}.{1}.tmp'.format(folder, os.getpid())
+        shutil.rmtree(tmp_folder, ignore_errors=True)
+        os.makedirs(tmp_folder)
+        stored_columns = []
+        try:
+            for i, col in enumerate(data.columns):
+                stored_columns.append(self.write_column(tmp_folder, 'col_{0}'.format(i), col, data.iloc[:, i]))
+        except ValueError:
+            shutil.rmtree(tmp_folder, ignore_errors=True)
+            raise
+        index = {'version': STORE_VERSION, 'n_rows': len(data), 'fingerprints': fingerprints,
+                 'read_columns': columns, 'columns': stored_columns}
+        with open(os.path.join(tmp_folder, INDEX_FILE), 'w') as f:
+            json.dump(index, f)
+        shutil.rmtree(folder, ignore_errors=True)
+        os.replace(tmp_folder, folder)
+        logger.info('{0} data stored in {1}'.format(key, folder))
+
+    @staticmethod
+    def write_column(folder, name, col, values):
+        """writes the files of a column, returns its index entry"""
+        entry = {'name': col, 'dtype': str(values.dtype)}
+        if isinstance(values.dtype, pd.CategoricalDtype) and isinstance(values.cat.categories.dtype, np.dtype):
+            entry.update({'kind': 'categorical', 'ordered': bool(values.cat.ordered)})
+            np.save(os.path.join(folder, name + '.npy'), values.cat.codes.values)
+            save_values(os.path.join(folder, name + '_values.npy'), values.cat.categories.values)
+        elif isinstance(values.dtype, pd.DatetimeTZDtype):
+            entry.update({'kind': 'values', 'tz': tz_name(col, values.dtype)})
+            np.save(os.path.join(folder, name + '.npy'), values.dt.tz_convert('UTC').dt.tz_localize(None).values)
+        elif isinstance(values.dtype, np.dtype) and values.dtype.kind in VALUE_KINDS:
+            entry['kind'] = 'values'
+            np.save(os.path.join(folder, name + '.npy'), values.values)
+        elif isinstance(values.dtype, np.dtype) and values.dtype.kind == 'O':
+            objects = values.values
+            codes, uniques = pd.factorize(objects)
+            # missing values as read: None (arrow) or nan (csv)
+            entry.update({'kind': 'strings', 'none_missing': all(t is None for t in objects[codes < 0])})
+            np.save(os.path.join(folder, name + '.npy'), codes.astype(codes_dtype(len(uniques))))
+            save_values(os.path.join(folder, name + '_values.npy'), np.asarray(uniques, dtype=object))
+        else:
+            raise ValueError('column {0} of dtype {1} cannot be stored'.format(col, values.dtype))
+        entry['file'] = name
+        return entry
+
+    def open(self, key, columns=None):
+        """
+        the stored dataset of key (only these columns if given) as a dataframe of memory mapped columns,
+        raises ValueError if it is not stored
+        """
+        index = self.index(key)
+        if index is None:
+            raise ValueError('no {0} data in column store {1}'.format(key, self.folder))
+        entries = index['columns']
+        if columns is not None:
+            names = [t['name'] for t in entries]
+            missing = [t for t in columns if t not in names]
+            if missing:
+                raise ValueError('columns {0} not in the stored {1} data'.format(missing, key))
+            entries = [entries[names.index(t)] for t in columns]
+        folder = self.dataset_folder(key)
+        data = {t['name']: self.open_column(folder, t) for t in entries}
+        return pd.DataFrame(data, index=pd.RangeIndex(index['n_rows']), columns=[t['name'] for t in entries],
+                            copy=False)
+
+    @staticmethod
+    def open_column(folder, entry):
+        values = np.load(os.path.join(folder, entry['file'] + '.npy'), mmap_mode='c')
+        if entry['kind'] == 'values' and 'tz' in entry:
+            tz = import_pyarrow().lib.string_to_tzinfo(entry['tz'])
+            return pd.DatetimeIndex(values).tz_localize('UTC').tz_convert(tz).array
+        if entry['kind'] == 'values':
+            return values
+        uniques = np.load(os.path.join(folder, entry['file'] + '_values.npy'), allow_pickle=True)
+        if entry['kind'] == 'categorical':
+            return pd.Categorical.from_codes(values, categories=pd.Index(uniques), ordered=entry['ordered'])
+        col = np.empty(len(values), dtype=object)
+        missing = values < 0
+        col[~missing] = uniques.astype(object)[values[~missing]]
+        col[missing] = None if entry['none_missing'] else np.nan
+        return col
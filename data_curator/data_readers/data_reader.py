@@ -1,20 +1,46 @@
 from data_curator.data_readers.base_reader import TrainTestDataReader, TotalDataReader
+import data_curator.data_curator_profiler as dcp
 
 import logging
 logger = logging.getLogger(__name__)
 
 
 class DataReader(object):
-    def __init__(self, datafiles, no_target, decision_variable):
+    def __init__(self, datafiles, no_target, decision_variable, chunksize=None, columns=None, sample=None,
+                 sample_method='stratified', n_jobs=1, store=None):
+        """
+        datafiles: {data key: data file, directory of data files or glob pattern}, several files of a dataset
+            are read as one (see ShardedFileReader)
+        chunksize: if given, files are not loaded but streamed in chunks of (at most) chunksize rows
+            (data then holds chunk sources instead of dataframes)
+        columns: if given, only these columns are read
+        sample: if given, files are streamed into samples of this many rows, data then holds the samples
+            and data_info['sample'] their info (see sample_utils)
+        sample_method: 'stratified' (by the target column, if any) or 'reservoir'
+        n_jobs: number of threads reading the files of a dataset concurrently
+        store: folder of a column store (see ColumnStore): datasets are opened from it, memory mapped, and parsed
+            (and stored) only when their data files changed
+        """
         self.data_info = dict()
         self.data_info['datafiles'] = datafiles
         self.reader_class = None
         self.data_info['no_target'] = True if no_target else False
         self.data_info['decision_variable'] = decision_variable
+        self.data_info['chunksize'] = chunksize
+        self.data_info['columns'] = columns
+        if sample_method not in ['stratified', 'reservoir']:
+            raise NotImplementedError('unknown sample method {0}'.format(sample_method))
+        self.data_info['sample_rows'] = sample
+        self.data_info['sample_method'] = sample_method
+        self.data_info['n_jobs'] = n_jobs
+        self.data_info['store'] = store
     
     def run(self):
         self.set_reader_type()
-        return self.reader_class(self.data_info).run()
+        with dcp.stage('read', 'reader') as record:
+            data, data_info = self.reader_class(self.data_info).run()
+            record['rows'], record['cols'] = dcp.datasets_shape(data)
+        return data, data_info
 
     def set_reader_type(self):
         if ('train' in self.data_info['datafiles'].keys()) and \
@@ -0,0 +1,292 @@
+"""
+file readers by extension. every reader returns pandas dataframes, as subsequent ops depend on it:
+    read(): the whole file as one dataframe
+    column_names(): the columns of the file, read from its header or schema only
+    read_chunks(chunksize): an iterable of dataframes streamed from the file, select(columns) of which streams
+        the file projected onto columns
+    column_stats(): statistics already stored in the file, {column: {'null_count': .., 'min': .., 'max': ..}}
+        only the entries that agree with pandas' view of the data are given
+columns (optional) projects the file onto the given columns.
+parquet, feather and arrow ipc readers need pyarrow
+"""
+import math
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_object_dtype, is_string_dtype
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def blank_string_mask(col):
+    """
+    boolean mask of the empty or whitespace-only strings of a column (None if there are none).
+    the whitespace test runs once per distinct value instead of once per cell
+    """
+    codes, uniques = pd.factorize(col)
+    blank_codes = [i for i, t in enumerate(uniques) if isinstance(t, str) and (t == '' or t.isspace())]
+    if not blank_codes:
+        return None
+    return np.isin(codes, blank_codes)
+
+
+def nullify_empty(df):
+    """
+    replaces empty and whitespace-only strings with np.nan, gives the same result as
+    df.replace(r'^\\s*$', np.nan, regex=True) while only scanning text columns.
+    like replace, object columns left without strings are converted to a numeric dtype.
+    categorical columns (e.g. from parquet or feather) lose their blank string categories, so their values are
+    missing as they are in the text columns of a csv file.
+    the dataframe is modified in place and returned
+    """
+    for col, dtype in df.dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype):
+            blank_mask = blank_string_mask(dtype.categories)
+            if blank_mask is not None:
+                df[col] = df[col].cat.remove_categories(dtype.categories[blank_mask])
+    text_cols = [col for col, dtype in df.dtypes.items() if is_object_dtype(dtype) or is_string_dtype(dtype)]
+    for col in text_cols:
+        blank_mask = blank_string_mask(df[col])
+        if blank_mask is not None:
+            values = df[col].copy()
+            values[blank_mask] = np.nan
+            df[col] = values
+        if is_object_dtype(df[col].dtype):
+            converted = df[col].infer_objects(copy=False)
+            if converted.dtype != df[col].dtype:
+                df[col] = converted
+    return df
+
+
+def to_numpy_dtypes(df):
+    """
+    converts pandas nullable columns (restored from pandas metadata of arrow files) to the numpy dtypes
+    read_csv gives: int/bool without missing values keep their numpy dtype, numeric with missing values become
+    float64 and everything else object, missing values are np.nan
+    """
+    for col, dtype in df.dtypes.items():
+        if isinstance(dtype, (np.dtype, pd.CategoricalDtype, pd.DatetimeTZDtype)):
+            continue
+        if dtype.kind in 'iub' and not df[col].isna().any():
+            df[col] = df[col].to_numpy(dtype=dtype.numpy_dtype)
+        elif dtype.kind in 'iuf':
+            df[col] = df[col].to_numpy(dtype='float64', na_value=np.nan)
+        else:
+            df[col] = df[col].to_numpy(dtype=object, na_value=np.nan)
+    return df
+
+
+def arrow_to_pandas(table):
+    """arrow table or record batch to a dataframe, as read_csv would give it"""
+    return nullify_empty(to_numpy_dtypes(table.to_pandas()))
+
+
+def import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError('pyarrow is required to read parquet, feather and arrow files: pip install pyarrow')
+    return pyarrow
+
+
+class ChunkedCsv(object):
+    """
+    csv file read lazily in chunks of chunksize rows, each iteration streams the file again.
+    only the header is read up front, so the columns are known without loading any data
+    """
+    def __init__(self, filename, chunksize, columns=None):
+        self.filename = filename
+        self.chunksize = chunksize
+        self.usecols = columns
+        self.columns = pd.read_csv(filename, nrows=0, usecols=columns).columns
+
+    def __iter__(self):
+        n_chunks = 0
+        with pd.read_csv(self.filename, chunksize=self.chunksize, usecols=self.usecols) as chunks:
+            for chunk in chunks:
+                n_chunks += 1
+                yield nullify_empty(chunk)
+        if n_chunks == 0:
+            yield pd.read_csv(self.filename, nrows=0, usecols=self.usecols)
+
+    def select(self, columns):
+        return ChunkedCsv(self.filename, self.chunksize, columns)
+
+
+class ChunkedArrow(object):
+    """
+    parquet or arrow ipc file read lazily, one record batch at a time.
+    parquet batches hold at most chunksize rows and are read row group by row group,
+    arrow ipc batches are the record batches stored in the file
+    """
+    def __init__(self, reader, chunksize):
+        self.reader = reader
+        self.chunksize = chunksize
+        self.columns = pd.Index(reader.schema().names)
+
+    def __iter__(self):
+        n_chunks = 0
+        for batch in self.reader.iter_batches(self.chunksize):
+            n_chunks += 1
+            yield arrow_to_pandas(batch)
+        if n_chunks == 0:
+            yield arrow_to_pandas(self.reader.schema().empty_table())
+
+    def select(self, columns):
+        return ChunkedArrow(type(self.reader)(self.reader.filename, columns), self.chunksize)
+
+
+class CsvFileReader(object):
+    def __init__(self, filename, columns=None):
+        self.filename = filename
+        self.columns = columns
+
+    def read(self):
+        return nullify_empty(pd.read_csv(self.filename, usecols=self.columns))
+
+    def column_names(self):
+        return pd.read_csv(self.filename, nrows=0, usecols=self.columns).columns
+
+    def read_chunks(self, chunksize):
+        return ChunkedCsv(self.filename, chunksize, self.columns)
+
+    def column_stats(self):
+        return dict()
+
+
+class ParquetFileReader(object):
+    def __init__(self, filename, columns=None):
+        self.filename = filename
+        self.columns = columns
+        self.pa = import_pyarrow()
+        self.parquet_file = self.pa.parquet.ParquetFile(filename)
+
+    def schema(self):
+        schema = self.parquet_file.schema_arrow
+        if self.columns is not None:
+            schema = self.pa.schema([schema.field(t) for t in self.columns])
+        return schema
+
+    def read(self, row_groups=None):
+        """reads the given row groups (all if None)"""
+        return arrow_to_pandas(self.read_table(row_groups))
+
+    def read_table(self, row_groups=None):
+        """the given row groups (all if None) as an arrow table"""
+        if row_groups is None:
+            return self.parquet_file.read(columns=self.columns, use_pandas_metadata=True)
+        return self.parquet_file.read_row_groups(row_groups, columns=self.columns, use_pandas_metadata=True)
+
+    def column_names(self):
+        return pd.Index(self.schema().names)
+
+    def iter_batches(self, chunksize):
+        return self.parquet_file.iter_batches(batch_size=chunksize, columns=self.columns)
+
+    def read_chunks(self, chunksize):
+        return ChunkedArrow(self, chunksize)
+
+    def column_stats(self):
+        """
+        footer statistics merged over row groups. null counts are only given for integer and boolean
+        columns (blank strings and NaN/inf floats are missing to pandas but not to parquet), min/max only
+        for numeric columns with finite values
+        """
+        pa = self.pa
+        metadata = self.parquet_file.metadata
+        stats = dict()
+        for field in self.schema():
+            if not (pa.types.is_integer(field.type) or pa.types.is_floating(field.type) or
+                    pa.types.is_boolean(field.type)):
+                continue
+            col_stats = self.merge_row_group_stats(metadata, field.name)
+            if col_stats is None:
+                continue
+            if pa.types.is_floating(field.type):
+                col_stats.pop('null_count')
+            if pa.types.is_boolean(field.type):
+                col_stats.pop('min', None)
+                col_stats.pop('max', None)
+            if any(isinstance(t, float) and not math.isfinite(t) for t in col_stats.values()):
+                col_stats.pop('min', None)
+                col_stats.pop('max', None)
+            if col_stats:
+                stats[field.name] = col_stats
+        logger.debug('{0} footer statistics read for {1} columns'.format(self.filename, len(stats)))
+        return stats
+
+    @staticmethod
+    def merge_row_group_stats(metadata, name):
+        null_count, col_min, col_max = 0, None, None
+        for rg in range(metadata.num_row_groups):
+            row_group = metadata.row_group(rg)
+            if row_group.num_rows == 0:
+                continue
+            col_meta = [row_group.column(j) for j in range(row_group.num_columns)
+                        if row_group.column(j).path_in_schema == name]
+            if not col_meta or col_meta[0].statistics is None or not col_meta[0].statistics.has_null_count:
+                return None
+            statistics = col_meta[0].statistics
+            null_count += statistics.null_count
+            if statistics.has_min_max:
+                col_min = statistics.min if col_min is None else min(col_min, statistics.min)
+                col_max = statistics.max if col_max is None else max(col_max, statistics.max)
+            elif statistics.null_count != row_group.num_rows:
+                return None
+        col_stats = {'null_count': null_count}
+        if col_min is not None:
+            col_stats.update({'min': col_min, 'max': col_max})
+        return col_stats
+
+
+class ArrowIpcFileReader(object):
+    """feather (v2) and arrow ipc files, memory mapped"""
+    def __init__(self, filename, columns=None):
+        self.filename = filename
+        self.columns = columns
+        self.pa = import_pyarrow()
+
+    def open(self):
+        return self.pa.ipc.open_file(self.pa.memory_map(self.filename))
+
+    def schema(self):
+        schema = self.open().schema
+        if self.columns is not None:
+            schema = self.pa.schema([schema.field(t) for t in self.columns])
+        return schema
+
+    def read(self):
+        return arrow_to_pandas(self.read_table())
+
+    def read_table(self):
+        table = self.open().read_all()
+        if self.columns is not None:
+            table = table.select(self.columns)
+        return table
+
+    def column_names(self):
+        return pd.Index(self.schema().names)
+
+    def iter_batches(self, chunksize):
+        reader = self.open()
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i)
+            yield batch if self.columns is None else batch.select(self.columns)
+
+    def read_chunks(self, chunksize):
+        return ChunkedArrow(self, chunksize)
+
+    def column_stats(self):
+        return dict()
+
+
+file_readers = {
+    '.csv': CsvFileReader,
+    '.parquet': ParquetFileReader,
+    '.pq': ParquetFileReader,
+    '.feather': ArrowIpcFileReader,
+    '.arrow': ArrowIpcFileReader,
+    '.ipc': ArrowIpcFileReader,
+}
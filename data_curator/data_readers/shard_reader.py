@@ -0,0 +1,96 @@
+"""
+reader of a dataset stored as several files (shards) of one format, with the file reader interface
+(read, read_chunks, column_stats, column_names), so that the shards are one logical dataset.
+all shards must have the same columns, in any order: the column order of the first shard is kept.
+    read(): shards are read concurrently by up to n_jobs threads. parquet and arrow shards are read as arrow
+        tables and concatenated without copying (types promoted where they differ, e.g. int64 and double),
+        the dataset is then converted to pandas once. csv shards are read into dataframes and concatenated once
+    read_chunks(chunksize): the chunks of the shards one shard after the other, without concatenation
+    column_stats(): statistics stored in the files, merged over the shards where all shards have them
+"""
+from functools import partial
+import pandas as pd
+from data_curator.data_readers.file_readers import file_readers, arrow_to_pandas, import_pyarrow
+from data_curator.data_checkers.check_runner import run_tasks
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class ChainedChunks(object):
+    """chunks of several chunk sources, one source after the other, with their columns in a common order"""
+    def __init__(self, sources, columns):
+        self.sources = sources
+        self.columns = columns
+
+    def __iter__(self):
+        for source in self.sources:
+            same_order = list(source.columns) == list(self.columns)
+            for chunk in source:
+                yield chunk if same_order else chunk[self.columns]
+
+    def select(self, columns):
+        return ChainedChunks([t.select(columns) for t in self.sources], pd.Index(columns))
+
+
+class ShardedFileReader(object):
+    def __init__(self, filenames, extension, columns=None, n_jobs=1):
+        if extension not in file_readers:
+            raise NotImplementedError
+        self.filenames = filenames
+        self.readers = [file_readers[extension](t, columns) for t in filenames]
+        self.n_jobs = n_jobs
+        self.columns = self.unify_columns()
+
+    def unify_columns(self):
+        """columns of the first shard, raises ValueError if another shard has other columns"""
+        columns = self.readers[0].column_names()
+        for filename, reader in zip(self.filenames[1:], self.readers[1:]):
+            shard_columns = reader.column_names()
+            if set(shard_columns) != set(columns):
+                raise ValueError('different columns in data file {0} than in {1}: missing {2}, extra {3}'.format(
+                    filename, self.filenames[0], [t for t in columns if t not in set(shard_columns)],
+                    [t for t in shard_columns if t not in set(columns)]))
+        return columns
+
+    def column_names(self):
+        return self.columns
+
+    def read_shards(self, read):
+        """read(reader) of every shard, run concurrently by up to n_jobs threads, in shard order"""
+        tasks = {i: (partial(read, reader), []) for i, reader in enumerate(self.readers)}
+        return list(run_tasks(tasks, min(self.n_jobs, len(self.readers))).values())
+
+    def read(self):
+        if hasattr(self.readers[0], 'read_table'):
+            tables = self.read_shards(lambda reader: reader.read_table().select(list(self.columns)))
+            pa = import_pyarrow()
+            try:
+                table = pa.concat_tables(tables, promote_options='permissive')
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                # no common arrow type (e.g. int64 and string), pandas makes these columns object
+                logger.debug('shard types differ, converting {0} shards to pandas one by one'.format(len(tables)))
+                return pd.concat([arrow_to_pandas(t) for t in tables], ignore_index=True)
+            del tables
+            return arrow_to_pandas(table)
+        frames = self.read_shards(lambda reader: reader.read()[self.columns])
+        return pd.concat(frames, ignore_index=True)
+
+    def read_chunks(self, chunksize):
+        return ChainedChunks([t.read_chunks(chunksize) for t in self.readers], self.columns)
+
+    def column_stats(self):
+        """statistics of the columns whose shards all have them: null counts summed, min of mins, max of maxes"""
+        shard_stats = [t.column_stats() for t in self.readers]
+        stats = dict()
+        for col in shard_stats[0].keys():
+            col_stats = [t.get(col, dict()) for t in shard_stats]
+            merged = dict()
+            if all('null_count' in t for t in col_stats):
+                merged['null_count'] = sum(t['null_count'] for t in col_stats)
+            if all('min' in t for t in col_stats):
+                merged['min'] = min(t['min'] for t in col_stats)
+                merged['max'] = max(t['max'] for t in col_stats)
+            if merged:
+                stats[col] = merged
+        return stats
@@ -1,11 +1,22 @@
+import numpy as np
+import pandas as pd
+
 
 def get_base_types(dtype):
-    if dtype.str.startswith('<f'):
+    # by kind, so that downcast (int8, float32, ..) columns keep their base type
+    if dtype.kind == 'f':
         return_val = 'float'
-    elif dtype.str.startswith('<i'):
+    elif dtype.kind in 'iu':
         return_val = 'int'
-    elif dtype.str.startswith('|O'):
+    elif dtype.kind == 'O':
         return_val = 'string'
     else:
         return_val = 'undefined'
     return return_val
+
+
+def get_class_counts(target):
+    """non-null row counts per class of a target column in one pass, classes in order of first appearance"""
+    codes, classes = pd.factorize(target)
+    counts = np.bincount(codes[codes >= 0], minlength=len(classes))
+    return dict(zip(classes.tolist(), counts.tolist()))
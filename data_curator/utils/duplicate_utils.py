@@ -0,0 +1,169 @@
+import hashlib
+import itertools
+from collections import defaultdict
+import numpy as np
+import pandas as pd
+
+import logging
+logger = logging.getLogger(__name__)
+
+N_PROBE_ROWS = 64
+FINGERPRINT_CHUNK_COLS = 64
+
+
+def value_hashes(frame):
+    """
+    vectorized per value hashes of a frame, shaped (rows, cols).
+    -0.0 is normalized to 0.0 so that hashes agree with Series.equals
+    """
+    if all(isinstance(t, np.dtype) for t in frame.dtypes) and frame.dtypes.nunique() == 1:
+        values = frame.to_numpy()
+        if values.dtype.kind == 'f':
+            values = values + 0.0
+        return pd.util.hash_array(values.ravel()).reshape(values.shape)
+    hashes = np.empty(frame.shape, dtype=np.uint64)
+    for i in range(frame.shape[1]):
+        col = frame.iloc[:, i]
+        if col.dtype.kind == 'f':
+            col = col + 0.0
+        hashes[:, i] = pd.util.hash_pandas_object(col, index=False).values
+    return hashes
+
+
+def columns_equal(data, ind0, ind1):
+    """NaN tolerant equality: rows where either column is missing are ignored"""
+    col_names = [data.columns[ind0], data.columns[ind1]]
+    df = data[col_names]
+    df = df.dropna()
+    return df[col_names[0]].equals(df[col_names[1]])
+
+
+def complete_rows_fingerprints(data, col_inds):
+    """
+    fingerprints columns over the rows where every one of col_inds is non-missing. columns equal on their
+    common non-missing rows are also equal on these rows, so equal columns always share a fingerprint
+    """
+    complete_rows = data.iloc[:, col_inds].notnull().all(axis=1).values
+    fingerprints = dict()
+    for start in range(0, len(col_inds), FINGERPRINT_CHUNK_COLS):
+        chunk_inds = col_inds[start:start + FINGERPRINT_CHUNK_COLS]
+        chunk_hashes = np.asfortranarray(value_hashes(data.iloc[complete_rows, chunk_inds]))
+        for i, col_ind in enumerate(chunk_inds):
+            fingerprints[col_ind] = hashlib.blake2b(chunk_hashes[:, i].tobytes(), digest_size=16).digest()
+    return fingerprints
+
+
+def split_on_probe_row(probe_hashes, probe_nulls, positions, row):
+    """groups positions by value at the probe row, returns (groups by hash, missing positions, valued positions)"""
+    nulls = probe_nulls[row, positions]
+    valued = positions[~nulls]
+    unique_hashes, hash_groups = np.unique(probe_hashes[row, valued], return_inverse=True)
+    order = np.argsort(hash_groups, kind='stable')
+    groups = np.split(valued[order], np.cumsum(np.bincount(hash_groups, minlength=len(unique_hashes)))[:-1])
+    return dict(zip(unique_hashes.tolist(), groups)), positions[nulls], valued
+
+
+def probe_candidate_joins(probe_hashes, probe_nulls):
+    """
+    narrows down the column pairs that can be equal using the values at the probe rows.
+    a pair can only be equal if at every probe row the values match or either one is missing, so
+    columns are grouped by value one probe row at a time, and the columns missing at that row are
+    joined against the rest instead of being copied into every group.
+    returns (left positions, right positions) joins left after all probe rows, right is None for
+    pairs within left
+    """
+    n_probe_rows = probe_hashes.shape[0]
+    leaves = []
+    pending = [(np.arange(probe_hashes.shape[1]), None, 0)]
+    while pending:
+        left, right, row = pending.pop()
+        if (right is None and len(left) < 2) or (right is not None and (len(left) == 0 or len(right) == 0)):
+            continue
+        if row == n_probe_rows:
+            leaves.append((left, right))
+            continue
+
+        left_groups, left_nulls, left_valued = split_on_probe_row(probe_hashes, probe_nulls, left, row)
+        if right is None:
+            pending.extend([(group, None, row + 1) for group in left_groups.values()])
+            pending.append((left_nulls, None, row + 1))
+            pending.append((left_nulls, left_valued, row + 1))
+        else:
+            right_groups, right_nulls, right_valued = split_on_probe_row(probe_hashes, probe_nulls, right, row)
+            pending.extend([(group, right_groups[value], row + 1) for value, group in left_groups.items()
+                            if value in right_groups])
+            pending.append((left_nulls, right, row + 1))
+            pending.append((left_valued, right_nulls, row + 1))
+    return leaves
+
+
+def leaf_candidate_pairs(data, left, right):
+    """candidate pairs of a probe leaf, split further by the complete rows fingerprints when worthwhile"""
+    if right is None:
+        if len(left) == 2:
+            return [tuple(left)]
+        fingerprints = complete_rows_fingerprints(data, list(left))
+        buckets = defaultdict(list)
+        for col_ind in left:
+            buckets[fingerprints[col_ind]].append(col_ind)
+        return [t for bucket in buckets.values() for t in itertools.combinations(bucket, 2)]
+
+    if len(left) * len(right) == 1:
+        return [(left[0], right[0])]
+    fingerprints = complete_rows_fingerprints(data, list(left) + list(right))
+    right_buckets = defaultdict(list)
+    for col_ind in right:
+        right_buckets[fingerprints[col_ind]].append(col_ind)
+    return [(t0, t1) for t0 in left for t1 in right_buckets.get(fingerprints[t0], [])]
+
+
+def find_duplicate_columns(data, all_null_cols=None, include_all_null=True):
+    """
+    returns sorted [ind0, ind1] (ind0 < ind1) column index pairs that are equal as per columns_equal.
+    only columns sharing a dtype and surviving the probe rows and fingerprint bucketing are compared pairwise,
+    all-null columns are equal to every column of the same dtype and are paired without comparison
+    (left out if include_all_null is False).
+    all_null_cols (boolean array per column) is computed from the data when not given
+    """
+    if all_null_cols is None:
+        all_null_cols = data.isnull().all(axis=0).values
+    dtype_groups = defaultdict(list)
+    for col_ind, dtype in enumerate(data.dtypes.values):
+        dtype_groups[str(dtype)].append(col_ind)
+    probe_rows = np.unique(np.linspace(0, max(data.shape[0] - 1, 0), min(data.shape[0], N_PROBE_ROWS)).astype(int))
+
+    col_duplicates = set()
+    for dtype, col_inds in dtype_groups.items():
+        null_inds = [t for t in col_inds if all_null_cols[t]]
+        valued_inds = np.array([t for t in col_inds if not all_null_cols[t]], dtype=int)
+        for null_ind in (null_inds if include_all_null else []):
+            col_duplicates.update([tuple(sorted([null_ind, t])) for t in col_inds if t != null_ind])
+        if len(valued_inds) < 2:
+            continue
+
+        probe = data.iloc[probe_rows, valued_inds]
+        leaves = probe_candidate_joins(value_hashes(probe), probe.isnull().values)
+        candidate_pairs = set()
+        for left, right in leaves:
+            candidate_pairs.update(tuple(sorted(t)) for t in leaf_candidate_pairs(
+                data, valued_inds[left], None if right is None else valued_inds[right]))
+        logger.debug('{0} columns of dtype {1}: {2} candidate pairs compared'.format(
+            len(valued_inds), dtype, len(candidate_pairs)))
+        col_duplicates.update([t for t in candidate_pairs if columns_equal(data, t[0], t[1])])
+
+    return [[int(t0), int(t1)] for t0, t1 in sorted(col_duplicates)]
+
+
+def group_duplicate_bases(col_duplicates):
+    """maps each duplicated column index to its (ascending) list of equal columns on its left"""
+    col_bases = dict()
+    for col1_ind, col2_ind in col_duplicates:
+        col_bases.setdefault(col2_ind, []).append(col1_ind)
+    return col_bases
+
+
+def least_missing_base(bases, not_na_counts):
+    """picks the base with the most non-missing values, leftmost on ties"""
+    if len(bases) == 1:
+        return bases[0]
+    return bases[int(np.argmax(not_na_counts[bases]))]
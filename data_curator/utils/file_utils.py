@@ -1,12 +1,18 @@
+import glob
+import hashlib
 import os
 import warnings
 
+OUTPUT_PREFIX = 'data_checker_'
+PARTIAL_HASH_BYTES = 1 << 20
+
 
 def validate_filenames(filenames):
     filenames_dict = dict()
 
     if len(filenames) > 2:
-        raise ValueError('maximum 2 files are permitted')
+        raise ValueError('maximum 2 files are permitted, give a directory or a quoted glob pattern for a dataset '
+                         'of several files')
 
     if len(filenames) == 2:
         if filenames[0] == filenames[1]:
@@ -23,5 +29,47 @@ def validate_filenames(filenames):
     return filenames_dict
 
 
+def expand_filenames(path, extensions):
+    """
+    data files of a path: the files with one of the extensions in a directory, the files matching a glob pattern,
+    or the file itself. sorted by name, without the checker outputs (data_checker_*) saved next to the data
+    """
+    if os.path.isdir(path):
+        filenames = [os.path.join(path, t) for t in os.listdir(path) if os.path.splitext(t)[1] in extensions]
+    elif glob.has_magic(path):
+        filenames = [t for t in glob.glob(path) if os.path.isfile(t)]
+    else:
+        return [path]
+    filenames = [t for t in filenames if not os.path.basename(t).startswith(OUTPUT_PREFIX)]
+    if not filenames:
+        raise ValueError('no data files found for {0}'.format(path))
+    return sorted(filenames)
+
+
 def get_folder(file):
+    """folder of a data file, of a directory of data files or of the first file matching a glob pattern"""
+    if os.path.isdir(file):
+        return os.path.dirname(os.path.normpath(file))
+    if glob.has_magic(file):
+        matches = sorted(glob.glob(file))
+        if matches:
+            return os.path.dirname(matches[0])
     return os.path.dirname(file)
+
+
+def file_fingerprint(filename, full_hash=False):
+    """
+    size, mtime and a hash of the file content: the whole file if full_hash, else only its first and
+    last PARTIAL_HASH_BYTES bytes (size and mtime catch most other changes)
+    """
+    stat = os.stat(filename)
+    digest = hashlib.blake2b(digest_size=16)
+    with open(filename, 'rb') as f:
+        if full_hash or stat.st_size <= 2 * PARTIAL_HASH_BYTES:
+            for block in iter(lambda: f.read(PARTIAL_HASH_BYTES), b''):
+                digest.update(block)
+        else:
+            digest.update(f.read(PARTIAL_HASH_BYTES))
+            f.seek(-PARTIAL_HASH_BYTES, os.SEEK_END)
+            digest.update(f.read(PARTIAL_HASH_BYTES))
+    return '{0}-{1}-{2}'.format(stat.st_size, stat.st_mtime_ns, digest.hexdigest())
@@ -0,0 +1,57 @@
+"""
+imputation values per column with vectorized reductions, giving the fill values of sklearn's SimpleImputer
+(missing values here are everything pandas sees as missing: NaN, None and, with use_inf_as_na, inf)
+"""
+import numpy as np
+import pandas as pd
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def impute_mean(col):
+    missing = col.isnull().values
+    count = len(missing) - np.count_nonzero(missing)
+    if count == 0:
+        return np.nan
+    # summed with missing values as zeros like np.ma.mean in SimpleImputer, so the float result is the same
+    return float(np.where(missing, 0.0, col.to_numpy(dtype=np.float64, na_value=0.0)).sum() / count)
+
+
+def impute_median(col):
+    values = col.to_numpy(dtype=np.float64, na_value=np.nan)[~col.isnull().values]
+    if len(values) == 0:
+        return np.nan
+    return float(np.median(values))
+
+
+def impute_most_frequent(col):
+    """most frequent value, the smallest one on ties. categorical columns are counted on their codes"""
+    if isinstance(col.dtype, pd.CategoricalDtype):
+        codes = col.cat.codes.to_numpy()
+        uniques = col.cat.categories
+        codes = codes[codes >= 0]
+    else:
+        codes, uniques = pd.factorize(col.to_numpy())
+        valid = codes >= 0
+        if col.dtype.kind == 'f':
+            # inf is a value to factorize but missing to pandas
+            valid &= ~col.isnull().values
+        codes = codes[valid]
+    if len(codes) == 0:
+        return np.nan
+    counts = np.bincount(codes, minlength=len(uniques))
+    return min(uniques[counts == counts.max()].tolist())
+
+
+imputation_methods = {
+    'mean': impute_mean,
+    'median': impute_median,
+    'most_frequent': impute_most_frequent,
+}
+
+
+def get_fill_value(col, strategy):
+    if strategy not in imputation_methods:
+        raise NotImplementedError('unknown imputation method {0}'.format(strategy))
+    return imputation_methods[strategy](col)
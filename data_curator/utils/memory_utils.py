@@ -0,0 +1,88 @@
+from functools import reduce
+import numpy as np
+import pandas as pd
+
+import logging
+logger = logging.getLogger(__name__)
+
+INT_DTYPES = [np.dtype(t) for t in [np.int8, np.int16, np.int32, np.int64]]
+
+
+def column_memory(data):
+    """deep memory footprint in bytes per column of a dataframe (object values included)"""
+    return data.memory_usage(deep=True, index=False)
+
+
+def series_memory(col):
+    return int(col.memory_usage(deep=True, index=False))
+
+
+def smallest_int_dtype(col_min, col_max):
+    for dtype in INT_DTYPES:
+        info = np.iinfo(dtype)
+        if info.min <= col_min and col_max <= info.max:
+            return dtype
+    return None
+
+
+def reduced_dtype(col, to_category=False):
+    """
+    smallest dtype holding every value of the column without loss:
+        int: the smallest signed int dtype covering min and max
+        float: float32 if all values survive the round trip, else unchanged
+        object: category if to_category, else unchanged
+    """
+    dtype = col.dtype
+    values = col.values
+    if not isinstance(dtype, np.dtype):
+        return dtype
+    if dtype.kind in 'iu':
+        if len(values) == 0:
+            return dtype
+        int_dtype = smallest_int_dtype(values.min(), values.max())
+        return dtype if int_dtype is None else int_dtype
+    if dtype.kind == 'f' and dtype.itemsize > 4:
+        with np.errstate(over='ignore'):
+            float32_values = values.astype(np.float32)
+        if np.array_equal(float32_values.astype(dtype), values, equal_nan=True):
+            return np.dtype(np.float32)
+        return dtype
+    if dtype.kind == 'O' and to_category:
+        return pd.CategoricalDtype(pd.unique(col.dropna()))
+    return dtype
+
+
+def common_reduced_dtype(cols, to_category=False):
+    """reduced dtype shared by the same column of several datasets (e.g. train and test)"""
+    if to_category and all(t.dtype.kind == 'O' for t in cols):
+        return pd.CategoricalDtype(pd.unique(pd.concat([t.dropna() for t in cols])))
+    return reduce(np.promote_types, [reduced_dtype(t) for t in cols])
+
+
+def dtype_name(dtype):
+    return 'category' if isinstance(dtype, pd.CategoricalDtype) else str(dtype)
+
+
+def memory_usage(data, to_category_cols=()):
+    """
+    deep memory footprint of a dataframe per column, before and after reducing the column dtypes.
+    returns the reduced dtypes and the usage dict reported in the data checks
+    """
+    column_bytes = column_memory(data)
+    reduced_dtypes = dict()
+    reduced_bytes = dict()
+    for i, col in enumerate(data.columns):
+        values = data.iloc[:, i]
+        reduced_dtypes[col] = reduced_dtype(values, col in to_category_cols)
+        if reduced_dtypes[col] == values.dtype:
+            reduced_bytes[col] = int(column_bytes.iloc[i])
+        else:
+            reduced_bytes[col] = series_memory(values.astype(reduced_dtypes[col]))
+    usage = {
+        'total_bytes': int(column_bytes.sum()),
+        'reduced_total_bytes': int(sum(reduced_bytes.values())),
+        'column_bytes': {col: int(t) for col, t in zip(data.columns, column_bytes.values)},
+        'reduced_column_bytes': reduced_bytes,
+        'reduced_dtypes': {col: dtype_name(t) for col, t in reduced_dtypes.items()},
+    }
+    return reduced_dtypes, usage
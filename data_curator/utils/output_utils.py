@@ -0,0 +1,140 @@
+"""
+writers of the checker output (metadata and data_checks):
+    json: the nested dicts in data_checker_meta.json and data_checker_output.json, encoded in a single pass by
+        the json module (numpy and pandas values and check results through json_default) without indentation
+    table-json, parquet, msgpack: a columnar check table with a row per (data key, column) and a field per
+        column check, with its confidence on sampled data, the duplicate base, the feature dtype and the memory
+        footprint of the column, in data_checker_table.<ext>. everything else goes to data_checker_summary.json.
+        parquet needs pyarrow, msgpack needs msgpack
+load_check_table reads a check table back into a dataframe
+"""
+import json
+import os
+import numpy as np
+import pandas as pd
+from data_curator.data_checkers.check_results import CheckResults, as_check_results, BASE_SUFFIX
+
+import logging
+logger = logging.getLogger(__name__)
+
+output_formats = ['json', 'table-json', 'parquet', 'msgpack']
+table_extensions = {'table-json': '.json', 'parquet': '.parquet', 'msgpack': '.msgpack'}
+
+
+def json_default(value):
+    """json encoding of the numpy and pandas values and of the check results found in metadata and data_checks"""
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return float(value)
+    if isinstance(value, np.bool_):
+        return bool(value)
+    if isinstance(value, (np.ndarray, pd.Index)):
+        return value.tolist()
+    if isinstance(value, pd.DataFrame):
+        return value.to_dict(orient='index')
+    if isinstance(value, CheckResults):
+        return value.to_dict()
+    if isinstance(value, np.dtype):
+        kinds = {'f': 'float', 'i': 'int', 'O': 'string'}
+        return kinds.get(value.kind, 'undefined')
+    raise TypeError('{0} is not json serializable'.format(type(value).__name__))
+
+
+def dump_json(save_dict, save_path):
+    with open(save_path, 'w') as fp:
+        json.dump(save_dict, fp, default=json_default)
+    logger.info('saved {0}'.format(save_path))
+
+
+def check_table(metadata, data_checks):
+    """
+    columnar table of the column checks: a row per (data_key, column), a field per check
+    ('<check>_confidence' for its confidence on sampled data, DUPLICATE_CHECK_BASE for the base of duplicates)
+    plus feature_dtype and the memory footprint fields of data_checks['memory_usage']
+    """
+    tables = []
+    confidence = data_checks.get('check_confidence', dict()).get('column_checks', dict())
+    for key, checks in data_checks['column_checks'].items():
+        columns = list(metadata['feature_dtypes'][key].keys())
+        fields = {'data_key': key, 'column': columns, 'feature_dtype': list(metadata['feature_dtypes'][key].values())}
+        for check, statuses in checks.items():
+            statuses = as_check_results(statuses)
+            fields[check] = statuses.statuses(columns)
+            if check == 'DUPLICATE_CHECK':
+                fields[check + BASE_SUFFIX] = statuses.base_of(columns)
+            if check in confidence.get(key, dict()):
+                check_confidence = confidence[key][check]
+                fields[check + '_confidence'] = [check_confidence.get(t, np.nan) for t in columns]
+        memory_usage = data_checks.get('memory_usage', dict()).get(key)
+        if memory_usage is not None:
+            for name in ['column_bytes', 'reduced_column_bytes', 'reduced_dtypes']:
+                fields[name] = [memory_usage[name].get(t) for t in columns]
+        tables.append(pd.DataFrame(fields))
+    return pd.concat(tables, ignore_index=True) if tables else pd.DataFrame()
+
+
+def check_summary(metadata, data_checks):
+    """metadata and the data checks that are not in the check table"""
+    summary = {key: val for key, val in data_checks.items() if key not in ['column_checks', 'check_confidence']}
+    if 'check_confidence' in data_checks:
+        summary['check_confidence'] = {key: val for key, val in data_checks['check_confidence'].items()
+                                       if key != 'column_checks'}
+    if 'memory_usage' in data_checks:
+        summary['memory_usage'] = {key: {name: val for name, val in usage.items() if not isinstance(val, dict)}
+                                   for key, usage in data_checks['memory_usage'].items()}
+    return {'metadata': metadata, 'data_checks': summary}
+
+
+def import_msgpack():
+    try:
+        import msgpack
+    except ImportError:
+        raise ImportError('msgpack is required for the msgpack output format: pip install msgpack')
+    return msgpack
+
+
+def save_check_table(table, save_path, output_format):
+    if output_format == 'table-json':
+        table.to_json(save_path, orient='split', index=False)
+    elif output_format == 'parquet':
+        table.to_parquet(save_path, index=False)
+    elif output_format == 'msgpack':
+        msgpack = import_msgpack()
+        with open(save_path, 'wb') as f:
+            f.write(msgpack.packb({'columns': table.columns.tolist(),
+                                   'data': [table[t].tolist() for t in table.columns]}))
+    else:
+        raise NotImplementedError('unknown check table format {0}'.format(output_format))
+    logger.info('saved {0}'.format(save_path))
+
+
+def load_check_table(save_path):
+    """check table saved by save_checks (table-json, parquet or msgpack, by file extension)"""
+    extension = os.path.splitext(save_path)[1]
+    if extension == '.json':
+        return pd.read_json(save_path, orient='split', dtype=False)
+    if extension == '.parquet':
+        return pd.read_parquet(save_path)
+    if extension == '.msgpack':
+        msgpack = import_msgpack()
+        with open(save_path, 'rb') as f:
+            table = msgpack.unpackb(f.read())
+        return pd.DataFrame(dict(zip(table['columns'], table['data'])), columns=table['columns'])
+    raise NotImplementedError('unknown check table extension {0}'.format(extension))
+
+
+def save_checks(metadata, data_checks, save_loc, output_format='json'):
+    """writes the checker output in output_format, returns the paths written"""
+    if output_format == 'json':
+        paths = [os.path.join(save_loc, 'data_checker_meta.json'), os.path.join(save_loc, 'data_checker_output.json')]
+        dump_json(metadata, paths[0])
+        dump_json(data_checks, paths[1])
+        return paths
+    if output_format not in table_extensions:
+        raise NotImplementedError('unknown output format {0}'.format(output_format))
+    paths = [os.path.join(save_loc, 'data_checker_table' + table_extensions[output_format]),
+             os.path.join(save_loc, 'data_checker_summary.json')]
+    save_check_table(check_table(metadata, data_checks), paths[0], output_format)
+    dump_json(check_summary(metadata, data_checks), paths[1])
+    return paths
@@ -14,11 +14,7 @@ def create_json_serializable(dict_to_json, serialize_df=False):
             append_dict[key] = create_json_serializable(value, serialize_df)
         elif isinstance(value, pd.DataFrame):
             if serialize_df:
-                append_dict[key] = dict()
-                for ind in value.index.values:
-                    append_dict[key][ind] = dict()
-                    for col in value.columns:
-                        append_dict[key][ind][col] = value.loc[ind, col]
+                append_dict[key] = value.to_dict(orient='index')
             else:
                 append_dict[key] = 'pandas dataframe'
         elif isinstance(value, np.integer):
@@ -0,0 +1,133 @@
+"""
+row samples of data streamed in chunks, in one pass and holding about the sample size in memory.
+every row gets a uniform random key, a sample is made of the smallest keys:
+    reservoir: the n_rows smallest keys overall (a uniform sample without replacement)
+    stratified: per class of the strata column the smallest keys, proportionally to the class size but at least
+        MIN_STRATUM_ROWS rows (or the whole class), so that small classes are represented
+sampled rows keep their order in the data
+"""
+import numpy as np
+import pandas as pd
+import data_curator.utils.data_checker_utils as dcu
+
+import logging
+logger = logging.getLogger(__name__)
+
+SAMPLE_CHUNKSIZE = 1 << 18
+SAMPLE_SEED = 0
+MIN_STRATUM_ROWS = 10
+# rows with keys up to OVERSAMPLE times the expected sampling rate are kept while streaming
+OVERSAMPLE = 2.0
+MAX_STRATA = 100
+
+
+def ranks_within_strata(codes, keys):
+    """rank of every key among the keys of its stratum (0 for the smallest)"""
+    order = np.lexsort((keys, codes))
+    sorted_codes = codes[order]
+    starts = np.r_[0, np.flatnonzero(np.diff(sorted_codes)) + 1]
+    lengths = np.diff(np.r_[starts, len(codes)])
+    ranks = np.empty(len(codes), dtype=np.int64)
+    ranks[order] = np.arange(len(codes)) - np.repeat(starts, lengths)
+    return ranks
+
+
+def smallest_keys(keys, n_rows):
+    """mask of the n_rows smallest keys"""
+    mask = np.zeros(len(keys), dtype=bool)
+    if len(keys) <= n_rows:
+        mask[:] = True
+    else:
+        mask[np.argpartition(keys, n_rows - 1)[:n_rows]] = True
+    return mask
+
+
+def stratum_allocation(strata, class_counts, n_seen, n_rows):
+    """sample rows per stratum value (missing values are a stratum of their own)"""
+    allocation = []
+    n_missing = n_seen - sum(class_counts.values())
+    for value in strata:
+        count = n_missing if pd.isnull(value) else class_counts[value]
+        allocation.append(min(count, max(int(round(n_rows * count / n_seen)), MIN_STRATUM_ROWS)))
+    return np.array(allocation, dtype=np.int64)
+
+
+class RowSampler(object):
+    def __init__(self, n_rows, strata_col=None, seed=0):
+        self.n_rows = n_rows
+        self.strata_col = strata_col
+        self.rng = np.random.default_rng(seed)
+        self.n_seen = 0
+        self.class_counts = dict()
+        self.kept = None
+        self.keys = np.empty(0)
+        self.positions = np.empty(0, dtype=np.int64)
+
+    @property
+    def stratified(self):
+        return self.strata_col is not None
+
+    def update(self, chunk):
+        keys = self.rng.random(chunk.shape[0])
+        positions = np.arange(self.n_seen, self.n_seen + chunk.shape[0])
+        self.n_seen += chunk.shape[0]
+        if self.stratified:
+            for value, count in dcu.get_class_counts(chunk[self.strata_col]).items():
+                self.class_counts[value] = self.class_counts.get(value, 0) + count
+            if len(self.class_counts) > MAX_STRATA:
+                logger.info('{0} has more than {1} classes, sampling uniformly instead of stratified'.format(
+                    self.strata_col, MAX_STRATA))
+                self.strata_col = None
+        elif self.kept is not None and len(self.keys) >= self.n_rows:
+            # rows above the largest kept key cannot make it into the sample
+            below = keys < self.keys.max()
+            chunk, keys, positions = chunk[below], keys[below], positions[below]
+        if self.kept is not None:
+            chunk = pd.concat([self.kept, chunk], ignore_index=True)
+            keys = np.concatenate([self.keys, keys])
+            positions = np.concatenate([self.positions, positions])
+        self.keep(chunk, keys, positions, self.candidate_mask(chunk, keys))
+
+    def keep(self, frame, keys, positions, mask):
+        self.kept = frame[mask].reset_index(drop=True)
+        self.keys = keys[mask]
+        self.positions = positions[mask]
+
+    def candidate_mask(self, frame, keys):
+        if not self.stratified:
+            return smallest_keys(keys, self.n_rows)
+        codes = pd.factorize(frame[self.strata_col], use_na_sentinel=False)[0]
+        return (keys <= OVERSAMPLE * self.n_rows / self.n_seen) | \
+            (ranks_within_strata(codes, keys) < MIN_STRATUM_ROWS)
+
+    def sample(self):
+        """the sampled rows in data order and the sample info"""
+        if self.kept is None:
+            raise ValueError('no data to sample')
+        if self.stratified:
+            codes, strata = pd.factorize(self.kept[self.strata_col], use_na_sentinel=False)
+            allocation = stratum_allocation(strata, self.class_counts, self.n_seen, self.n_rows)
+            self.keep(self.kept, self.keys, self.positions,
+                      ranks_within_strata(codes, self.keys) < allocation[codes])
+        order = np.argsort(self.positions, kind='stable')
+        sample = self.kept.iloc[order].reset_index(drop=True)
+        info = {'method': 'stratified' if self.stratified else 'reservoir', 'n_rows': int(self.n_seen),
+                'sample_rows': int(sample.shape[0])}
+        if self.stratified:
+            info['class_counts'] = dict(self.class_counts)
+        logger.debug('sampled {0} of {1} rows ({2})'.format(info['sample_rows'], info['n_rows'], info['method']))
+        return sample, info
+
+
+def sample_rows(chunks, n_rows, strata_col=None, seed=0):
+    """
+    sample of n_rows rows from an iterable of dataframes (or a dataframe), stratified by strata_col if given.
+    returns the sample and its info: method, n_rows (of the data), sample_rows and for stratified samples
+    the class_counts of the data
+    """
+    if isinstance(chunks, pd.DataFrame):
+        chunks = [chunks]
+    sampler = RowSampler(n_rows, strata_col, seed)
+    for chunk in chunks:
+        sampler.update(chunk)
+    return sampler.sample()
@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+
+import logging
+logger = logging.getLogger(__name__)
+
+HLL_PRECISION = 14
+EXACT_DISTINCT_LIMIT = 2048
+
+
+def bit_length(values):
+    """vectorized int.bit_length for uint64 arrays"""
+    values = values.copy()
+    lengths = np.zeros(values.shape, dtype=np.int64)
+    for shift in [32, 16, 8, 4, 2, 1]:
+        over = values >= np.uint64(1 << shift)
+        lengths[over] += shift
+        values[over] >>= np.uint64(shift)
+    return lengths + (values > 0)
+
+
+def hll_registers(hashes, precision=HLL_PRECISION):
+    """HyperLogLog registers (max rank per bucket) of uint64 hashes"""
+    registers = np.zeros(1 << precision, dtype=np.uint8)
+    if len(hashes) == 0:
+        return registers
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    bucket = (hashes >> np.uint64(64 - precision)).astype(np.int64)
+    remainder = hashes & np.uint64((1 << (64 - precision)) - 1)
+    if 64 - precision <= 53:
+        # remainders are exact as float64, their frexp exponent is the bit length
+        lengths = np.frexp(remainder.astype(np.float64))[1]
+    else:
+        lengths = bit_length(remainder)
+    rank = (64 - precision) - lengths + 1
+    np.maximum.at(registers, bucket, rank.astype(np.uint8))
+    return registers
+
+
+def hll_estimate(registers):
+    """HyperLogLog cardinality estimate with the linear counting correction for small counts"""
+    m = registers.shape[0]
+    alpha = 0.7213 / (1 + 1.079 / m)
+    estimate = alpha * m * m / np.sum(np.power(2.0, -registers.astype(np.float64)))
+    zero_registers = np.count_nonzero(registers == 0)
+    if estimate <= 2.5 * m and zero_registers > 0:
+        estimate = m * np.log(m / zero_registers)
+    return estimate
+
+
+def hll_relative_error(precision=HLL_PRECISION):
+    return 1.04 / np.sqrt(1 << precision)
+
+
+def hll_precision(relative_error):
+    """smallest precision (4 to 18) whose relative standard error is at most relative_error"""
+    return int(np.clip(np.ceil(np.log2((1.04 / relative_error) ** 2)), 4, 18))
+
+
+def approximate_distinct_count(hashes, relative_error, thresholds=()):
+    """
+    distinct count of uint64 hashes estimated by HyperLogLog, counted exactly when the estimate is within
+    3 standard errors of one of thresholds (where a decision would be ambiguous).
+    returns (count, is_exact)
+    """
+    precision = hll_precision(relative_error)
+    estimate = hll_estimate(hll_registers(hashes, precision))
+    margin = 3 * hll_relative_error(precision) * estimate
+    if any(abs(estimate - t) <= margin for t in thresholds):
+        return len(pd.unique(hashes)), True
+    return min(int(round(estimate)), len(hashes)), False
+
+
+class DistinctCounter(object):
+    """
+    mergeable distinct counter over uint64 value hashes.
+    keeps the exact set of hashes up to exact_limit and switches to HyperLogLog registers beyond it,
+    so memory per column is bounded by max(8 * exact_limit, 2 ** precision) bytes
+    """
+    def __init__(self, exact_limit=EXACT_DISTINCT_LIMIT, precision=HLL_PRECISION):
+        self.exact_limit = exact_limit
+        self.precision = precision
+        self.hashes = np.empty(0, dtype=np.uint64)
+        self.registers = None
+
+    @property
+    def is_exact(self):
+        return self.registers is None
+
+    @property
+    def relative_error(self):
+        return 0.0 if self.is_exact else hll_relative_error(self.precision)
+
+    def update(self, hashes):
+        if self.is_exact:
+            self.hashes = np.unique(np.concatenate([self.hashes, np.asarray(hashes, dtype=np.uint64)]))
+            if len(self.hashes) > self.exact_limit:
+                self.registers = hll_registers(self.hashes, self.precision)
+                self.hashes = None
+        else:
+            np.maximum(self.registers, hll_registers(hashes, self.precision), out=self.registers)
+
+    def merge(self, other):
+        if other.is_exact:
+            self.update(other.hashes)
+        elif self.is_exact:
+            registers = other.registers.copy()
+            np.maximum(registers, hll_registers(self.hashes, self.precision), out=registers)
+            self.registers = registers
+            self.hashes = None
+        else:
+            np.maximum(self.registers, other.registers, out=self.registers)
+
+    def count(self):
+        if self.is_exact:
+            return len(self.hashes)
+        return int(round(hll_estimate(self.registers)))
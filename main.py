@@ -1,10 +1,16 @@
 from data_curator.data_curator_logger import DataCuratorLogger
 from data_curator.data_readers.data_reader import DataReader
+from data_curator.data_readers.base_reader import valid_exts
 from data_curator.data_checkers.data_checker import DataChecker
+from data_curator.data_checkers.check_cache import CheckCache
+from data_curator.data_checkers.check_state import load_state, PARTITION_CHUNKSIZE
+import data_curator.data_checkers.sample_confidence as sc
+import data_curator.data_curator_profiler as dcp
 from data_curator.data_processors.data_processor import DataProcessor
 from data_curator.data_processors.params.params import Params
 import os
 import data_curator.utils.print_utils as pu
+import data_curator.utils.output_utils as ou
 import data_curator.utils.file_utils as fu
 import json
 import argparse
@@ -19,9 +25,66 @@ NO_TARGET_HELP = 'set that no target column exists in data, ' \
                  (by default: the last column is considered as target column)'
 PARAMS_HELP = 'user defined parameters' \
               'optional: n_cardinality_issue_features'
-FILENAME_HELP = 'data file name(s). If two are given, first is treated as train data and second as test data'
+FILENAME_HELP = 'data file name(s). If two are given, first is treated as train data and second as test data. ' \
+                'a directory or a glob pattern (quoted) names a dataset made of several files with the same columns'
 TARGET_COLUMN_HELP = 'set the column name in the data for target column.' \
                      '(by default: the last column is considered as target column unless no-target param is active)'
+COLUMNS_HELP = 'read only these columns from the data file(s)'
+CHUNKSIZE_HELP = 'stream data files in chunks of this many rows instead of loading them, ' \
+                 'for data larger than memory. only the data checks are run in this mode'
+JOBS_HELP = 'number of threads reading data files and checking datasets and columns concurrently (default: 1)'
+PROCESSES_HELP = 'number of processes profiling the columns of every dataset in shards, for wide data ' \
+                 '(default: profile in this process)'
+CACHE_DIR_HELP = 'cache checker results in this folder, runs on unchanged data files then skip the checks'
+CACHE_SIZE_HELP = 'maximum size of the checker results cache in MB, least recently used results are evicted ' \
+                  '(default: 1024)'
+CLEAR_CACHE_HELP = 'remove all cached checker results before running'
+SAMPLE_HELP = 'check a sample of this many rows, streamed from the data file(s), for a first look at large data. ' \
+              'data_checker_output.json then holds the confidence of every check result, data processing is skipped'
+SAMPLE_METHOD_HELP = 'sampling method: stratified by the target column for classification or uniform reservoir ' \
+                     '(default: stratified, reservoir without target or with more than 100 target values)'
+CONFIRM_HELP = 'with --sample, recheck on all rows the columns with FAIL results that the sample does not settle ' \
+               'or with low confidence results'
+MIN_CONFIDENCE_HELP = 'results below this confidence are rechecked by --confirm (default: 0.95)'
+STATE_HELP = 'incremental checks: the data file(s) are partitions of one dataset, partitions not in this check ' \
+             'state file yet are merged into it and the checks are updated from the state, so that appended ' \
+             'partitions are the only data read. data processing is skipped'
+OUTPUT_FORMAT_HELP = 'format of the checker output: json (nested, in data_checker_meta.json and ' \
+                     'data_checker_output.json) or a check table with a row per column and a field per check ' \
+                     '(table-json, parquet, msgpack) in data_checker_table.<ext>, with the rest in ' \
+                     'data_checker_summary.json (default: json)'
+PROFILE_HELP = 'record the wall time, cpu time, rows and columns and resident memory change of every reader, ' \
+               'checker and processor step, in a profile section of the checker metadata (reader and checker) ' \
+               'and of the processing info (processor)'
+TRACE_HELP = 'save the steps of the run to this file as a chrome trace, to view the run timeline in ' \
+             'chrome://tracing, perfetto or speedscope (implies --profile)'
+STORE_HELP = 'keep the parsed data in this folder as memory mapped column files, later runs on unchanged data ' \
+             'files open them instead of parsing the files again'
+APPROX_DISTINCT_HELP = 'estimate distinct counts of high cardinality columns with this relative error ' \
+                       '(e.g. 0.01) instead of counting them exactly, counts that decide a check are kept exact'
+
+
+def check_partitions(args):
+    """checks the partitions in args.filename incrementally through the check state in args.state"""
+    options = {'no_target': args.no_target, 'target_col': args.target_col, 'columns': args.columns}
+    state = load_state(args.state, options)
+    metadata = None
+    filenames = [t for pattern in args.filename for t in fu.expand_filenames(pattern, valid_exts)]
+    for filename in filenames:
+        data, partition_metadata = DataReader({'total': filename}, args.no_target, args.target_col,
+                                              args.chunksize or PARTITION_CHUNKSIZE, args.columns).run()
+        metadata = partition_metadata if metadata is None else metadata
+        name = os.path.abspath(filename)
+        fingerprint = fu.file_fingerprint(filename)
+        if state.is_new('total', name, fingerprint):
+            state.add_partition('total', name, fingerprint, data['total'], partition_metadata['target_col']['total'])
+        else:
+            logger.info('partition {0} already checked'.format(filename))
+    state.settle_distinct('total', args.chunksize or PARTITION_CHUNKSIZE)
+    state.save(args.state)
+    metadata['partitions'] = sorted(state.partitions['total'])
+    return DataChecker(None, metadata, args.n_jobs, profiles=state.profiles).run()
+
 
 if __name__ == '__main__':
 
@@ -39,31 +102,129 @@ if __name__ == '__main__':
 
     parser.add_argument('-p', '--params', help=PARAMS_HELP, default={}, nargs='?', dest="params")
 
+    parser.add_argument('-c', '--columns', help=COLUMNS_HELP, nargs='+', default=None, dest="columns")
+
+    parser.add_argument('-cs', '--chunksize', help=CHUNKSIZE_HELP, type=int, default=None, dest="chunksize")
+
+    parser.add_argument('-j', '--jobs', help=JOBS_HELP, type=int, default=1, dest="n_jobs")
+
+    parser.add_argument('--processes', help=PROCESSES_HELP, type=int, default=None, dest="processes")
+
+    parser.add_argument('--cache-dir', help=CACHE_DIR_HELP, default=None, dest="cache_dir")
+
+    parser.add_argument('--cache-size', help=CACHE_SIZE_HELP, type=int, default=1024, dest="cache_size")
+
+    parser.add_argument('--clear-cache', help=CLEAR_CACHE_HELP, action='store_true', dest="clear_cache")
+
+    parser.add_argument('--state', help=STATE_HELP, default=None, dest="state")
+
+    parser.add_argument('--store', help=STORE_HELP, default=None, dest="store")
+
+    parser.add_argument('--output-format', help=OUTPUT_FORMAT_HELP, choices=ou.output_formats, default='json',
+                        dest="output_format")
+
+    parser.add_argument('--approx-distinct', help=APPROX_DISTINCT_HELP, type=float, default=None,
+                        dest="distinct_error")
+
+    parser.add_argument('--sample', help=SAMPLE_HELP, type=int, default=None, dest="sample")
+
+    parser.add_argument('--sample-method', help=SAMPLE_METHOD_HELP, choices=['stratified', 'reservoir'],
+                        default='stratified', dest="sample_method")
+
+    parser.add_argument('--confirm', help=CONFIRM_HELP, action='store_true', dest="confirm")
+
+    parser.add_argument('--min-confidence', help=MIN_CONFIDENCE_HELP, type=float, default=0.95,
+                        dest="min_confidence")
+
+    parser.add_argument('--profile', help=PROFILE_HELP, action='store_true', dest="profile")
+
+    parser.add_argument('--trace', help=TRACE_HELP, default=None, dest="trace")
+
     # TODO create one big params file with all useful params and file_info
     #  so that all params can be sourced from one file
     parser.add_argument('filename', help=FILENAME_HELP, nargs='+')
     
     args = parser.parse_args()
     DataCuratorLogger(args.loglevel)
-    datafiles = fu.validate_filenames(args.filename)
-    data_folder = fu.get_folder(list(datafiles.values())[0])
+    if args.output_format == 'msgpack':
+        # fail before running the checks
+        ou.import_msgpack()
+    if args.profile or args.trace:
+        dcp.start_profiling()
+    if args.state:
+        data_folder = fu.get_folder(args.filename[0])
+        metadata, data_checks = check_partitions(args)
+    else:
+        datafiles = fu.validate_filenames(args.filename)
+        data_folder = fu.get_folder(list(datafiles.values())[0])
 
-    data_reader = DataReader(datafiles, args.no_target, args.target_col)
-    data, metadata = data_reader.run()
-    # pu.pretty_print(data)
-    # pu.pretty_print(metadata)
-    
-    data_checker = DataChecker(data, metadata)
-    metadata, data_checks = data_checker.run()
+        data_reader = DataReader(datafiles, args.no_target, args.target_col, args.chunksize, args.columns, args.sample,
+                                 args.sample_method, args.n_jobs, args.store)
+        data, metadata = data_reader.run()
+        # pu.pretty_print(data)
+        # pu.pretty_print(metadata)
+
+        check_cache, cache_key, cached = None, None, None
+        if args.cache_dir:
+            check_cache = CheckCache(args.cache_dir, args.cache_size * 2**20)
+            if args.clear_cache:
+                check_cache.invalidate()
+            cache_key = check_cache.key(metadata['shards'], {'no_target': args.no_target, 'target_col': args.target_col,
+                                                    'columns': args.columns, 'chunksize': args.chunksize,
+                                                    'distinct_error': args.distinct_error, 'sample': args.sample,
+                                                    'sample_method': args.sample_method, 'confirm': args.confirm,
+                                                    'min_confidence': args.min_confidence})
+            cached = check_cache.get(cache_key)
+
+        if cached is not None:
+            metadata, data_checks = cached
+            metadata['datafiles'] = datafiles
+        else:
+            data_checker = DataChecker(data, metadata, args.n_jobs, args.distinct_error, processes=args.processes)
+            metadata, data_checks = data_checker.run()
+            if args.sample and args.confirm:
+                recheck_columns = sc.recheck_columns(data_checks, data_checks['check_confidence'],
+                                                     data_checker.profiles, args.min_confidence)
+                columns = [t for t in data_checker.profiles[metadata['main_data_key']].columns
+                           if any(t in cols for cols in recheck_columns.values())]
+                class_balance_confidence = data_checks['check_confidence'].get('data_checks', dict()).get(
+                    'class_balance_check', 1.0)
+                if columns or class_balance_confidence < args.min_confidence:
+                    if not args.no_target and args.target_col not in columns:
+                        columns.append(args.target_col)
+                logger.info('confirming {0} columns on all rows'.format(len(columns)))
+                if columns:
+                    confirm_reader = DataReader(datafiles, args.no_target, args.target_col, args.chunksize, columns,
+                                                n_jobs=args.n_jobs)
+                    confirm_data, confirm_metadata = confirm_reader.run()
+                    confirm_metadata, confirm_checks = DataChecker(confirm_data, confirm_metadata, args.n_jobs,
+                                                                   args.distinct_error,
+                                                                   processes=args.processes).run()
+                    metadata, data_checks, data_checks['check_confidence'] = sc.merge_confirmed(
+                        metadata, data_checks, data_checks['check_confidence'], confirm_metadata, confirm_checks)
+                metadata['confirmed_columns'] = columns
+            if check_cache is not None:
+                check_cache.put(cache_key, (metadata, data_checks))
     # pu.pretty_print(metadata)
     # pu.pretty_print(data_checks)
-    metadata_to_json = pu.create_json_serializable(metadata)
-    data_checks_to_json = pu.create_json_serializable(data_checks, serialize_df=True)
-    pu.save_json(metadata_to_json, data_folder, 'data_checker_meta.json')
-    pu.save_json(data_checks_to_json, data_folder, 'data_checker_output.json')
-
-    PARAMS = Params().params
-    data_processor = DataProcessor(data, metadata, data_checks, PARAMS)
-    processed_data, processed_info = data_processor.run()
-    pu.pretty_print(processed_info)
-    # pu.pretty_print(data_checks)
+    if dcp.get_profiler() is not None:
+        metadata['profile'] = dcp.get_profiler().summary(['reader', 'checker'])
+    ou.save_checks(metadata, data_checks, data_folder, args.output_format)
+
+    if args.state:
+        logger.info('data processing needs the data in memory, skipped for incremental checks')
+    elif args.sample:
+        logger.info('data processing needs all rows, skipped for sampled data')
+    elif args.chunksize:
+        logger.info('data processing needs the data in memory, skipped for chunked reading')
+    else:
+        PARAMS = Params().params
+        data_processor = DataProcessor(data, metadata, data_checks, PARAMS)
+        processed_data, processed_info = data_processor.run()
+        data_processor.pipeline.save(os.path.join(data_folder, 'fitted_pipeline.pkl'))
+        if dcp.get_profiler() is not None:
+            processed_info['profile'] = dcp.get_profiler().summary(['processor'])
+        pu.pretty_print(processed_info)
+    if args.trace:
+        dcp.get_profiler().save_trace(args.trace)
+        # pu.pretty_print(data_checks)
@@ -5,5 +5,6 @@ setup(
     version='0.0.1',
     description='framework for data checks and preprocessing',
     packages=['data_curator'],
-    install_requires=['pandas', 'numpy']
+    install_requires=['pandas', 'numpy'],
+    extras_require={'arrow': ['pyarrow'], 'msgpack': ['msgpack']}
 )